@@ -50,10 +50,18 @@ setup(
         'Intended Audience :: Developers',
         'Topic :: Software Development :: Build Tools',
         'License :: OSI Approved :: MIT License',
-        'Programming Language :: Python :: 3.4',
-        'Programming Language :: Python :: 3.5',
+        'Programming Language :: Python :: 3',
+        'Programming Language :: Python :: 3 :: Only',
+        'Programming Language :: Python :: 3.7',
+        'Programming Language :: Python :: 3.8',
+        'Programming Language :: Python :: 3.9',
+        'Programming Language :: Python :: 3.10',
+        'Programming Language :: Python :: 3.11',
     ],
 
+    # async/await, asyncio.get_running_loop, async generators and contextvars
+    python_requires='>=3.7',
+
     # What does your project relate to?
     keywords='communication protocol tornado django sockets signalR websockets Android Java javascript API',
 
@@ -65,7 +73,15 @@ setup(
     # your project is installed. For an analysis of "install_requires" vs pip's
     # requirements files see:
     # https://packaging.python.org/en/latest/requirements.html
-    install_requires=['futures', 'inflection==0.3.1', 'ws4py'],
+    install_requires=['inflection==0.3.1', 'ws4py'],
+
+    # optional faster json codecs, the serializer uses them automatically when installed
+    extras_require={
+        'orjson': ['orjson'],
+        'ujson': ['ujson'],
+        # binary msgpack encoding
+        'msgpack': ['msgpack'],
+    },
 
     # List additional groups of dependencies here (e.g. development
     # dependencies). You can install these using the following syntax,
@@ -140,9 +140,8 @@ class _Serializer {{
         }}
     }}
 
-    Map unserialize(objStr) {{
-        Map objMap = JSON.decode(objStr);
-        return _unjsonize(objMap);
+    unserialize(objStr) {{
+        return _unjsonize(JSON.decode(objStr));
     }}
 
     _unjsonize(obj) {{
@@ -239,10 +238,21 @@ class WsHandler {{
         reconnectScheduled = true;
     }}
 
-    onMessage(MessageEvent e) async {{
+    onMessage(MessageEvent e) {{
         print('message receiver ${{e.data}}');
-        Map<String, Object> msgMap = api.serializer.unserialize(e.data);
+        var msgObj = api.serializer.unserialize(e.data);
+        // the server can send several messages batched in one frame
+        for (Map<String, Object> msgMap in msgObj is Map ? [msgObj] : msgObj) {{
+            _onMessageMap(msgMap);
+        }}
+    }}
+
+    _onMessageMap(Map<String, Object> msgMap) async {{
         if (msgMap.containsKey('reply')) {{
+            if (msgMap['partial'] == true) {{
+                // streamed items are not supported yet, the future is completed when the stream ends
+                return;
+            }}
             var completer = futuresHandler[msgMap['ID']];
             msgMap['success']
                 ? completer.complete(msgMap['reply'])
@@ -254,6 +264,11 @@ class WsHandler {{
                 .getField(new Symbol(msgMap['hub']))
                 .reflectee;
             im = reflect(hub.client);
+            if (!msgMap.containsKey('ID')) {{
+                // notification, the server does not expect any reply
+                im.invoke(new Symbol(msgMap['function']), msgMap['args']);
+                return;
+            }}
             Map replyMessage = {{'ID': msgMap['ID']}};
             var reply = null;
             try {{
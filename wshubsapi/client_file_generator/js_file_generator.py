@@ -1,7 +1,10 @@
+import json
+
 import inflection
 
 from wshubsapi import utils
 from wshubsapi.client_file_generator.client_file_generator import ClientFileGenerator
+from wshubsapi.compact_serializer import CompactSerializer
 from wshubsapi.serializer import Serializer
 
 __author__ = 'jgarc'
@@ -64,7 +67,13 @@ class JSClientFileGenerator(ClientFileGenerator):
         cls._construct_api_path(path)
         with open(path, "w") as f:
             class_strings = "".join(cls.__get_class_strs(hubs_info))
-            f.write(cls.WRAPPER.format(main=class_strings))
+            tables = cls.__get_envelope_tables(hubs_info)
+            f.write(cls.WRAPPER.format(main=class_strings, envelopeTables=json.dumps(tables),
+                                       envelopeTablesHash=CompactSerializer.get_tables_hash(tables)))
+
+    @classmethod
+    def __get_envelope_tables(cls, hubs_info):
+        return [[name, list(info["serverMethods"]), list(info["clientMethods"])] for name, info in hubs_info.items()]
 
     WRAPPER = """'use strict';
 /* jshint ignore:start */
@@ -97,6 +106,58 @@ function __unserialize(objStr) {{
     return __unjsonizer(JSON.parse(objStr));
 }}
 
+// [hub, server functions, client functions] sorted by their index in the compact envelope
+var __envelopeTables = {envelopeTables},
+    __envelopeTablesHash = '{envelopeTablesHash}',
+    __envelopeIndexes = {{}};
+
+__envelopeTables.forEach(function (table, hubIndex) {{
+    var functionsIndexes = {{}};
+    table[1].forEach(function (functionName, functionIndex) {{
+        functionsIndexes[functionName] = functionIndex;
+    }});
+    __envelopeIndexes[table[0]] = {{hub: hubIndex, functions: functionsIndexes}};
+}});
+
+// compact envelopes: [0, ID, hubIndex, functionIndex, args], [1, ID, success, reply] and [2, ID, partialReply]
+function __compactMessage(obj) {{
+    if (obj instanceof Array) {{
+        return obj.map(__compactMessage);
+    }}
+    if (obj.hasOwnProperty('reply')) {{
+        return [1, obj.ID, obj.success, obj.reply];
+    }}
+    var indexes = __envelopeIndexes[obj.hub];
+    if (indexes === undefined) {{
+        return [0, obj.ID, obj.hub, obj.function, obj.args];
+    }}
+    var functionIndex = indexes.functions[obj.function];
+    return [0, obj.ID, indexes.hub, functionIndex === undefined ? obj.function : functionIndex, obj.args];
+}}
+
+function __expandMessage(obj) {{
+    if (obj.length === 0 || obj[0] instanceof Array) {{
+        return obj.map(__expandMessage);
+    }}
+    if (obj[0] === 1) {{
+        return {{ID: obj[1], success: obj[2], reply: obj[3]}};
+    }}
+    if (obj[0] === 2) {{
+        return {{ID: obj[1], success: true, reply: obj[2], partial: true}};
+    }}
+    var message = {{hub: obj[2], 'function': obj[3], args: obj[4]}};
+    if (typeof obj[2] === 'number') {{
+        message.hub = __envelopeTables[obj[2]][0];
+        if (typeof obj[3] === 'number') {{
+            message.function = __envelopeTables[obj[2]][2][obj[3]];
+        }}
+    }}
+    if (obj[1] !== null) {{
+        message.ID = obj[1];
+    }}
+    return message;
+}}
+
 function __unjsonizer(obj) {{
     if(obj instanceof Object && '__date_time__' in obj) {{
         return new Date(obj.__date_time__);
@@ -117,15 +178,30 @@ function __unjsonizer(obj) {{
 }}
 
 
-function HubsAPI(serverTimeout, wsClientClass, PromiseClass) {{
+// msgpackCodec (optional): object with encode and decode functions (ex: @msgpack/msgpack) to use binary frames
+// compactEnvelope (optional): if true, messages are sent with hubs and functions indexes instead of names
+function HubsAPI(serverTimeout, wsClientClass, PromiseClass, msgpackCodec, compactEnvelope) {{
 
     var messageID = 0,
         promisesHandler = {{}},
         defaultRespondTimeout = serverTimeout || 5000,
         thisApi = this,
         messagesBeforeOpen = [],
+        batchMessages = null,
         emptyFunction = function () {{return function () {{}}}}, //redefine any empty function as required
-        onOpenTriggers = [];
+        onOpenTriggers = [],
+        encode = msgpackCodec ? function (obj) {{
+            return msgpackCodec.encode(obj);
+        }} : __serialize,
+        decode = msgpackCodec ? function (data) {{
+            return msgpackCodec.decode(new Uint8Array(data));
+        }} : __unserialize,
+        serialize = compactEnvelope ? function (obj) {{
+            return encode(__compactMessage(obj));
+        }} : encode,
+        unserialize = compactEnvelope ? function (data) {{
+            return __expandMessage(decode(data));
+        }} : decode;
 
     PromiseClass = PromiseClass || Promise;
     if (!PromiseClass.prototype.finally) {{
@@ -180,8 +256,16 @@ function HubsAPI(serverTimeout, wsClientClass, PromiseClass) {{
                 }}
             }}
 
+            var encodedUrl = msgpackCodec ? url + (url.indexOf('?') === -1 ? '?' : '&') + 'encoding=msgpack' : url;
+            if (compactEnvelope) {{
+                encodedUrl += (encodedUrl.indexOf('?') === -1 ? '?' : '&') + 'envelope=compact&envelope_hash=' +
+                    __envelopeTablesHash;
+            }}
             try {{
-                thisApi.wsClient = wsClientClass === undefined ? new WebSocket(url) : new wsClientClass(url);
+                thisApi.wsClient = wsClientClass === undefined ? new WebSocket(encodedUrl) : new wsClientClass(encodedUrl);
+                if (msgpackCodec) {{
+                    thisApi.wsClient.binaryType = 'arraybuffer';
+                }}
             }} catch (error) {{
                 reconnect(error);
                 return reject(error);
@@ -216,41 +300,11 @@ function HubsAPI(serverTimeout, wsClientClass, PromiseClass) {{
 
             thisApi.wsClient.onmessage = function (ev) {{
                 try {{
-                    var promiseHandler,
-                        msgObj = __unserialize(ev.data);
-                    if (msgObj.hasOwnProperty('reply')) {{
-                        promiseHandler = promisesHandler[msgObj.ID];
-                        msgObj.success ? promiseHandler.resolve(msgObj.reply) : promiseHandler.reject(msgObj.reply);
+                    var msgObj = unserialize(ev.data);
+                    if (msgObj instanceof Array) {{
+                        msgObj.forEach(onMessageObject);
                     }} else {{
-                        msgObj.function = toCamelCase(msgObj.function);
-                        var executor = thisApi[msgObj.hub].client[msgObj.function];
-                        if (executor !== undefined) {{
-                            var replayMessage = {{ID: msgObj.ID}};
-                            try {{
-                                replayMessage.reply = executor.apply(executor, msgObj.args);
-                                replayMessage.success = true;
-                            }} catch (e) {{
-                                replayMessage.success = false;
-                                replayMessage.reply = e.toString();
-                            }} finally {{
-                                if (replayMessage.reply instanceof PromiseClass) {{
-                                    replayMessage.reply.then(function (result) {{
-                                        replayMessage.success = true;
-                                        replayMessage.reply = result;
-                                        thisApi.wsClient.send(__serialize(replayMessage));
-                                    }}, function (error) {{
-                                        replayMessage.success = false;
-                                        replayMessage.reply = error;
-                                        thisApi.wsClient.send(__serialize(replayMessage));
-                                    }});
-                                }} else {{
-                                    replayMessage.reply = replayMessage.reply === undefined ? null : replayMessage.reply;
-                                    thisApi.wsClient.send(__serialize(replayMessage));
-                                }}
-                            }}
-                        }} else {{
-                            thisApi.onClientFunctionNotFound(msgObj.hub, msgObj.function, msgObj.args);
-                        }}
+                        onMessageObject(msgObj);
                     }}
                 }} catch (err) {{
                     thisApi.wsClient.onMessageError(err);
@@ -263,6 +317,53 @@ function HubsAPI(serverTimeout, wsClientClass, PromiseClass) {{
         }});
     }};
 
+    function onMessageObject(msgObj) {{
+        var promiseHandler;
+        if (msgObj.hasOwnProperty('reply')) {{
+            promiseHandler = promisesHandler[msgObj.ID];
+            if (msgObj.partial) {{
+                promiseHandler.partialReplyCallbacks.forEach(function (callback) {{
+                    callback(msgObj.reply);
+                }});
+            }} else {{
+                msgObj.success ? promiseHandler.resolve(msgObj.reply) : promiseHandler.reject(msgObj.reply);
+            }}
+        }} else {{
+            msgObj.function = toCamelCase(msgObj.function);
+            var executor = thisApi[msgObj.hub].client[msgObj.function];
+            if (executor !== undefined && !msgObj.hasOwnProperty('ID')) {{
+                // notification, the server does not expect any reply
+                executor.apply(executor, msgObj.args);
+            }} else if (executor !== undefined) {{
+                var replayMessage = {{ID: msgObj.ID}};
+                try {{
+                    replayMessage.reply = executor.apply(executor, msgObj.args);
+                    replayMessage.success = true;
+                }} catch (e) {{
+                    replayMessage.success = false;
+                    replayMessage.reply = e.toString();
+                }} finally {{
+                    if (replayMessage.reply instanceof PromiseClass) {{
+                        replayMessage.reply.then(function (result) {{
+                            replayMessage.success = true;
+                            replayMessage.reply = result;
+                            thisApi.wsClient.send(serialize(replayMessage));
+                        }}, function (error) {{
+                            replayMessage.success = false;
+                            replayMessage.reply = error;
+                            thisApi.wsClient.send(serialize(replayMessage));
+                        }});
+                    }} else {{
+                        replayMessage.reply = replayMessage.reply === undefined ? null : replayMessage.reply;
+                        thisApi.wsClient.send(serialize(replayMessage));
+                    }}
+                }}
+            }} else {{
+                thisApi.onClientFunctionNotFound(msgObj.hub, msgObj.function, msgObj.args);
+            }}
+        }}
+    }}
+
     this.onClose = emptyFunction();
     this.onOpen = emptyFunction();
     this.onReconnecting = emptyFunction();
@@ -277,29 +378,62 @@ function HubsAPI(serverTimeout, wsClientClass, PromiseClass) {{
         }}
         var promise,
             timeoutID = null,
-            _reject;
+            _reject,
+            handler = {{partialReplyCallbacks: []}};
         promise = new PromiseClass(function (resolve, reject) {{
             args = Array.prototype.slice.call(args);
             var id = messageID++,
                 body = {{'hub': hubName, 'function': functionName, 'args': args, 'ID': id}};
-            promisesHandler[id] = {{}};
+            promisesHandler[id] = handler;
             promisesHandler[id].resolve = resolve;
             promisesHandler[id].reject = reject;
             timeoutID = setTimeout(timeoutError(reject), defaultRespondTimeout);
             _reject = reject;
 
-            if (thisApi.wsClient.readyState === WebSocket.CONNECTING) {{
-                messagesBeforeOpen.push(__serialize(body));
-            }} else if (thisApi.wsClient.readyState !== WebSocket.OPEN) {{
-                reject('webSocket not connected');
+            if (batchMessages !== null) {{
+                batchMessages.push({{body: body, reject: reject}});
             }} else {{
-                thisApi.wsClient.send(__serialize(body));
+                sendBody(body, [reject]);
             }}
         }});
         promise._timeoutID = timeoutID;
         promise._reject = _reject;
+        // if the server function is a generator, callback is called with each item (partial reply)
+        // and the promise is resolved when the stream ends
+        promise.onPartialReply = function (callback) {{
+            handler.partialReplyCallbacks.push(callback);
+            return promise;
+        }};
         return promise;
     }};
+
+    var sendBody = function (body, rejects) {{
+        if (thisApi.wsClient.readyState === WebSocket.CONNECTING) {{
+            messagesBeforeOpen.push(serialize(body));
+        }} else if (thisApi.wsClient.readyState !== WebSocket.OPEN) {{
+            rejects.forEach(function (reject) {{
+                reject('webSocket not connected');
+            }});
+        }} else {{
+            thisApi.wsClient.send(serialize(body));
+        }}
+    }};
+
+    // server calls done inside the callback are sent in one message, the server replies all of them in one message
+    this.batch = function (callback) {{
+        var messages;
+        batchMessages = [];
+        try {{
+            return callback();
+        }} finally {{
+            messages = batchMessages;
+            batchMessages = null;
+            if (messages.length > 0) {{
+                sendBody(messages.map(function (m) {{ return m.body; }}),
+                         messages.map(function (m) {{ return m.reject; }}));
+            }}
+        }}
+    }};
     {main}
 }}
 
@@ -1,13 +1,18 @@
+from wshubsapi.clients_attributes_index import ClientsAttributesIndex
+
+
 class ClientInHub(object):
     """ Class that wraps a client but includes de hubName
      to be able to construct the message to call client function """
 
-    def __init__(self, client, hub_name):
+    def __init__(self, client, hub_name, client_notifications=frozenset()):
         """
         :type client: wshubsapi.connected_client.ConnectedClient
         :type hub_name: str
+        :param client_notifications: names of the client functions declared as notifications in the hub
         """
         self.__hub_name = str(hub_name)
+        self.__client_notifications = client_notifications
         self.__client = client
         self.__com_environment = client.api_get_comm_environment()
 
@@ -25,21 +30,46 @@ class ClientInHub(object):
             return self.__construct_function_for_client(item)
 
     def __construct_function_for_client(self, function_name):
-        def connection_function(*args):
-            future, id_ = self.__com_environment.get_new_clients_future()
-            message = dict(function=function_name, args=list(args), hub=self.__hub_name, ID=id_)
-            msg_str = self.__com_environment.serialize_message(message)
-
-            self.__client.api_write_message(msg_str)
-            return future
+        def connection_function(*args, timeout=None, notification=None, coalesce_key=None):
+            """
+            :param timeout: seconds to wait for the client reply, if None the environment default is used
+            :param notification: if True, the client does not reply and None is returned instead of a future.
+                                 If None, it is True only if the function is declared as notification in the hub
+            :param coalesce_key: if provided, the call is sent as a notification and, while it is not written,
+                                 it is replaced by newer calls of this function with the same key
+                                 (ex: entity ID of position updates)
+            """
+            message = dict(function=function_name, args=list(args), hub=self.__hub_name)
+            if coalesce_key is not None:
+                return self.api_notify(message, coalesce_key=(self.__hub_name, function_name, coalesce_key))
+            if notification is None:
+                notification = function_name in self.__client_notifications
+            if notification:
+                return self.api_notify(message)
+            return self.api_call_function(message, timeout)
 
         return connection_function
 
+    def api_call_function(self, message, timeout=None, serialized_messages=None):
+        """
+        Sends the function message (without ID) to the client
+        :param serialized_messages: cache to reuse the serialized message between several clients
+        :rtype: Future
+        """
+        return self.__com_environment.write_client_message(self.__client, message, timeout, serialized_messages)
+
+    def api_notify(self, message, serialized_messages=None, coalesce_key=None):
+        """
+        Sends the function message to the client without ID, the client will not reply
+        :param coalesce_key: the message replaces the unsent message with the same key
+        """
+        self.__com_environment.write_client_notification(self.__client, message, serialized_messages, coalesce_key)
+
     def __setattr__(self, key, value):
         if key.startswith("_ClientInHub__") or key.startswith("__"):
             super(ClientInHub, self).__setattr__(key, value)
             return
-        self.__client.__dict__[key] = value
+        ClientsAttributesIndex.set_attribute(self.__client, key, value)
 
     def api_get_real_connected_client(self):
         return self.__client
@@ -0,0 +1,82 @@
+import threading
+
+from wshubsapi.clients_set import ClientsSet
+
+
+class ClientsAttributesIndex(object):
+    """
+    Hash indexes of the connected clients by the value of some of their attributes (ex: user_id).
+    Indexes are updated when the attributes are set through ClientInHub
+    """
+    __indexes = dict()
+    """:type : dict[str, dict[object, ClientsSet]]"""
+    __lock = threading.Lock()
+
+    def __init__(self):
+        raise Exception("Static class, do not create an instance of ClientsAttributesIndex")
+
+    @classmethod
+    def add_index(cls, attribute_name, clients=()):
+        """
+        :param clients: clients already connected to be indexed
+        :type clients: collections.Iterable[wshubsapi.connected_client.ConnectedClient]
+        """
+        with cls.__lock:
+            if attribute_name in cls.__indexes:
+                return
+            index = dict()
+            for client in clients:
+                if attribute_name in client.__dict__ and not client.api_is_closed:
+                    index.setdefault(client.__dict__[attribute_name], ClientsSet()).add(client)
+            cls.__indexes[attribute_name] = index
+
+    @classmethod
+    def remove_index(cls, attribute_name):
+        with cls.__lock:
+            cls.__indexes.pop(attribute_name, None)
+
+    @classmethod
+    def is_indexed(cls, attribute_name):
+        return attribute_name in cls.__indexes
+
+    @classmethod
+    def set_attribute(cls, client, attribute_name, value):
+        """
+        :type client: wshubsapi.connected_client.ConnectedClient
+        """
+        if attribute_name not in cls.__indexes:
+            client.__dict__[attribute_name] = value
+            return
+        with cls.__lock:
+            index = cls.__indexes[attribute_name]
+            cls.__discard(index, client, attribute_name)
+            client.__dict__[attribute_name] = value
+            if not client.api_is_closed:
+                index.setdefault(value, ClientsSet()).add(client)
+
+    @classmethod
+    def get_clients(cls, attribute_name, value):
+        """
+        :raises KeyError: if the attribute is not indexed
+        :rtype: tuple[wshubsapi.connected_client.ConnectedClient]
+        """
+        clients = cls.__indexes[attribute_name].get(value)
+        return clients.snapshot if clients is not None else ()
+
+    @classmethod
+    def remove_client(cls, client):
+        """
+        :type client: wshubsapi.connected_client.ConnectedClient
+        """
+        with cls.__lock:
+            for attribute_name, index in cls.__indexes.items():
+                cls.__discard(index, client, attribute_name)
+
+    @staticmethod
+    def __discard(index, client, attribute_name):
+        if attribute_name not in client.__dict__:
+            return
+        value = client.__dict__[attribute_name]
+        clients = index.get(value)
+        if clients is not None and clients.discard(client) and len(clients) == 0:
+            del index[value]
@@ -0,0 +1,61 @@
+import threading
+
+
+class ClientsSet(object):
+    """
+    Thread safe ordered set of connected clients.
+    Adding, removing and checking membership is O(1), iterating uses an immutable snapshot so
+    changes done while broadcasting do not affect the broadcast. The snapshot is rebuilt when it is read
+    after a change, so many changes without broadcasts (ex: clients subscribing) only cost one copy
+    """
+
+    def __init__(self):
+        self.__clients = dict()
+        """:type : dict[wshubsapi.connected_client.ConnectedClient, None]"""
+        self.__lock = threading.Lock()
+        self.__snapshot = ()
+        """:type : tuple | None  None if the set changed since the snapshot was built"""
+
+    def add(self, client):
+        """
+        :return: False if the client was already in the set
+        """
+        with self.__lock:
+            if client in self.__clients:
+                return False
+            self.__clients[client] = None
+            self.__snapshot = None
+            return True
+
+    def discard(self, client):
+        """
+        :return: False if the client was not in the set
+        """
+        with self.__lock:
+            if client not in self.__clients:
+                return False
+            del self.__clients[client]
+            self.__snapshot = None
+            return True
+
+    @property
+    def snapshot(self):
+        """
+        :rtype: tuple[wshubsapi.connected_client.ConnectedClient]
+        """
+        snapshot = self.__snapshot
+        if snapshot is None:
+            with self.__lock:
+                if self.__snapshot is None:
+                    self.__snapshot = tuple(self.__clients)
+                snapshot = self.__snapshot
+        return snapshot
+
+    def __contains__(self, client):
+        return client in self.__clients
+
+    def __len__(self):
+        return len(self.__clients)
+
+    def __iter__(self):
+        return iter(self.snapshot)
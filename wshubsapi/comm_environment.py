@@ -1,11 +1,20 @@
+import asyncio
+import functools
 import logging
 import threading
+from collections import deque
 
 from concurrent.futures import Future
 
+from wshubsapi.compact_serializer import CompactSerializer
 from wshubsapi.connected_clients_holder import ConnectedClientsHolder
 from wshubsapi.function_message import FunctionMessage
-from wshubsapi.serializer import Serializer
+from wshubsapi.hubs_inspector import HubsInspector
+from wshubsapi.message_compressor import MessageCompressor
+from wshubsapi.message_received_queue import MessageReceivedQueue
+from wshubsapi.outbound_queue import OutboundQueue
+from wshubsapi.serializer import Serializer, MsgPackSerializer
+from wshubsapi.timing_wheel import TimingWheel
 
 # do not remove this line (hubs inspector needs to find it)
 from wshubsapi import utils_api_hub
@@ -21,27 +30,90 @@ class CommEnvironment(object):
     _comm_environments = dict()
     get_instance_lock = threading.Lock()
 
-    def __init__(self, unprovided_id_template="UNPROVIDED__{}", debug_mode=True):
+    def __init__(self, unprovided_id_template="UNPROVIDED__{}", debug_mode=True, loop=None, max_workers=0,
+                 client_function_timeout=60, json_backend=None, outbound_queue_max_size=1000,
+                 outbound_overflow_policy=OutboundQueue.DISCONNECT, write_combining_window=None,
+                 compression_level=None, compression_min_size=1024):
+        """
+        :param loop: asyncio event loop. If provided, coroutine hub functions are awaited in it
+                     and the futures returned when calling client functions are asyncio futures.
+                     Without loop, calls to coroutine hub functions are replied unsuccessfully
+        :type loop: asyncio.AbstractEventLoop | None
+        :param max_workers: size of the thread pool executing hub functions. Messages of the same client are
+                            executed in arrival order, coroutine hub functions are awaited in the loop while the
+                            worker waits for them. If 0, hub functions are executed in the transport thread and
+                            coroutine hub functions are only started in arrival order
+        :param client_function_timeout: default seconds to wait for a client reply before failing its future,
+                                        None to wait forever
+        :param json_backend: json codec used by the serializer ("orjson", "ujson" or "json"),
+                             if None the fastest installed one is used
+        :param outbound_queue_max_size: max messages queued per connection waiting to be written in the transport,
+                                        streamed replies (generator hub functions) wait for the queue to drain
+        :param outbound_overflow_policy: what to do when a slow connection fills its outbound queue
+                                         ("disconnect", "drop_oldest" or "drop_newest")
+        :param write_combining_window: if not None, the messages written to a connection during this window
+                                       (seconds, 0 for one loop iteration) are sent batched in one frame
+        :param compression_level: zlib level (1-9) of the compression negotiated by the connections,
+                                  None to disable compression
+        :param compression_min_size: messages smaller than this are not compressed. Only applies to the
+                                     connections asking for compression with ?compression=deflate, with tornado
+                                     permessage-deflate (negotiated by browsers) all the messages are compressed
+        """
         self.lock = threading.Lock()
-        self.available_unprovided_ids = list()
+        self.available_unprovided_ids = deque()
+        self.__unprovided_ids_in_use = set()
         self.unprovided_id_template = unprovided_id_template
         self.last_provided_id = 0
         self.debug_mode = debug_mode
+        self.loop = loop
+        self.client_function_timeout = client_function_timeout
+        self.outbound_queue_max_size = outbound_queue_max_size
+        self.outbound_overflow_policy = outbound_overflow_policy
+        self.write_combining_window = write_combining_window
+        self.compression_level = compression_level
+        self.__compressor = None
+        if compression_level is not None:
+            self.__compressor = MessageCompressor(compression_min_size, compression_level)
 
         self.all_connected_clients = ConnectedClientsHolder.all_connected_clients
         self.__last_client_message_id = 0
         self.__new_client_message_id_lock = threading.Lock()
         self.__futures_buffer = {}
-        """:type : dict[int, Future, datetime]"""
+        """:type : dict[int, (Future, wshubsapi.connected_client.ConnectedClient, tuple)]"""
+        self.__clients_futures_ids = {}
+        """:type : dict[wshubsapi.connected_client.ConnectedClient, set[int]]"""
+        self.timing_wheel = TimingWheel()
         self._log = logging.getLogger(__name__)
-        self.serializer = Serializer()
+        self.serializer = Serializer(json_backend=json_backend)
+        self.__msgpack_serializer = None
+        self.__compact_serializers = dict()
+        """:type : dict[Serializer, CompactSerializer]"""
+        self.message_received_queue = MessageReceivedQueue(max_workers)
 
     def get_unprovided_id(self):
-        if len(self.available_unprovided_ids) > 0:
-            return self.available_unprovided_ids.pop(0)
-        while self.unprovided_id_template.format(self.last_provided_id) in self.all_connected_clients:
+        """
+        Allocates an ID for a client that did not provide one, released IDs are recycled first, needs lock
+        """
+        while len(self.available_unprovided_ids) > 0:
+            id_ = self.available_unprovided_ids.popleft()
+            if id_ not in self.all_connected_clients:
+                break
+        else:
+            id_ = self.unprovided_id_template.format(self.last_provided_id)
+            while id_ in self.all_connected_clients:
+                self.last_provided_id += 1
+                id_ = self.unprovided_id_template.format(self.last_provided_id)
             self.last_provided_id += 1
-        return self.unprovided_id_template.format(self.last_provided_id)
+        self.__unprovided_ids_in_use.add(id_)
+        return id_
+
+    def release_unprovided_id(self, id_):
+        """
+        Makes the ID available again if it was allocated with get_unprovided_id, needs lock
+        """
+        if id_ in self.__unprovided_ids_in_use:
+            self.__unprovided_ids_in_use.remove(id_)
+            self.available_unprovided_ids.append(id_)
 
     def on_opened(self, client, id_=None):
         with self.lock:
@@ -54,9 +126,12 @@ class CommEnvironment(object):
 
     def on_message(self, client, msg_str):
         try:
-            msg_str = msg_str if isinstance(msg_str, str) else msg_str.encode("utf-8")
-            msg_obj = self.serializer.unserialize(msg_str)
-            if "reply" not in msg_obj:
+            if client is not None and client.api_compressor is not None:  # only negotiated compression
+                msg_str = client.api_compressor.decompress(msg_str)
+            msg_obj = self.get_client_serializer(client).unserialize(msg_str)
+            if isinstance(msg_obj, list):
+                self.__on_batch(client, msg_str, msg_obj)
+            elif "reply" not in msg_obj:
                 self.__on_replay(client, msg_str, msg_obj)
             else:
                 self.__on_replayed(msg_obj)
@@ -66,8 +141,20 @@ class CommEnvironment(object):
 
     def on_closed(self, client):
         """:type client: wshubsapi.connected_client.ConnectedClient"""
-        ConnectedClientsHolder.pop_client(client.ID)
+        with self.lock:
+            # closing twice must not evict the new client that received the recycled ID
+            if self.all_connected_clients.get(client.ID) is client:
+                ConnectedClientsHolder.pop_client(client.ID)
+                self.release_unprovided_id(client.ID)
         client.api_is_closed = True
+        if client.api_outbound_queue is not None:
+            client.api_outbound_queue.close()
+        ConnectedClientsHolder.remove_closed_client(client)
+        with self.__new_client_message_id_lock:
+            ids = self.__clients_futures_ids.pop(client, ())
+            pending_futures = [self.__pop_client_future(id_) for id_ in ids]
+        for future in pending_futures:
+            self.call_in_loop(self.__set_future_exception, future, HubsApiException("Client disconnected"))
 
     def on_error(self, client, exception):
         self._log.exception("Error parsing message")
@@ -75,43 +162,358 @@ class CommEnvironment(object):
     def reply(self, client, reply, origin_message):
         """
         :type client: wshubsapi.connected_client.ConnectedClient
-        :param reply: serialized object to be sent as a reply of a message received
-        :param origin_message: Message received (provided for overridden functions)
+        :param reply: object to be sent as a reply of a message received (list of replies for batched messages)
+        :param origin_message: Message received (provided for overridden functions), None for partial replies
         """
-        client.api_write_message(self.serialize_message(reply))
+        client.api_write_message(self.serialize_message(reply, client))
 
-    def get_new_clients_future(self):
+    def get_new_clients_future(self, client=None, timeout=None):
+        """
+        Constructs the future of a client function call
+        :param client: client who has to reply, its pending futures fail when it is closed
+        :type client: wshubsapi.connected_client.ConnectedClient | None
+        :param timeout: seconds to wait for the reply, if None client_function_timeout is used
+        :rtype: (Future, int)
+        """
+        timeout = self.client_function_timeout if timeout is None else timeout
+        future = Future() if self.loop is None else self.loop.create_future()
         with self.__new_client_message_id_lock:
             self.__last_client_message_id += 1
             id_ = self.__last_client_message_id
-            self.__futures_buffer[id_] = Future()
-        return self.__futures_buffer[id_], id_
+            timer = self.timing_wheel.schedule(timeout, self.__on_time_out, id_) if timeout is not None else None
+            self.__futures_buffer[id_] = (future, client, timer)
+            if client is not None:
+                self.__clients_futures_ids.setdefault(client, set()).add(id_)
+        return future, id_
+
+    def get_pending_futures_count(self):
+        return len(self.__futures_buffer)
 
     def close(self, **kwargs):
-        self.message_received_queue.executor.shutdown(**kwargs)
+        """
+        Stops executing new messages, pending messages are executed before returning if wait is True (default)
+        """
+        self.message_received_queue.shutdown(**kwargs)
+        self.timing_wheel.stop()
+
+    def serialize_message(self, message, client=None):
+        """
+        :param client: if provided, message is serialized with the encoding of the client connection
+        :type client: wshubsapi.connected_client.ConnectedClient | None
+        """
+        return self.get_client_serializer(client).serialize(message)
+
+    def write_client_message(self, client, message, timeout=None, serialized_messages=None):
+        """
+        Sends the message to the client with a new ID
+        :param timeout: seconds to wait for the client reply, if None the environment default is used
+        :param serialized_messages: cache of the message already serialized (without ID) by serializer,
+                                    shared between the clients of a broadcast to serialize the message only once
+        :type client: wshubsapi.connected_client.ConnectedClient
+        :type serialized_messages: dict | None
+        :rtype: Future
+        """
+        serializer = self.get_client_serializer(client)
+        serialized_message = self.__get_serialized_message(serializer, message, serialized_messages)
+        future, id_ = self.get_new_clients_future(client, timeout)
+        client.api_write_message(serializer.append_message_id(serialized_message, id_))
+        return future
+
+    def write_client_notification(self, client, message, serialized_messages=None, coalesce_key=None):
+        """
+        Sends the message to the client without ID, so no future is created and the client does not reply
+        :param coalesce_key: if provided, the message replaces the message with the same key waiting in the
+                             client outbound queue (latest value wins for slow clients)
+        :type client: wshubsapi.connected_client.ConnectedClient
+        """
+        serializer = self.get_client_serializer(client)
+        serialized_message = self.__get_serialized_message(serializer, message, serialized_messages)
+        if coalesce_key is not None and client.api_outbound_queue is not None:
+            client.api_outbound_queue.put(serialized_message, coalesce_key)
+        else:
+            client.api_write_message(serialized_message)
+
+    def construct_outbound_queue(self, client, write_function, on_overflow=None, executor=None):
+        """
+        Constructs the outbound queue of the client connection with the environment limits
+        :param write_function: writes a message in the transport, it can return a future resolved when drained
+        :param on_overflow: called to close the connection when the queue overflows with the disconnect policy
+        :param executor: where the messages are written, it should delay the writes write_combining_window seconds
+        :type client: wshubsapi.connected_client.ConnectedClient
+        :rtype: OutboundQueue
+        """
+        join_function = None
+        if self.write_combining_window is not None:
+            join_function = functools.partial(self.join_client_messages, client)
+        client.api_outbound_queue = OutboundQueue(write_function, self.outbound_queue_max_size,
+                                                  self.outbound_overflow_policy, on_overflow, executor, join_function)
+        return client.api_outbound_queue
+
+    def join_client_messages(self, client, serialized_messages):
+        """
+        Joins messages serialized for the client in one batched frame
+        :type client: wshubsapi.connected_client.ConnectedClient
+        """
+        return self.get_client_serializer(client).join_messages(serialized_messages)
+
+    def get_outbound_queues_metrics(self):
+        """
+        :return: messages waiting in the outbound queues of the connected clients, the max depth reached
+                 by a queue, the messages discarded by the overflow policies and the messages replaced by
+                 newer ones with the same coalesce key
+        :rtype: dict[str, int]
+        """
+        queues = [c.api_outbound_queue for c in list(self.all_connected_clients.values())
+                  if c.api_outbound_queue is not None]
+        return dict(queues_count=len(queues),
+                    queued_messages=sum(q.size for q in queues),
+                    max_queued_messages=max([q.size for q in queues] or [0]),
+                    peak_size=max([q.peak_size for q in queues] or [0]),
+                    dropped_messages=sum(q.dropped_messages_count for q in queues),
+                    coalesced_messages=sum(q.coalesced_messages_count for q in queues))
+
+    def get_client_serializer(self, client):
+        if client is None or client.api_serializer is None:
+            return self.serializer
+        return client.api_serializer
+
+    def set_client_encoding(self, client, encoding, envelope=None, envelope_hash=None):
+        """
+        Sets the encoding negotiated by the connection
+        :param encoding: "json" or "msgpack" (binary frames)
+        :param envelope: "compact" to use positional envelopes with hubs and functions indexes (see CompactSerializer)
+        :param envelope_hash: hash of the client envelope tables, it has to match the server ones
+        :type client: wshubsapi.connected_client.ConnectedClient
+        """
+        if encoding in (None, "json"):
+            serializer = self.serializer
+        elif encoding == MsgPackSerializer.ENCODING:
+            if self.__msgpack_serializer is None:
+                self.__msgpack_serializer = MsgPackSerializer(self.serializer.max_depth)
+            serializer = self.__msgpack_serializer
+        else:
+            raise HubsApiException("Unknown encoding: {}".format(encoding))
+        if envelope == CompactSerializer.ENVELOPE:
+            if serializer not in self.__compact_serializers:
+                self.__compact_serializers[serializer] = CompactSerializer(serializer,
+                                                                           HubsInspector.get_envelope_tables())
+            serializer = self.__compact_serializers[serializer]
+            if envelope_hash != serializer.tables_hash:
+                raise HubsApiException("Envelope tables of the client do not match the server ones, "
+                                       "the client has to be generated again")
+        elif envelope is not None:
+            raise HubsApiException("Unknown envelope: {}".format(envelope))
+        client.api_serializer = None if serializer is self.serializer else serializer
+
+    def set_client_compression(self, client, compression):
+        """
+        Sets the compression negotiated by the connection, ignored if the environment compression is disabled
+        :param compression: "deflate" or None
+        :type client: wshubsapi.connected_client.ConnectedClient
+        """
+        if compression is None:
+            client.api_compressor = None
+        elif compression == MessageCompressor.ENCODING:
+            client.api_compressor = self.__compressor
+        else:
+            raise HubsApiException("Unknown compression: {}".format(compression))
+
+    def compress_client_message(self, client, message):
+        """
+        Compresses the message to be written if the client connection negotiated it and the message is big enough
+        :type client: wshubsapi.connected_client.ConnectedClient
+        """
+        if client.api_compressor is None:
+            return message
+        return client.api_compressor.compress(message)
 
-    def serialize_message(self, message):
-        return self.serializer.serialize(message)
+    def run_coroutine(self, coroutine):
+        """
+        Schedules the coroutine in the environment loop, it is safe to call it from any thread
+        """
+        if self.__is_in_loop_thread():
+            return self.loop.create_task(coroutine)
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def ensure_future(self, awaitable):
+        """
+        Schedules the awaitable in the environment loop, it is safe to call it from any thread
+        :rtype: asyncio.Future | Future
+        """
+        if self.loop is None:
+            raise HubsApiException("Awaitable replies need a CommEnvironment with an asyncio loop")
+        return self.run_coroutine(self.__await(awaitable))
+
+    def call_in_loop(self, callback, *args):
+        """
+        Calls the callback in the environment loop (or directly if there is no loop), it is safe to call it
+        from any thread
+        """
+        if self.loop is None or self.__is_in_loop_thread():
+            callback(*args)
+        else:
+            self.loop.call_soon_threadsafe(callback, *args)
+
+    @staticmethod
+    async def __await(awaitable):
+        return await awaitable
+
+    def __is_in_loop_thread(self):
+        try:
+            return asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            return False
+
+    def __pop_client_future(self, id_):
+        """
+        needs __new_client_message_id_lock
+        """
+        future, client, timer = self.__futures_buffer.pop(id_, (None, None, None))
+        if timer is not None:
+            self.timing_wheel.cancel(timer)
+        if client is not None:
+            client_futures_ids = self.__clients_futures_ids.get(client, set())
+            client_futures_ids.discard(id_)
+            if len(client_futures_ids) == 0:
+                self.__clients_futures_ids.pop(client, None)
+        return future
 
     def __on_time_out(self, id_):
         with self.__new_client_message_id_lock:
-            if id_ in self.__futures_buffer:
-                future = self.__futures_buffer.pop(id_)
-                future.set_exception(HubsApiException("Timeout exception"))
+            future = self.__pop_client_future(id_)
+        if future is not None:
+            self.call_in_loop(self.__set_future_exception, future, HubsApiException("Timeout exception"))
 
     def __on_replay(self, client, msg_str, msg_obj):
         hub_function = FunctionMessage(msg_obj, client, self)
-        reply = hub_function.call_function()
-        if reply is not None:
+        if hub_function.is_coroutine and self.loop is not None and not self.message_received_queue.has_workers:
+            self.run_coroutine(self.__on_replay_async(client, msg_str, hub_function))
+            return
+        # without a loop, coroutine functions are replied unsuccessfully as any other awaitable reply
+        self.message_received_queue.put(client, self.__call_function, client, msg_str, hub_function)
+
+    def __on_batch(self, client, msg_str, msg_objs):
+        """
+        Handles a batch envelope (list of messages), the replies of all the calls are sent in one batched frame
+        """
+        hub_functions = []
+        for msg_obj in msg_objs:
+            try:
+                if "reply" in msg_obj:
+                    self.__on_replayed(msg_obj)
+                else:
+                    hub_functions.append(FunctionMessage(msg_obj, client, self))
+            except Exception as e:
+                self.on_error(client, e)
+        if len(hub_functions) == 0:
+            return
+        if self.loop is not None and not self.message_received_queue.has_workers and \
+                any(hub_function.is_coroutine for hub_function in hub_functions):
+            self.run_coroutine(self.__call_batch_functions_async(client, msg_str, hub_functions))
+            return
+        self.message_received_queue.put(client, self.__call_batch_functions, client, msg_str, hub_functions)
+
+    def __call_batch_functions(self, client, msg_str, hub_functions):
+        try:
+            replies = [self.__call_hub_function(hub_function) for hub_function in hub_functions]
+            self.__reply_when_done(client, replies, msg_str, is_batch=True)
+        except Exception as e:
+            self.on_error(client, e)
+
+    async def __call_batch_functions_async(self, client, msg_str, hub_functions):
+        """
+        Batch with coroutines received without workers, it is executed in the loop
+        """
+        try:
+            replies = []
+            for hub_function in hub_functions:
+                if hub_function.is_coroutine:
+                    replies.append(await hub_function.call_function_async())
+                else:
+                    reply = hub_function.call_function()
+                    if isinstance(reply, Future):
+                        reply = await asyncio.wrap_future(reply)
+                    replies.append(reply)
+            self.reply(client, replies, msg_str)
+        except Exception as e:
+            self.on_error(client, e)
+
+    def __call_function(self, client, msg_str, hub_function):
+        try:
+            self.__reply_when_done(client, [self.__call_hub_function(hub_function)], msg_str, is_batch=False)
+        except Exception as e:
+            self.on_error(client, e)
+
+    def __call_hub_function(self, hub_function):
+        """
+        Called in the transport thread or in a worker. Coroutine functions are awaited in the loop blocking the
+        worker, so the next messages of the client are executed after them
+        """
+        if hub_function.is_coroutine and self.loop is not None:
+            return self.run_coroutine(hub_function.call_function_async()).result()
+        return hub_function.call_function()
+
+    def __reply_when_done(self, client, replies, msg_str, is_batch):
+        """
+        Sends the replies when the deferred ones (futures of reply dicts) are done, without blocking the thread
+        """
+        futures = [reply for reply in replies if isinstance(reply, Future)]
+        pending_futures = [len(futures)]
+        lock = threading.Lock()
+
+        def send_replies():
+            try:
+                done_replies = [reply.result() if isinstance(reply, Future) else reply for reply in replies]
+                self.reply(client, done_replies if is_batch else done_replies[0], msg_str)
+            except Exception as e:
+                self.on_error(client, e)
+
+        def on_done(_):
+            with lock:
+                pending_futures[0] -= 1
+                if pending_futures[0] > 0:
+                    return
+            send_replies()
+
+        if len(futures) == 0:
+            send_replies()
+        for future in futures:
+            future.add_done_callback(on_done)
+
+    async def __on_replay_async(self, client, msg_str, hub_function):
+        try:
+            reply = await hub_function.call_function_async()
             self.reply(client, reply, msg_str)
+        except Exception as e:
+            self.on_error(client, e)
 
     def __on_replayed(self, msg_obj):
-        future = self.__futures_buffer.pop(msg_obj["ID"], None)
+        with self.__new_client_message_id_lock:
+            future = self.__pop_client_future(msg_obj["ID"])
         if future is not None:
             if msg_obj["success"]:
-                future.set_result(msg_obj["reply"])
+                self.call_in_loop(self.__set_future_result, future, msg_obj["reply"])
             else:
-                future.set_exception(Exception(msg_obj["reply"]))
+                self.call_in_loop(self.__set_future_exception, future, Exception(msg_obj["reply"]))
+
+    @staticmethod
+    def __get_serialized_message(serializer, message, serialized_messages):
+        if serialized_messages is None:
+            return serializer.serialize(message)
+        serialized_message = serialized_messages.get(serializer)
+        if serialized_message is None:
+            serialized_message = serialized_messages[serializer] = serializer.serialize(message)
+        return serialized_message
+
+    @staticmethod
+    def __set_future_result(future, result):
+        if not future.done():
+            future.set_result(result)
+
+    @staticmethod
+    def __set_future_exception(future, exception):
+        if not future.done():
+            future.set_exception(exception)
 
     @classmethod
     def get_instance(cls, key="generic", **kwargs):
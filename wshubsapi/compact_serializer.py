@@ -0,0 +1,118 @@
+import hashlib
+import json
+
+
+class CompactSerializer(object):
+    """
+    Serializer wrapper using positional envelopes instead of dicts with repeated keys:
+        - call (or notification if ID is null): [0, ID, hub_index, function_index, args]
+        - reply: [1, ID, success, reply]
+        - partial reply: [2, ID, reply]
+    Hubs and functions indexes are their positions in the sorted hubs information (see
+    HubsInspector.get_envelope_tables), names not found in the tables (ex: private functions) are sent as strings.
+    Batches are lists of envelopes.
+    Clients send the hash of their tables when connecting (?envelope=compact&envelope_hash=...), connections of
+    clients generated with other tables are rejected because their indexes would call other functions
+    """
+    ENVELOPE = "compact"
+    CALL, REPLY, PARTIAL_REPLY = 0, 1, 2
+
+    def __init__(self, serializer, envelope_tables, is_client=False):
+        """
+        :type serializer: wshubsapi.serializer.Serializer
+        :param envelope_tables: list of (hub_name, server_functions_names, client_functions_names) sorted by index
+        :param is_client: if True, sent calls are server calls and received calls are client calls
+        """
+        self.serializer = serializer
+        self.max_depth = serializer.max_depth
+        self.tables_hash = self.get_tables_hash(envelope_tables)
+        self.__hubs_names = [hub_name for hub_name, _, _ in envelope_tables]
+        self.__hubs_indexes = {hub_name: i for i, hub_name in enumerate(self.__hubs_names)}
+        server_functions = [list(functions) for _, functions, _ in envelope_tables]
+        client_functions = [list(functions) for _, _, functions in envelope_tables]
+        self.__received_functions, sent_functions = (client_functions, server_functions) if is_client \
+            else (server_functions, client_functions)
+        self.__sent_functions_indexes = [{name: i for i, name in enumerate(functions)} for functions in sent_functions]
+
+    @staticmethod
+    def get_tables_hash(envelope_tables):
+        """
+        :param envelope_tables: list of (hub_name, server_functions_names, client_functions_names) sorted by index
+        :rtype: str
+        """
+        tables = [[hub_name, list(server_functions), list(client_functions)]
+                  for hub_name, server_functions, client_functions in envelope_tables]
+        return hashlib.sha1(json.dumps(tables).encode("utf-8")).hexdigest()[:16]
+
+    def serialize(self, obj):
+        """
+        :param obj: message dict or list of message dicts (batch)
+        """
+        return self.serializer.serialize(self.compact(obj))
+
+    def unserialize(self, message):
+        return self.expand(self.serializer.unserialize(message))
+
+    def append_message_id(self, serialized_message, message_id):
+        """
+        Replaces the null ID of an already serialized call
+        """
+        if isinstance(serialized_message, bytes):  # msgpack: array header, type and nil
+            return serialized_message[:2] + self.serializer.serialize(message_id) + serialized_message[3:]
+        id_index = serialized_message.index("null")
+        return serialized_message[:id_index] + self.serializer.serialize(message_id) + serialized_message[id_index + 4:]
+
+    def join_messages(self, serialized_messages):
+        """
+        Joins serialized envelopes and batches of envelopes in one batch
+        """
+        batches = [m if self.__is_batch(m) else self.__to_batch(m) for m in serialized_messages]
+        return self.serializer.join_messages(batches)
+
+    def compact(self, obj):
+        if isinstance(obj, list):
+            return [self.compact(message) for message in obj]
+        if "reply" in obj:
+            if obj.get("partial", False):
+                return [self.PARTIAL_REPLY, obj["ID"], obj["reply"]]
+            return [self.REPLY, obj["ID"], obj["success"], obj["reply"]]
+        hub_index = self.__hubs_indexes.get(obj["hub"])
+        if hub_index is None:
+            return [self.CALL, obj.get("ID"), obj["hub"], obj["function"], obj["args"]]
+        function_index = self.__sent_functions_indexes[hub_index].get(obj["function"], obj["function"])
+        return [self.CALL, obj.get("ID"), hub_index, function_index, obj["args"]]
+
+    def expand(self, obj):
+        if len(obj) == 0 or isinstance(obj[0], list):
+            return [self.expand(envelope) for envelope in obj]
+        type_ = obj[0]
+        if type_ == self.REPLY:
+            return dict(ID=obj[1], success=obj[2], reply=obj[3])
+        elif type_ == self.PARTIAL_REPLY:
+            return dict(ID=obj[1], success=True, reply=obj[2], partial=True)
+        _, id_, hub, function, args = obj
+        if not isinstance(hub, str):
+            hub, function = self.__hubs_names[hub], self.__get_received_function_name(hub, function)
+        message = dict(hub=hub, function=function, args=args)
+        if id_ is not None:
+            message["ID"] = id_
+        return message
+
+    def __get_received_function_name(self, hub_index, function):
+        if isinstance(function, str):
+            return function
+        return self.__received_functions[hub_index][function]
+
+    @staticmethod
+    def __is_batch(serialized_message):
+        if isinstance(serialized_message, bytes):
+            header = serialized_message[0]
+            items_offset = 1 if 0x90 <= header <= 0x9f else 3 if header == 0xdc else 5
+            return len(serialized_message) == items_offset or serialized_message[items_offset] not in range(3)
+        return serialized_message[1:].lstrip()[:1] in ("[", "]")
+
+    @staticmethod
+    def __to_batch(serialized_message):
+        if isinstance(serialized_message, bytes):
+            return b"\x91" + serialized_message
+        return "[" + serialized_message + "]"
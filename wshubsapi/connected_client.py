@@ -13,6 +13,13 @@ class ConnectedClient(object):
         """:type : int|None|str"""
         self.api_write_message = write_message_function
         self.api_is_closed = False
+        self.api_serializer = None
+        """:type : wshubsapi.serializer.Serializer | wshubsapi.compact_serializer.CompactSerializer | None
+        connection encoding, None to use the environment one"""
+        self.api_compressor = None
+        """:type : wshubsapi.message_compressor.MessageCompressor | None  compression negotiated by the connection"""
+        self.api_outbound_queue = None
+        """:type : wshubsapi.outbound_queue.OutboundQueue | None  messages waiting to be written in the transport"""
         self.__communication_environment = communication_environment
 
     def api_get_comm_environment(self):
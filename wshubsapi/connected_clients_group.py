@@ -2,35 +2,45 @@ from wshubsapi.client_in_hub import ClientInHub
 
 
 class ConnectedClientsGroup(object):
-    def __init__(self, connected_clients_in_group, hub_name):
+    def __init__(self, connected_clients_in_group, hub_name, client_notifications=frozenset()):
         """
         :type connected_clients_in_group: list of wshubsapi.connected_client.ConnectedClient
+        :param client_notifications: names of the client functions declared as notifications in the hub
         """
         self.hub_name = hub_name
-        self.connected_clients = list(map(lambda c: ClientInHub(c, hub_name), connected_clients_in_group))
+        self.client_notifications = client_notifications
+        self.connected_clients = [ClientInHub(c, hub_name, client_notifications) for c in connected_clients_in_group]
 
     def append(self, connected_client):
         """
         :type connected_client: connected_client.ConnectedClient
         """
-        self.connected_clients.append(ClientInHub(connected_client, self.hub_name))
+        self.connected_clients.append(ClientInHub(connected_client, self.hub_name, self.client_notifications))
 
     def __getattr__(self, item):
         """
-        :rtype: list[Future]
+        :rtype: list[Future] | None
         :param item: function name defined in the client side ("item" name keep because it is a magic function)
         """
         if item.startswith("__") and item.endswith("__"):
             return
-        functions = []
-        futures = []
-        for c in self.connected_clients:
-            functions.append(c.__getattr__(item))
-
-        def connection_functions(*args):
-            for f in functions:
-                futures.append(f(*args))
-            return futures
+
+        def connection_functions(*args, timeout=None, notification=None, coalesce_key=None):
+            message = dict(function=item, args=list(args), hub=self.hub_name)
+            # the message is serialized once and only the ID changes for each client
+            serialized_messages = dict()
+            if coalesce_key is not None:
+                coalesce_key = (self.hub_name, item, coalesce_key)
+                for c in self.connected_clients:
+                    c.api_notify(message, serialized_messages, coalesce_key)
+                return None
+            if notification is None:
+                notification = item in self.client_notifications
+            if notification:
+                for c in self.connected_clients:
+                    c.api_notify(message, serialized_messages)
+                return None
+            return [c.api_call_function(message, timeout, serialized_messages) for c in self.connected_clients]
 
         return connection_functions
 
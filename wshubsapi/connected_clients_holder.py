@@ -1,8 +1,15 @@
+import threading
+import weakref
+
+from wshubsapi.client_in_hub import ClientInHub
+from wshubsapi.clients_attributes_index import ClientsAttributesIndex
+from wshubsapi.clients_set import ClientsSet
 from wshubsapi.connected_clients_group import ConnectedClientsGroup
 
 
 class ConnectedClientsHolder:
     all_connected_clients = dict()
+    __holders = weakref.WeakSet()
 
     def __init__(self, hub_instance):
         """
@@ -10,27 +17,49 @@ class ConnectedClientsHolder:
         """
         self.hub_instance = hub_instance
         self.hub_name = self.hub_instance.__class__.__HubName__
-        self.hub_subscribers = []
+        self.hub_subscribers = ClientsSet()
+        self.__groups = dict()
+        """:type : dict[str, ClientsSet]"""
+        self.__clients_groups = dict()
+        """:type : dict[wshubsapi.connected_client.ConnectedClient, set[str]]"""
+        self.__lock = threading.Lock()
+        self.__holders.add(self)
 
     def get_all_clients(self):
-        return ConnectedClientsGroup(list(self.all_connected_clients.values()), self.hub_name)
+        return self.__construct_group(list(self.all_connected_clients.values()))
 
     def get_other_clients(self, sender):
         """
         :type sender: wshubsapi.client_in_hub.ClientInHub
         """
         connected_clients = [c for c in self.all_connected_clients.values() if c.ID != sender.ID]
-        return ConnectedClientsGroup(connected_clients, self.hub_name)
+        return self.__construct_group(connected_clients)
 
     def get_clients(self, filter_function):
         clients = filter(filter_function, self.all_connected_clients.values())
-        return ConnectedClientsGroup(list(clients), self.hub_name)
+        return self.__construct_group(list(clients))
+
+    def get_clients_by_ids(self, clients_ids):
+        """
+        Not connected IDs are ignored
+        """
+        clients = [self.all_connected_clients.get(id_) for id_ in dict.fromkeys(clients_ids)]
+        return self.__construct_group([c for c in clients if c is not None])
+
+    def get_clients_by_attribute(self, attribute_name, value):
+        """
+        Clients with the attribute (set through ClientInHub) equal to value.
+        If the attribute is indexed (see index_clients_attribute) no client is visited, otherwise all are filtered
+        """
+        if ClientsAttributesIndex.is_indexed(attribute_name):
+            return self.__construct_group(ClientsAttributesIndex.get_clients(attribute_name, value))
+        return self.get_clients(lambda c: c.__dict__.get(attribute_name) == value)
 
     def get_client(self, client_id):
         """
         :rtype: wshubsapi.client_in_hub.ClientInHub
         """
-        return ConnectedClientsGroup([self.all_connected_clients[client_id]], self.hub_name)[0]
+        return self.__construct_group([self.all_connected_clients[client_id]])[0]
 
     def get(self, filter_criteria):
         """
@@ -41,15 +70,106 @@ class ConnectedClientsHolder:
         :return: ClientInHub or ConnectedClientsGroup
         """
         if isinstance(filter_criteria, (list, tuple)):
-            return self.get_clients(lambda x: x.ID in filter_criteria)
+            return self.get_clients_by_ids(filter_criteria)
         elif hasattr(filter_criteria, '__call__'):
             return self.get_clients(filter_criteria)
         else:
             return self.get_client(filter_criteria)
 
     def get_subscribed_clients(self):
-        self.hub_subscribers = list(filter(lambda c: not c.api_is_closed, self.hub_subscribers))
-        return ConnectedClientsGroup(self.hub_subscribers, self.hub_name)
+        return self.__construct_group(self.hub_subscribers.snapshot)
+
+    def subscribe(self, client):
+        """
+        :type client: wshubsapi.connected_client.ConnectedClient | ClientInHub
+        :return: False if the client was already subscribed or it is closed
+        """
+        client = self.__get_connected_client(client)
+        with self.__lock:  # a closed client can not be subscribed after remove_client
+            if client.api_is_closed:
+                return False
+            return self.hub_subscribers.add(client)
+
+    def unsubscribe(self, client):
+        """
+        :type client: wshubsapi.connected_client.ConnectedClient | ClientInHub
+        :return: False if the client was not subscribed
+        """
+        return self.hub_subscribers.discard(self.__get_connected_client(client))
+
+    def is_subscribed(self, client):
+        return self.__get_connected_client(client) in self.hub_subscribers
+
+    def join_group(self, group_name, client):
+        """
+        Adds the client to the named group (room) of this hub, the group is created if it does not exist
+        :type client: wshubsapi.connected_client.ConnectedClient | ClientInHub
+        :return: False if the client was already in the group
+        """
+        client = self.__get_connected_client(client)
+        with self.__lock:
+            if client.api_is_closed:
+                return False
+            self.__clients_groups.setdefault(client, set()).add(group_name)
+            return self.__groups.setdefault(group_name, ClientsSet()).add(client)
+
+    def leave_group(self, group_name, client):
+        """
+        :type client: wshubsapi.connected_client.ConnectedClient | ClientInHub
+        :return: False if the client was not in the group
+        """
+        client = self.__get_connected_client(client)
+        with self.__lock:
+            return self.__leave_group(group_name, client)
+
+    def get_group(self, group_name):
+        """
+        Clients of the named group, an empty group is returned if it does not exist
+        :rtype: ConnectedClientsGroup
+        """
+        group = self.__groups.get(group_name)
+        return self.__construct_group(group.snapshot if group is not None else [])
+
+    def get_groups_names(self):
+        return list(self.__groups)
+
+    def get_client_groups_names(self, client):
+        """
+        :type client: wshubsapi.connected_client.ConnectedClient | ClientInHub
+        """
+        return list(self.__clients_groups.get(self.__get_connected_client(client), ()))
+
+    def remove_client(self, client):
+        """
+        Unsubscribes the client from the hub and removes it from all its groups
+        :type client: wshubsapi.connected_client.ConnectedClient | ClientInHub
+        """
+        client = self.__get_connected_client(client)
+        with self.__lock:
+            self.hub_subscribers.discard(client)
+            for group_name in list(self.__clients_groups.get(client, ())):
+                self.__leave_group(group_name, client)
+
+    def __leave_group(self, group_name, client):
+        group = self.__groups.get(group_name)
+        if group is None or not group.discard(client):
+            return False
+        if len(group) == 0:
+            del self.__groups[group_name]
+        client_groups = self.__clients_groups[client]
+        client_groups.discard(group_name)
+        if len(client_groups) == 0:
+            del self.__clients_groups[client]
+        return True
+
+    def __construct_group(self, connected_clients):
+        return ConnectedClientsGroup(connected_clients, self.hub_name, self.hub_instance.client_notifications)
+
+    @staticmethod
+    def __get_connected_client(client):
+        if isinstance(client, ClientInHub):
+            return client.api_get_real_connected_client()
+        return client
 
     @classmethod
     def append_client(cls, client):
@@ -62,5 +182,20 @@ class ConnectedClientsHolder:
         """
         return cls.all_connected_clients.pop(client_id, None)
 
+    @classmethod
+    def index_clients_attribute(cls, attribute_name):
+        """
+        Declares an attribute of the clients (ex: user_id) to be indexed so get_clients_by_attribute is O(1).
+        Only attributes set through ClientInHub (ex: _sender.user_id = 42) are indexed
+        """
+        ClientsAttributesIndex.add_index(attribute_name, list(cls.all_connected_clients.values()))
 
-
+    @classmethod
+    def remove_closed_client(cls, client):
+        """
+        Unsubscribes the client, removes it from the groups of all the hubs and from the attributes indexes
+        :type client: wshubsapi.connected_client.ConnectedClient
+        """
+        for holder in list(cls.__holders):
+            holder.remove_client(client)
+        ClientsAttributesIndex.remove_client(client)
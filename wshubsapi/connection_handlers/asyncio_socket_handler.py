@@ -0,0 +1,92 @@
+import asyncio
+import logging
+
+from wshubsapi.comm_environment import CommEnvironment, HubsApiException
+from wshubsapi.connected_client import ConnectedClient
+from wshubsapi.message_framer import MessageFramer
+from wshubsapi.message_separator import MessageSeparator
+from wshubsapi.outbound_queue import LoopExecutor
+
+log = logging.getLogger(__name__)
+log.addHandler(logging.NullHandler())
+
+
+class AsyncioSocketHandler(asyncio.Protocol):
+    """
+    Connection of the asyncio socket server, it speaks the same protocol as SocketHandler without a thread
+    per connection. Hub functions are executed in the loop thread, blocking hub functions should be executed
+    in the CommEnvironment worker pool (max_workers)
+    """
+    length_prefixed = False
+    """if True, messages are framed with their length (MessageFramer) instead of with a separator"""
+    max_frame_size = MessageFramer.DEFAULT_MAX_FRAME_SIZE
+
+    def __init__(self, comm_environment=None):
+        """
+        :type comm_environment: CommEnvironment | None
+        """
+        self.comm_environment = CommEnvironment.get_instance() if comm_environment is None else comm_environment
+        self.transport = None
+        """:type : asyncio.Transport"""
+        self.__message_framer = MessageFramer(self.max_frame_size) if self.length_prefixed else MessageSeparator()
+        self.__connected_client = ConnectedClient(self.comm_environment, self.write_message)
+        self.__drained_future = None
+        """:type : asyncio.Future | None  pending while the transport is paused"""
+
+    def connection_made(self, transport):
+        self.transport = transport
+        loop = asyncio.get_running_loop()
+        executor = LoopExecutor(loop, self.comm_environment.write_combining_window)
+        # messages can be written from worker threads, they are written in the loop thread
+        # waiting for the transport to drain when it is paused
+        self.comm_environment.construct_outbound_queue(self.__connected_client, self.__write_to_transport,
+                                                       on_overflow=lambda: executor.submit(transport.close),
+                                                       executor=executor)
+        self.comm_environment.on_opened(self.__connected_client)
+
+    def write_message(self, message):
+        return self.__connected_client.api_outbound_queue.put(message)
+
+    def __write_to_transport(self, message):
+        if self.transport.is_closing():
+            return None
+        log.debug("message to %s:\n%s" % (self.__connected_client.ID, message))
+        self.transport.write(self.__message_framer.frame(message))
+        return self.__drained_future
+
+    def data_received(self, data):
+        try:
+            messages = self.__message_framer.add_data(data)
+        except HubsApiException as e:
+            log.error("closing connection of {}: {}".format(self.__connected_client.ID, e))
+            self.transport.close()
+            return
+        for m in messages:
+            log.debug("Message received from ID: %s\n%s " % (str(self.__connected_client.ID), str(m)))
+            self.comm_environment.on_message(self.__connected_client, m)
+
+    def pause_writing(self):
+        self.__drained_future = asyncio.get_running_loop().create_future()
+
+    def resume_writing(self):
+        drained_future, self.__drained_future = self.__drained_future, None
+        drained_future.set_result(None)
+
+    def connection_lost(self, exc):
+        log.debug("client closed %s" % self.__connected_client.__dict__.get("ID", "None"))
+        self.comm_environment.on_closed(self.__connected_client)
+        if self.__drained_future is not None:
+            self.__drained_future.cancel()
+
+
+class LengthPrefixedAsyncioSocketHandler(AsyncioSocketHandler):
+    length_prefixed = True
+
+
+async def create_asyncio_socket_server(host, port, socket_handler_class=AsyncioSocketHandler, **kwargs):
+    """
+    Starts serving in the running loop, all the connections are handled in the loop thread
+    :param kwargs: extra arguments of loop.create_server (ex: backlog)
+    :rtype: asyncio.AbstractServer
+    """
+    return await asyncio.get_running_loop().create_server(socket_handler_class, host, port, **kwargs)
@@ -1,11 +1,14 @@
 import logging
 import socketserver
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from _socket import error
 import socket
 
 from wshubsapi.connected_client import ConnectedClient
-from wshubsapi.comm_environment import CommEnvironment
+from wshubsapi.outbound_queue import DelayedExecutor
+from wshubsapi.comm_environment import CommEnvironment, HubsApiException
+from wshubsapi.message_framer import MessageFramer
 from wshubsapi.message_separator import MessageSeparator
 
 log = logging.getLogger(__name__)
@@ -13,43 +16,75 @@ log.addHandler(logging.NullHandler())
 
 
 class SocketHandler(socketserver.BaseRequestHandler):
+    length_prefixed = False
+    """if True, messages are framed with their length (MessageFramer) instead of with a separator"""
+    max_frame_size = MessageFramer.DEFAULT_MAX_FRAME_SIZE
+
     def __init__(self, request, client_address, server):
         socketserver.BaseRequestHandler.__init__(self, request, client_address, server)
         # never enter here :O
         self.comm_environment = None
         """:type : CommEnvironment"""
         self.__connected_client = None
-        self.__message_separator = None
-        """:type : MessageSeparator"""
+        self.__message_framer = None
+        """:type : MessageSeparator | MessageFramer"""
 
     def setup(self):
         self.__connected_client = None
-        self.__message_separator = MessageSeparator()
+        self.__message_framer = MessageFramer(self.max_frame_size) if self.length_prefixed else MessageSeparator()
         self.comm_environment = CommEnvironment.get_instance()
         self.__connected_client = ConnectedClient(self.comm_environment, self.write_message)
+        # sendall blocks until the socket is drained, so messages are sent in a dedicated thread
+        self.__writer_executor = ThreadPoolExecutor(max_workers=1)
+        if self.comm_environment.write_combining_window:  # waiting for more messages to join
+            self.__writer_executor = DelayedExecutor(self.__writer_executor,
+                                                     self.comm_environment.write_combining_window)
+        self.comm_environment.construct_outbound_queue(self.__connected_client, self.__write_to_transport,
+                                                       on_overflow=self.__close_socket,
+                                                       executor=self.__writer_executor)
         self.comm_environment.on_opened(self.__connected_client)
 
     def write_message(self, message):
-        self.request.sendall(message + self.__message_separator.separator)
+        # messages can be written from several worker threads, the outbound queue sends them one by one
+        return self.__connected_client.api_outbound_queue.put(message)
+
+    def __write_to_transport(self, message):
+        self.request.sendall(self.__message_framer.frame(message))
         log.debug("message to %s:\n%s" % (self.__connected_client.ID, message))
 
+    def __close_socket(self):
+        try:
+            self.request.shutdown(socket.SHUT_RDWR)
+        except error:
+            log.debug("socket already closed")
+
     def handle(self):
         while not self.__connected_client.api_is_closed:
             try:
-                data = self.request.recv(10240)
+                messages = self.__message_framer.receive(self.request)
             except error as e:
                 if e.errno == 10054:
                     self.finish()
+            except HubsApiException as e:
+                log.error("closing connection of {}: {}".format(self.__connected_client.ID, e))
+                break
             except:
                 log.exception("error receiving data")
             else:
-                for m in self.__message_separator.add_data(data):
+                if messages is None:
+                    break
+                for m in messages:
                     log.debug("Message received from ID: %s\n%s " % (str(self.__connected_client.ID), str(m)))
                     self.comm_environment.on_message(self.__connected_client, m)
 
     def finish(self):
         log.debug("client closed %s" % self.__connected_client.__dict__.get("ID", "None"))
         self.comm_environment.on_closed(self.__connected_client)
+        self.__writer_executor.shutdown(wait=False)
+
+
+class LengthPrefixedSocketHandler(SocketHandler):
+    length_prefixed = True
 
 
 class ThreadedTCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
@@ -61,9 +96,14 @@ def create_socket_server(host, port, socket_handler_class=SocketHandler):
 
 
 class SocketClient:
+    length_prefixed = False
+    max_frame_size = MessageFramer.DEFAULT_MAX_FRAME_SIZE
+
     class Message:
         def __init__(self, message):
-            self.data = message
+            # text messages are encoded like ws4py ones
+            self.is_binary = isinstance(message, bytes)
+            self.data = message if self.is_binary else message.encode("utf-8")
 
     def __init__(self, url):
         """
@@ -74,7 +114,7 @@ class SocketClient:
         h, p = url.split(":")
         self.host, self.port = h, int(p)
         self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.__message_separator = MessageSeparator()
+        self.__message_framer = MessageFramer(self.max_frame_size) if self.length_prefixed else MessageSeparator()
 
     def connect(self):
         self.socket.connect((self.host, self.port))
@@ -84,19 +124,23 @@ class SocketClient:
         server_thread.start()
 
     def send(self, message):
-        # this will crash if not ascii
-        self.socket.sendall(message + self.__message_separator.separator)
+        self.socket.sendall(self.__message_framer.frame(message))
 
     def receive_message_thread(self):
         while True:
             try:
-                data = self.socket.recv(1024)
+                messages = self.__message_framer.receive(self.socket)
             except:
                 log.exception("Error receiving message")
                 raise
-            if data != "":
-                for m in self.__message_separator.add_data(data):
-                    self.received_message(self.Message(m))
+            if messages is None:
+                break
+            for m in messages:
+                self.received_message(self.Message(m))
 
     def received_message(self, message):
         raise NotImplemented
+
+
+class LengthPrefixedSocketClient(SocketClient):
+    length_prefixed = True
@@ -2,7 +2,9 @@ import logging
 
 from wshubsapi.connected_client import ConnectedClient
 from wshubsapi.comm_environment import CommEnvironment
+from wshubsapi.outbound_queue import LoopExecutor
 import tornado.websocket
+from tornado.ioloop import IOLoop
 
 __author__ = 'Jorge'
 log = logging.getLogger(__name__)
@@ -13,7 +15,15 @@ class ConnectionHandler(tornado.websocket.WebSocketHandler):
     def __init__(self, application, request, **kwargs):
         super(ConnectionHandler, self).__init__(application, request, **kwargs)
         self.comm_environment = CommEnvironment.get_instance()
-        self._connected_client = ConnectedClient(self.comm_environment, self.write_message)
+        self._connected_client = ConnectedClient(self.comm_environment, self._api_write_message)
+        self._io_loop = IOLoop.current()
+        self.__io_loop_executor = LoopExecutor(self._io_loop.asyncio_loop, self.comm_environment.write_combining_window)
+        # messages are written one by one waiting for the transport to drain, slow clients fill the queue.
+        # Messages can be queued from worker threads, they are written in the IOLoop thread
+        # (joined in one frame if write combining is enabled)
+        self._outbound_queue = self.comm_environment.construct_outbound_queue(
+            self._connected_client, self.__write_to_transport,
+            on_overflow=lambda: self.__io_loop_executor.submit(self.close), executor=self.__io_loop_executor)
 
     def data_received(self, chunk):
         pass
@@ -23,8 +33,37 @@ class ConnectionHandler(tornado.websocket.WebSocketHandler):
         log.debug("message to %s:\n%s" % (self._connected_client.ID, message))
         return future
 
+    def _api_write_message(self, message):
+        """
+        Queues the serialized message of the connected client, it is written when the transport is drained
+        :return: False if the message is discarded by the outbound queue
+        """
+        return self._outbound_queue.put(message)
+
+    def __write_to_transport(self, message):
+        if self.ws_connection is None or self.ws_connection.is_closing():
+            return None
+        message = self.comm_environment.compress_client_message(self._connected_client, message)
+        return self.write_message(message, isinstance(message, bytes))
+
+    def get_compression_options(self):
+        # permessage-deflate is negotiated with the clients supporting it (ex: browsers).
+        # Tornado compresses all their messages, compression_min_size is not applied
+        if self.comm_environment.compression_level is None:
+            return None
+        return dict(compression_level=self.comm_environment.compression_level)
+
     def open(self, name=None):
         client_id = name
+        # the connection can select the binary msgpack encoding with the url parameter: ?encoding=msgpack
+        # and the positional envelopes with: ?envelope=compact&envelope_hash=<hash of the client tables>.
+        # Unknown encodings or envelope tables raise HubsApiException and the connection is aborted
+        self.comm_environment.set_client_encoding(self._connected_client, self.get_argument("encoding", None),
+                                                  self.get_argument("envelope", None),
+                                                  self.get_argument("envelope_hash", None))
+        # clients not supporting permessage-deflate can ask for compressed messages with: ?compression=deflate
+        if "permessage-deflate" not in self.request.headers.get("Sec-WebSocket-Extensions", ""):
+            self.comm_environment.set_client_compression(self._connected_client, self.get_argument("compression", None))
         id_ = self.comm_environment.on_opened(self._connected_client, client_id)
         log.debug("open new connection with ID: {} ".format(id_))
 
@@ -1,6 +1,10 @@
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
 from ws4py.websocket import WebSocket
 from wshubsapi.connected_client import ConnectedClient
+from wshubsapi.outbound_queue import DelayedExecutor
 
 from wshubsapi.comm_environment import CommEnvironment
 
@@ -14,13 +18,34 @@ class ConnectionHandler(WebSocket):
         super(ConnectionHandler, self).__init__(sock, protocols, extensions, environ, heartbeat_freq)
         self.comm_environment = CommEnvironment.get_instance()
         self._connected_client = ConnectedClient(self.comm_environment, self.write_message)
+        # send blocks until the socket is drained, so messages are sent in a dedicated thread
+        self.__writer_executor = ThreadPoolExecutor(max_workers=1)
+        if self.comm_environment.write_combining_window:  # waiting for more messages to join
+            self.__writer_executor = DelayedExecutor(self.__writer_executor,
+                                                     self.comm_environment.write_combining_window)
+        self._outbound_queue = self.comm_environment.construct_outbound_queue(self._connected_client,
+                                                                              self.__write_to_transport,
+                                                                              on_overflow=self.close,
+                                                                              executor=self.__writer_executor)
 
     def write_message(self, message):
-        self.send(message)
+        return self._outbound_queue.put(message)
+
+    def __write_to_transport(self, message):
         log.debug("message to %s:\n%s" % (self._connected_client.ID, message))
+        message = self.comm_environment.compress_client_message(self._connected_client, message)
+        self.send(message, binary=isinstance(message, bytes))
 
     def opened(self):
         client_id = None
+        # the connection can select the binary msgpack encoding with the url parameter: ?encoding=msgpack
+        # and the positional envelopes with: ?envelope=compact&envelope_hash=<hash of the client tables>
+        query = parse_qs((self.environ or {}).get("QUERY_STRING", ""))
+        self.comm_environment.set_client_encoding(self._connected_client, query.get("encoding", [None])[0],
+                                                  query.get("envelope", [None])[0],
+                                                  query.get("envelope_hash", [None])[0])
+        # ws4py does not support permessage-deflate, clients can ask for compressed messages with: ?compression=deflate
+        self.comm_environment.set_client_compression(self._connected_client, query.get("compression", [None])[0])
         id_ = self.comm_environment.on_opened(self._connected_client, client_id)
         log.debug("open new connection with ID: {} ".format(id_))
 
@@ -31,3 +56,4 @@ class ConnectionHandler(WebSocket):
     def closed(self, code, reason=None):
         log.debug("client closed %s" % self._connected_client.__dict__.get("ID", "None"))
         self.comm_environment.on_closed(self._connected_client)
+        self.__writer_executor.shutdown(wait=False)
@@ -0,0 +1,25 @@
+# Measures the cost of calling a client function in all the connected clients
+import time
+
+from wshubsapi.comm_environment import CommEnvironment
+from wshubsapi.connected_client import ConnectedClient
+from wshubsapi.connected_clients_group import ConnectedClientsGroup
+
+CONNECTED_CLIENTS = 5000
+PAYLOAD_SIZES = (10, 100, 1000)
+
+
+if __name__ == '__main__':
+    comm_environment = CommEnvironment(client_function_timeout=3600)
+    clients = [ConnectedClient(comm_environment, lambda m: None) for _ in range(CONNECTED_CLIENTS)]
+    for i, client in enumerate(clients):
+        client.ID = i
+    all_clients = ConnectedClientsGroup(clients, "BenchmarkHub")
+
+    for payload_size in PAYLOAD_SIZES:
+        payload = [{"id": i, "name": "item {}".format(i), "value": i * 0.5} for i in range(payload_size)]
+        start = time.perf_counter()
+        all_clients.on_update(payload)
+        elapsed = time.perf_counter() - start
+        print("broadcast of {} items to {} clients in {:.3f}s".format(payload_size, CONNECTED_CLIENTS, elapsed))
+    comm_environment.close()
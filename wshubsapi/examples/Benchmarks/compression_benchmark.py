@@ -0,0 +1,38 @@
+# Measures the bandwidth saved and the CPU spent compressing replies of different sizes with each zlib level
+import time
+from datetime import datetime
+
+from wshubsapi.message_compressor import MessageCompressor
+from wshubsapi.serializer import Serializer
+
+LEVELS = (1, 6, 9)
+REPETITIONS = 20
+
+
+def construct_reply(rows):
+    records = [{"id": i, "name": "product {}".format(i), "price": i * 1.25, "currency": "EUR",
+                "updated": datetime(2016, 5, 4, 3, 2, i % 60), "tags": ["stock", "offer" if i % 3 else "new"]}
+               for i in range(rows)]
+    return {"ID": 1, "success": True, "reply": records}
+
+
+def measure(function, *args):
+    start = time.perf_counter()
+    for _ in range(REPETITIONS):
+        result = function(*args)
+    return (time.perf_counter() - start) / REPETITIONS, result
+
+
+if __name__ == '__main__':
+    serializer = Serializer()
+    print("{:>6} {:>5} {:>10} {:>10} {:>7} {:>14} {:>16}".format("rows", "level", "bytes", "compressed", "ratio",
+                                                               "compress (ms)", "decompress (ms)"))
+    for rows in (10, 100, 1000, 10000):
+        message = serializer.serialize(construct_reply(rows))
+        for level in LEVELS:
+            compressor = MessageCompressor(min_size=0, level=level)
+            compress_time, compressed_message = measure(compressor.compress, message)
+            decompress_time, _ = measure(compressor.decompress, compressed_message)
+            print("{:>6} {:>5} {:>10} {:>10} {:>6.1f}x {:>14.3f} {:>16.3f}".format(
+                rows, level, len(message), len(compressed_message), len(message) / len(compressed_message),
+                compress_time * 1000, decompress_time * 1000))
@@ -0,0 +1,43 @@
+# Measures the cost of opening and closing connections without provided ID (reconnection storms)
+import time
+
+from wshubsapi.comm_environment import CommEnvironment
+from wshubsapi.connected_client import ConnectedClient
+from wshubsapi.connected_clients_holder import ConnectedClientsHolder
+
+CONNECTED_CLIENTS = 10000
+CHURN_ROUNDS = 5
+
+
+def open_clients(comm_environment, count):
+    clients = [ConnectedClient(comm_environment, lambda m: None) for _ in range(count)]
+    start = time.perf_counter()
+    for client in clients:
+        comm_environment.on_opened(client)
+    return clients, time.perf_counter() - start
+
+
+def close_clients(comm_environment, clients):
+    start = time.perf_counter()
+    for client in clients:
+        comm_environment.on_closed(client)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    ConnectedClientsHolder.all_connected_clients.clear()
+    comm_environment = CommEnvironment()
+    clients, elapsed = open_clients(comm_environment, CONNECTED_CLIENTS)
+    print("opened {} clients in {:.3f}s".format(CONNECTED_CLIENTS, elapsed))
+
+    for i in range(CHURN_ROUNDS):
+        # half of the clients reconnect at the same time (ex: after a deploy)
+        reconnecting_clients = clients[::2]
+        close_time = close_clients(comm_environment, reconnecting_clients)
+        new_clients, open_time = open_clients(comm_environment, len(reconnecting_clients))
+        clients = clients[1::2] + new_clients
+        operations = 2 * len(reconnecting_clients)
+        print("round {}: {} open/close operations in {:.3f}s ({:.1f} us/operation)".format(
+            i, operations, close_time + open_time, (close_time + open_time) / operations * 1e6))
+
+    comm_environment.close()
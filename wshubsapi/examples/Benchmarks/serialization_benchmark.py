@@ -0,0 +1,35 @@
+# Measures the serialization of big replies (lists of rows)
+import time
+from datetime import datetime
+
+from wshubsapi.serializer import Serializer, JSON_BACKENDS
+
+ROWS = 10000
+REPETITIONS = 10
+
+
+class Row(object):
+    def __init__(self, i):
+        self.id = i
+        self.name = "row {}".format(i)
+        self.values = [i, i * 0.5, i * 2]
+
+
+def measure(serializer, obj):
+    start = time.perf_counter()
+    for _ in range(REPETITIONS):
+        serializer.serialize(obj)
+    return (time.perf_counter() - start) / REPETITIONS
+
+
+if __name__ == '__main__':
+    payloads = {
+        "native rows": [{"id": i, "name": "row {}".format(i), "value": i * 0.5} for i in range(ROWS)],
+        "numbers": list(range(ROWS * 10)),
+        "object rows": [Row(i) for i in range(ROWS)],
+        "rows with dates": [{"id": i, "date": datetime.now()} for i in range(ROWS)],
+    }
+    for json_backend in JSON_BACKENDS:
+        serializer = Serializer(json_backend=json_backend)
+        for name, payload in payloads.items():
+            print("{:>6} {:>16}: {:.2f} ms".format(json_backend, name, measure(serializer, payload) * 1000))
@@ -0,0 +1,107 @@
+# Measures the socket servers with many idle connections and some active ones calling a hub function.
+# usage: python socket_server_benchmark.py [asyncio|threaded]
+import asyncio
+import json
+import multiprocessing
+import resource
+import sys
+import time
+
+from wshubsapi.comm_environment import CommEnvironment
+from wshubsapi.connection_handlers.asyncio_socket_handler import create_asyncio_socket_server, \
+    LengthPrefixedAsyncioSocketHandler
+from wshubsapi.connection_handlers.socket_handler import create_socket_server, LengthPrefixedSocketHandler
+from wshubsapi.hub import Hub
+from wshubsapi.hubs_inspector import HubsInspector
+from wshubsapi.message_framer import MessageFramer
+
+HOST, PORT = "127.0.0.1", 8891
+IDLE_CONNECTIONS = 10000
+ACTIVE_CONNECTIONS = 1000
+CALLS_PER_CONNECTION = 20
+MAX_WORKERS = 8
+
+
+class BenchmarkHub(Hub):
+    def echo(self, message):
+        return message
+
+
+def raise_open_files_limit():
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def serve(server_type):
+    raise_open_files_limit()
+    HubsInspector.inspect_implemented_hubs()
+    CommEnvironment.get_instance(max_workers=MAX_WORKERS)  # hub functions are executed in a bounded pool
+    if server_type == "threaded":
+        server = create_socket_server(HOST, PORT, LengthPrefixedSocketHandler)
+        server.request_queue_size = 1024
+        server.serve_forever()
+    else:
+        async def serve_forever():
+            server = await create_asyncio_socket_server(HOST, PORT, LengthPrefixedAsyncioSocketHandler, backlog=1024)
+            await server.serve_forever()
+
+        asyncio.run(serve_forever())
+
+
+def get_process_status(pid):
+    with open("/proc/{}/status".format(pid)) as status_file:
+        status = dict(line.split(":", 1) for line in status_file)
+    return status["VmRSS"].strip(), status["Threads"].strip()
+
+
+async def open_connections(count):
+    connections = []
+    for _ in range(count):
+        connections.append(await asyncio.open_connection(HOST, PORT))
+    return connections
+
+
+async def call_echo(reader, writer, latencies):
+    message_framer = MessageFramer()
+    for i in range(CALLS_PER_CONNECTION):
+        start = time.perf_counter()
+        writer.write(message_framer.frame(json.dumps(dict(hub="BenchmarkHub", function="echo", args=[i], ID=i))))
+        messages = []
+        while not messages:
+            messages = message_framer.add_data(await reader.read(65536))
+        latencies.append(time.perf_counter() - start)
+
+
+async def run_benchmark(server_pid):
+    start = time.perf_counter()
+    idle_connections = await open_connections(IDLE_CONNECTIONS)
+    print("opened {} idle connections in {:.2f}s".format(IDLE_CONNECTIONS, time.perf_counter() - start))
+    await asyncio.sleep(1)
+    print("server memory: {}, threads: {}".format(*get_process_status(server_pid)))
+
+    active_connections = await open_connections(ACTIVE_CONNECTIONS)
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*[call_echo(reader, writer, latencies) for reader, writer in active_connections])
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    print("{} active connections: {:.0f} calls/s, latency p50 {:.1f} ms, p99 {:.1f} ms".format(
+        ACTIVE_CONNECTIONS, len(latencies) / elapsed, latencies[len(latencies) // 2] * 1000,
+        latencies[int(len(latencies) * 0.99)] * 1000))
+    print("server memory: {}, threads: {}".format(*get_process_status(server_pid)))
+
+    for _, writer in idle_connections + active_connections:
+        writer.close()
+
+
+if __name__ == '__main__':
+    server_type = sys.argv[1] if len(sys.argv) > 1 else "asyncio"
+    raise_open_files_limit()
+    server_process = multiprocessing.Process(target=serve, args=(server_type,), daemon=True)
+    server_process.start()
+    time.sleep(1)
+    print("{} socket server".format(server_type))
+    try:
+        asyncio.run(run_benchmark(server_process.pid))
+    finally:
+        server_process.terminate()
@@ -0,0 +1,26 @@
+import asyncio
+import json
+import logging.config
+
+from wshubsapi.comm_environment import CommEnvironment
+from wshubsapi.hubs_inspector import HubsInspector
+from wshubsapi.connection_handlers.asyncio_socket_handler import create_asyncio_socket_server
+
+logging.config.dictConfig(json.load(open('logging.json')))
+log = logging.getLogger(__name__)
+
+
+async def main():
+    # all the connections are handled in one thread, hub functions are executed in a pool of 8 threads
+    CommEnvironment.get_instance(loop=asyncio.get_running_loop(), max_workers=8)
+    server = await create_asyncio_socket_server("127.0.0.1", 8890)
+    await server.serve_forever()
+
+
+if __name__ == '__main__':
+    HubsInspector.include_hubs_in("*_hub.py")  # use glob path patterns
+    # construct the necessary client files in the specified path
+    HubsInspector.inspect_implemented_hubs()
+    HubsInspector.construct_python_file("../Clients/_static/hubs_api.py")
+
+    asyncio.run(main())
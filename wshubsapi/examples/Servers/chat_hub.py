@@ -1,5 +1,5 @@
 # -*- coding: utf-8 -*-
-from wshubsapi.hub import Hub
+from wshubsapi.hub import Hub, client_notification
 
 
 class ChatHub(Hub):
@@ -9,9 +9,20 @@ class ChatHub(Hub):
             other_clients.print_message(name, message)
         return len(other_clients)
 
+    def join_room(self, room, _sender):
+        return self.clients.join_group(room, _sender)
+
+    def leave_room(self, room, _sender):
+        return self.clients.leave_group(room, _sender)
+
+    def send_to_room(self, room, name, message, _sender):
+        # only the clients of the room are visited, not all the connected clients
+        self.clients.get_group(room).print_message(name, message)
+
     def _define_client_functions(self):
         """
         This function will tell the client possible client functions to be called from sever
         It is just to inform, it is not mandatory but recommended
+        print_message is a notification: the server does not wait for the clients to reply
         """
-        return dict(print_message=lambda sender_name, msg: None)
+        return dict(print_message=client_notification(lambda sender_name, msg: None))
@@ -1,10 +1,12 @@
+import asyncio
+import inspect
 import logging
 import traceback
+from concurrent.futures import Future
 
 from wshubsapi.client_in_hub import ClientInHub
 from wshubsapi.hub import UnsuccessfulReplay
 from wshubsapi.hubs_inspector import HubsInspector
-from wshubsapi.utils import get_args, SENDER_KEY_PARAMETER
 
 log = logging.getLogger(__name__)
 
@@ -16,32 +18,157 @@ class FunctionMessage:
         :type comm_environment: wshubsapi.comm_environment.CommEnvironment
         """
         self.comm_environment = comm_environment
-        self.hub_instance = HubsInspector.HUBS_DICT[msg_obj["hub"]]
-        self.hub_name = msg_obj["hub"]
+        self.hub_function = HubsInspector.get_hub_function(msg_obj["hub"], msg_obj["function"])
+        self.hub_instance = self.hub_function.hub_instance
+        self.hub_name = self.hub_function.hub_name
         self.args = msg_obj["args"]
         self.connected_client = connected_client
 
-        self.function_name = msg_obj["function"]
-        self.method = getattr(self.hub_instance, self.function_name)
+        self.function_name = self.hub_function.name
+        self.method = self.hub_function.method
         self.message_id = msg_obj.get("ID", -1)
 
+    @property
+    def is_coroutine(self):
+        return self.hub_function.is_coroutine
+
     def __execute_function(self):
         try:
-            self.__include_sender_in_args(self.method, self.args)
+            self.__include_sender_in_args(self.args)
             return True, self.method(*self.args)
         except Exception as e:
-            log.exception("Error calling hub function with: {}".format(str(self)))
-            error_info = dict(error=str(e), type=e.__class__.__name__, trace=traceback.format_exc())
-            if not self.comm_environment.debug_mode:
-                error_info.pop("trace")
-            return False, error_info
+            return False, self.__construct_error_info(e)
 
-    def call_function(self):
-        success, reply = self.__execute_function()
+    def __construct_error_info(self, e):
+        log.exception("Error calling hub function with: {}".format(str(self)))
+        error_info = dict(error=str(e), type=e.__class__.__name__, trace=traceback.format_exc())
+        if not self.comm_environment.debug_mode:
+            error_info.pop("trace")
+        return error_info
+
+    def __construct_function_reply(self, success, reply):
         if isinstance(reply, UnsuccessfulReplay):
             return self.construct_replay_dict(False, reply.reply)
         return self.construct_replay_dict(success, reply)
 
+    def call_function(self):
+        """
+        :return: reply dict, or a future of the reply dict if the hub function returns a Future or an awaitable
+                 (deferred reply). If the hub function is a generator, each item is sent as a partial reply and
+                 the returned reply (with None as reply) marks the end of the stream
+        """
+        success, reply = self.__execute_function()
+        if success and inspect.isgenerator(reply) and self.__is_in_running_loop():
+            # the loop writes the partial replies, it can not be blocked while the outbound queue drains
+            return self.__construct_deferred_reply(asyncio.get_running_loop().create_task(
+                self.__stream_generator_async(reply)))
+        elif success and inspect.isgenerator(reply):
+            success, reply = self.__stream_generator(reply)
+        elif success and inspect.isasyncgen(reply):
+            return self.__construct_deferred_reply(self.__stream_async_generator(reply))
+        if success and (isinstance(reply, Future) or inspect.isawaitable(reply)):
+            return self.__construct_deferred_reply(reply)
+        return self.__construct_function_reply(success, reply)
+
+    def __stream_generator(self, generator):
+        try:
+            for item in generator:
+                self.__send_partial_reply(item)
+                if not self.__wait_outbound_room():
+                    generator.close()
+                    break
+            return True, None
+        except Exception as e:
+            return False, self.__construct_error_info(e)
+
+    async def __stream_generator_async(self, generator):
+        for item in generator:
+            self.__send_partial_reply(item)
+            if not await self.__wait_outbound_room_async():
+                generator.close()
+                break
+
+    async def __stream_async_generator(self, generator):
+        async for item in generator:
+            self.__send_partial_reply(item)
+            if not await self.__wait_outbound_room_async():
+                await generator.aclose()
+                break
+
+    def __wait_outbound_room(self):
+        """
+        Blocks while the outbound queue of the client is full, so big streams do not overflow it
+        :return: False if the queue is closed (the client is disconnected)
+        """
+        outbound_queue = getattr(self.connected_client, "api_outbound_queue", None)
+        if outbound_queue is None:
+            return True
+        room_future = outbound_queue.get_room_future()
+        if room_future is not None:
+            room_future.result()
+        return not outbound_queue.is_closed
+
+    async def __wait_outbound_room_async(self):
+        """
+        Yields to the loop while the outbound queue of the client is full
+        :return: False if the queue is closed (the client is disconnected)
+        """
+        outbound_queue = getattr(self.connected_client, "api_outbound_queue", None)
+        if outbound_queue is None:
+            return True
+        room_future = outbound_queue.get_room_future()
+        if room_future is not None:
+            await asyncio.wrap_future(room_future)
+        return not outbound_queue.is_closed
+
+    @staticmethod
+    def __is_in_running_loop():
+        try:
+            asyncio.get_running_loop()
+            return True
+        except RuntimeError:
+            return False
+
+    def __send_partial_reply(self, item):
+        partial_reply = self.construct_replay_dict(True, item)
+        partial_reply["partial"] = True
+        self.comm_environment.reply(self.connected_client, partial_reply, None)
+
+    def __construct_deferred_reply(self, deferred):
+        """
+        :param deferred: concurrent future, asyncio future or awaitable (scheduled in the environment loop)
+        :rtype: Future
+        """
+        reply_future = Future()
+
+        def on_done(f):
+            try:
+                reply_future.set_result(self.__construct_function_reply(True, f.result()))
+            except (Exception, asyncio.CancelledError) as e:
+                reply_future.set_result(self.__construct_function_reply(False, self.__construct_error_info(e)))
+
+        try:
+            if not isinstance(deferred, Future) and not asyncio.isfuture(deferred):
+                deferred = self.comm_environment.ensure_future(deferred)
+        except Exception as e:
+            if inspect.iscoroutine(deferred):
+                deferred.close()  # avoiding "never awaited" warnings
+            return self.__construct_function_reply(False, self.__construct_error_info(e))
+        deferred.add_done_callback(on_done)
+        return reply_future
+
+    async def call_function_async(self):
+        """
+        Calls a coroutine hub function and awaits its result
+        """
+        success, reply = self.__execute_function()
+        if success:
+            try:
+                reply = await reply
+            except Exception as e:
+                success, reply = False, self.__construct_error_info(e)
+        return self.__construct_function_reply(success, reply)
+
     def construct_replay_dict(self, success=None, reply=None):
         return {
             "success": success,
@@ -51,16 +178,13 @@ class FunctionMessage:
             "ID": self.message_id
         }
 
-    def __include_sender_in_args(self, method, args):
+    def __include_sender_in_args(self, args):
         """
         :type args: list
         """
-        method_args = get_args(method, include_sender=True)
-        try:
-            sender_index = method_args.index(SENDER_KEY_PARAMETER)
-            args.insert(sender_index, ClientInHub(self.connected_client, self.hub_name))
-        except ValueError:
-            pass
+        if self.hub_function.includes_sender:
+            args.insert(self.hub_function.sender_index, ClientInHub(self.connected_client, self.hub_name,
+                                                                     self.hub_instance.client_notifications))
 
     def __str__(self):
         return """
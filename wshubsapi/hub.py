@@ -1,3 +1,5 @@
+import asyncio
+import threading
 from concurrent.futures import Future
 
 from wshubsapi import utils
@@ -11,32 +13,39 @@ class UnsuccessfulReplay:
         self.reply = reply
 
 
+def client_notification(client_function):
+    """
+    Marks a client function (defined in _define_client_functions) as notification:
+    it is sent without ID, the server does not wait for the result and the client does not reply
+    example:
+        return dict(print_message=client_notification(lambda sender_name, msg: None))
+    """
+    client_function.is_client_notification = True
+    return client_function
+
+
 class Hub(object):
     __HubName__ = None
+    _clients_bridge_timeout = 3
+    """seconds to wait for all the clients replies in _client_to_clients_bridge"""
 
     def __init__(self):
         hub_name = self.__class__.__dict__.get("__HubName__", self.__class__.__name__)
         setattr(self.__class__, "__HubName__", hub_name)
 
-        self._client_functions = self._define_client_functions()
+        self._client_notifications = frozenset()
+        self.client_functions = self._define_client_functions()
         self._clients_holder = ConnectedClientsHolder(self)
         setattr(self.__class__, "__instance__", self)
 
     def subscribe_to_hub(self, _sender):
-        if _sender.api_get_real_connected_client() in self._clients_holder.hub_subscribers:
-            return False
-        self._clients_holder.hub_subscribers.append(_sender.api_get_real_connected_client())
-        return True
+        return self._clients_holder.subscribe(_sender.api_get_real_connected_client())
 
     def unsubscribe_from_hub(self, _sender):
         """
         :type _sender: ClientInHub
         """
-        real_connected_client = _sender.api_get_real_connected_client()
-        if real_connected_client in self._clients_holder.hub_subscribers:
-            self._clients_holder.hub_subscribers.remove(real_connected_client)
-            return True
-        return False
+        return self._clients_holder.unsubscribe(_sender.api_get_real_connected_client())
 
     def get_subscribed_clients_ids(self):
         return [c.ID for c in self._clients_holder.get_subscribed_clients()]
@@ -56,6 +65,15 @@ class Hub(object):
             assert isinstance(function_name, utils.string_class)
             assert hasattr(function, '__call__')
         self._client_functions = client_functions
+        self._client_notifications = frozenset(name for name, function in client_functions.items()
+                                               if getattr(function, "is_client_notification", False))
+
+    @property
+    def client_notifications(self):
+        """
+        :return: names of the client functions declared as notifications
+        """
+        return self._client_notifications
 
     @staticmethod
     def _construct_unsuccessful_replay(reply):
@@ -83,16 +101,60 @@ class Hub(object):
         return cls.__instance__
 
     def _client_to_clients_bridge(self, clients_ids, function, args):
+        """
+        All clients are called at the same time, the reply is sent when all of them reply (or fail) or when
+        _clients_bridge_timeout expires, without blocking any thread
+        :rtype: Future
+        """
         clients = self.clients.get(clients_ids)
-        futures = getattr(clients, function)(*args)
-        if isinstance(futures, Future):
+        futures = getattr(clients, function)(*args, timeout=self._clients_bridge_timeout, notification=False)
+        if not isinstance(futures, list):
             # only one future (ex: if only one client id is provided)
-            return futures.result()
+            return self.__chain_future(futures)
+        return self.__gather_clients_futures(futures, [c.ID for c in clients])
+
+    @staticmethod
+    def __chain_future(client_future):
+        """
+        :param client_future: concurrent or asyncio future
+        :rtype: Future
+        """
+        future = Future()
+
+        def on_done(f):
+            try:
+                future.set_result(f.result())
+            except (Exception, asyncio.CancelledError) as e:
+                future.set_exception(e)
+
+        client_future.add_done_callback(on_done)
+        return future
+
+    @staticmethod
+    def __gather_clients_futures(futures, clients_ids):
+        """
+        :param futures: concurrent or asyncio futures of the client functions calls
+        :return: future of a dict with the result (or error) of each client
+        :rtype: Future
+        """
+        gathered_future = Future()
+        results = dict.fromkeys(clients_ids)
+        pending_futures = [len(futures)]
+        lock = threading.Lock()
 
-        results = dict()
-        for future, client in zip(futures, clients.connected_clients):
+        def on_done(client_id, f):
             try:
-                results[client.ID] = future.result(timeout=3)
-            except Exception as e:
-                results[client.ID] = dict(error_type=e.__class__.__name__, error=str(e))
-        return results
+                results[client_id] = f.result()
+            except (Exception, asyncio.CancelledError) as e:
+                results[client_id] = dict(error_type=e.__class__.__name__, error=str(e))
+            with lock:
+                pending_futures[0] -= 1
+                if pending_futures[0] > 0:
+                    return
+            gathered_future.set_result(results)
+
+        if len(futures) == 0:
+            gathered_future.set_result(results)
+        for client_id, future in zip(clients_ids, futures):
+            future.add_done_callback(lambda f, client_id=client_id: on_done(client_id, f))
+        return gathered_future
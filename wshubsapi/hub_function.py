@@ -0,0 +1,38 @@
+import asyncio
+import inspect
+from collections import namedtuple
+
+from wshubsapi.utils import SENDER_KEY_PARAMETER
+
+_HubFunctionBase = namedtuple("HubFunction", ["hub_name", "name", "hub_instance", "method", "sender_index",
+                                              "is_coroutine"])
+
+
+class HubFunction(_HubFunctionBase):
+    """
+    Immutable descriptor of a hub function. It is constructed once when the hubs are inspected so
+    calling the function from a message does not need any reflection
+    """
+    __slots__ = ()
+
+    @classmethod
+    def construct(cls, hub_instance, function_name):
+        """
+        :type hub_instance: wshubsapi.hub.Hub
+        :raises AttributeError: if the hub does not have the requested function
+        :rtype: HubFunction
+        """
+        method = getattr(hub_instance, function_name)
+        try:
+            parameters = list(inspect.signature(method).parameters.values())
+        except (TypeError, ValueError):
+            # not callable or not inspectable, it will fail when called with a proper error message
+            parameters = []
+        names = [p.name for p in parameters]
+        sender_index = names.index(SENDER_KEY_PARAMETER) if SENDER_KEY_PARAMETER in names else None
+        return cls(hub_instance.__HubName__, function_name, hub_instance, method, sender_index,
+                   asyncio.iscoroutinefunction(method))
+
+    @property
+    def includes_sender(self):
+        return self.sender_index is not None
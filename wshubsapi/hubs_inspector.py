@@ -9,6 +9,7 @@ from wshubsapi.client_file_generator.dart_file_generator import DartClientFileGe
 from wshubsapi.client_file_generator.js_file_generator import JSClientFileGenerator
 from wshubsapi.client_file_generator.python_file_generator import PythonClientFileGenerator
 from wshubsapi.hub import Hub
+from wshubsapi.hub_function import HubFunction
 from wshubsapi.utils import is_function_for_ws_client, get_args, get_defaults
 
 
@@ -23,6 +24,8 @@ class HubError(Exception):
 class HubsInspector:
     __hubs_constructed = False
     HUBS_DICT = {}
+    HUBS_FUNCTIONS_DICT = {}
+    """:type : dict[str, dict[str, HubFunction]]"""
     DEFAULT_JS_API_FILE_NAME = "hubsApi.js"
     DEFAULT_PY_API_FILE_NAME = "hubs_api.py"
     DEFAULT_DART_API_FILE_NAME = "hubs_api.dart"
@@ -50,9 +53,16 @@ class HubsInspector:
             if hub_name == "ws_client":
                 raise HubError("Hub's name can not be 'wsClient', it is a  reserved name")
             cls.HUBS_DICT[hub_name] = hub
+            cls._construct_hub_functions(hub)
         except TypeError as e:
             cls._handle_hub_construction_error(e, hub_class)
 
+    @classmethod
+    def _construct_hub_functions(cls, hub):
+        functions = inspect.getmembers(hub, predicate=is_function_for_ws_client)
+        hub_functions = {name: HubFunction.construct(hub, name) for name, _ in functions}
+        cls.HUBS_FUNCTIONS_DICT[hub.__HubName__] = hub_functions
+
     @classmethod
     def _ignore_hub_implementation(cls, hub_class):
         return "__HubName__" in hub_class.__dict__ and hub_class.__HubName__ is None
@@ -71,6 +81,7 @@ class HubsInspector:
     def inspect_implemented_hubs(cls, force_reconstruction=False):
         if not cls.__hubs_constructed or force_reconstruction:
             cls.HUBS_DICT.clear()
+            cls.HUBS_FUNCTIONS_DICT.clear()
             for hub_class in cls.get_all_hubs_subclasses(Hub):
                 cls._construct_hub(hub_class)
 
@@ -90,9 +101,12 @@ class HubsInspector:
         # JAVAFileGenerator.create_client_template(path, package, hubs)
 
     @classmethod
-    def construct_python_file(cls, path=DEFAULT_PY_API_FILE_NAME):
+    def construct_python_file(cls, path=DEFAULT_PY_API_FILE_NAME, asyncio_client=False):
+        """
+        :param asyncio_client: if True, constructs the asyncio client instead of the threaded (ws4py) one
+        """
         cls.inspect_implemented_hubs()
-        PythonClientFileGenerator.create_file(cls.get_hubs_information(), path)
+        PythonClientFileGenerator.create_file(cls.get_hubs_information(), path, asyncio_client)
 
     @classmethod
     def construct_dart_file(cls, path=DEFAULT_DART_API_FILE_NAME):
@@ -114,6 +128,24 @@ class HubsInspector:
             hub = hub.__HubName__
         return cls.HUBS_DICT[hub]
 
+    @classmethod
+    def get_hub_function(cls, hub_name, function_name):
+        """
+        Returns the precompiled descriptor of a hub function.
+        Functions not found in the dispatch table are constructed, only public functions (added after the
+        inspection) are cached so clients can not grow the table sending random names
+        :raises KeyError: if hub does not exist
+        :raises AttributeError: if function does not exist in the hub
+        :rtype: HubFunction
+        """
+        try:
+            return cls.HUBS_FUNCTIONS_DICT[hub_name][function_name]
+        except KeyError:
+            hub_function = HubFunction.construct(cls.HUBS_DICT[hub_name], function_name)
+            if is_function_for_ws_client(hub_function.method):
+                cls.HUBS_FUNCTIONS_DICT.setdefault(hub_name, {})[function_name] = hub_function
+            return hub_function
+
     @classmethod
     def get_hubs_information(cls):
         info_report = OrderedDict()
@@ -139,6 +171,16 @@ class HubsInspector:
         info_report = OrderedDict(sorted(info_report.items()))
         return info_report
 
+    @classmethod
+    def get_envelope_tables(cls):
+        """
+        Hubs and functions names sorted by their index in the compact envelope (see CompactSerializer)
+        :rtype: list[(str, list[str], list[str])]
+        """
+        cls.inspect_implemented_hubs()
+        return [(hub_name, list(hub_info["serverMethods"]), list(hub_info["clientMethods"]))
+                for hub_name, hub_info in cls.get_hubs_information().items()]
+
     @classmethod
     def include_hubs_in(cls, paths):
         if paths not in (tuple, list, set):
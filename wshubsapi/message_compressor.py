@@ -0,0 +1,51 @@
+import zlib
+
+
+class MessageCompressor(object):
+    """
+    Compresses (zlib deflate) the serialized messages bigger than min_size.
+    Compressed messages are sent in binary frames and they are recognized by the zlib header,
+    a serialized message (json or msgpack) never starts with it
+    """
+    ENCODING = "deflate"
+    ZLIB_HEADER = 0x78
+
+    def __init__(self, min_size=1024, level=6, max_decompressed_size=16 * 1024 * 1024):
+        """
+        :param min_size: smaller messages are not compressed (compressing them costs more CPU than it saves)
+        :param level: zlib compression level, from 1 (fastest) to 9 (smallest)
+        :param max_decompressed_size: received messages decompressing to more bytes are rejected (zip bombs)
+        """
+        self.min_size = min_size
+        self.level = level
+        self.max_decompressed_size = max_decompressed_size
+
+    def compress(self, message):
+        """
+        :type message: str | bytes
+        :return: the compressed message (bytes) or the same message if it is smaller than min_size
+        """
+        if len(message) < self.min_size:
+            return message
+        if isinstance(message, str):
+            message = message.encode("utf-8")
+        return zlib.compress(message, self.level)
+
+    @classmethod
+    def is_compressed(cls, message):
+        return isinstance(message, (bytes, bytearray)) and len(message) > 0 and message[0] == cls.ZLIB_HEADER
+
+    def decompress(self, message):
+        """
+        :return: the decompressed message (bytes) or the same message if it is not compressed
+        :raises ValueError: if the decompressed message is bigger than max_decompressed_size or it is truncated
+        """
+        if not self.is_compressed(message):
+            return message
+        decompressor = zlib.decompressobj()
+        decompressed_message = decompressor.decompress(message, self.max_decompressed_size)
+        if decompressor.unconsumed_tail:
+            raise ValueError("Decompressed message exceeds {} bytes".format(self.max_decompressed_size))
+        if not decompressor.eof:
+            raise ValueError("Truncated compressed message")
+        return decompressed_message
@@ -0,0 +1,106 @@
+import struct
+
+from wshubsapi.comm_environment import HubsApiException
+
+
+class MessageFramer(object):
+    """
+    Length prefixed framing: each frame is the payload length (4 bytes, big endian) followed by the payload.
+    Data is received (recv_into) in a buffer big enough for the frame being received, so payloads are only
+    copied once, when their frame is complete. Payloads can contain any byte.
+    The buffer is allocated when the first data is received, idle connections do not use memory
+    """
+    HEADER = struct.Struct("!I")
+    DEFAULT_MAX_FRAME_SIZE = 64 * 1024 * 1024
+
+    def __init__(self, max_frame_size=DEFAULT_MAX_FRAME_SIZE, buffer_size=64 * 1024):
+        """
+        :param max_frame_size: bigger frames raise HubsApiException, the connection should be closed
+        :param buffer_size: size of the receiving buffer, it grows for bigger frames
+        """
+        self.max_frame_size = max_frame_size
+        self.buffer_size = buffer_size
+        self.__buffer = bytearray()
+        self.__view = memoryview(self.__buffer)
+        self.__start = 0  # first received byte not returned yet
+        self.__end = 0  # first free byte
+
+    def frame(self, message):
+        """
+        :type message: str | bytes
+        :rtype: bytes
+        """
+        if isinstance(message, str):
+            message = message.encode("utf-8")
+        return self.HEADER.pack(len(message)) + message
+
+    def receive(self, socket):
+        """
+        Receives available data from the socket
+        :return: list of the payloads (bytes) of the completed frames or None if the connection was closed
+        """
+        self.__reserve_space()
+        received_bytes = socket.recv_into(self.__view[self.__end:])
+        if received_bytes == 0:
+            return None
+        self.__end += received_bytes
+        return self.__pop_payloads()
+
+    def add_data(self, data):
+        """
+        Adds already received data, used when the data can not be received with recv_into
+        :return: list of the payloads (bytes) of the completed frames
+        """
+        data = memoryview(data)
+        payloads = []
+        while len(data) > 0:
+            self.__reserve_space()
+            size = min(len(data), len(self.__buffer) - self.__end)
+            self.__view[self.__end:self.__end + size] = data[:size]
+            self.__end += size
+            data = data[size:]
+            payloads.extend(self.__pop_payloads())
+        return payloads
+
+    def __pop_payloads(self):
+        payloads = []
+        while self.__end - self.__start >= self.HEADER.size:
+            payload_start = self.__start + self.HEADER.size
+            payload_end = payload_start + self.__get_payload_size()
+            if payload_end > self.__end:
+                break
+            payloads.append(bytes(self.__view[payload_start:payload_end]))
+            self.__start = payload_end
+        if self.__start == self.__end:
+            self.__start = self.__end = 0
+            if len(self.__buffer) > self.buffer_size:  # releasing the memory of big frames
+                self.__set_buffer(bytearray(self.buffer_size))
+        return payloads
+
+    def __get_payload_size(self):
+        size = self.HEADER.unpack_from(self.__buffer, self.__start)[0]
+        if size > self.max_frame_size:
+            raise HubsApiException("Frame of {} bytes exceeds the max frame size ({})".format(size,
+                                                                                             self.max_frame_size))
+        return size
+
+    def __reserve_space(self):
+        """
+        Ensures there is free space after the received data and the whole pending frame fits in the buffer
+        """
+        pending_size = self.__end - self.__start
+        frame_size = self.HEADER.size
+        if pending_size >= self.HEADER.size:
+            frame_size += self.__get_payload_size()
+        if self.__end < len(self.__buffer) and self.__start + frame_size <= len(self.__buffer):
+            return
+        pending_data = bytes(self.__view[self.__start:self.__end])
+        if frame_size > len(self.__buffer) or pending_size == len(self.__buffer):
+            self.__set_buffer(bytearray(max(frame_size, pending_size + self.buffer_size)))
+        self.__view[:pending_size] = pending_data
+        self.__start, self.__end = 0, pending_size
+
+    def __set_buffer(self, buffer):
+        self.__view.release()
+        self.__buffer = buffer
+        self.__view = memoryview(buffer)
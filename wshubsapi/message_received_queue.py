@@ -0,0 +1,81 @@
+import logging
+import threading
+from collections import deque
+
+from concurrent.futures import ThreadPoolExecutor
+
+log = logging.getLogger(__name__)
+
+
+class MessageReceivedQueue(object):
+    """
+    Executes the received messages in a bounded thread pool.
+    Messages of the same client are executed in arrival order while messages of different clients run in parallel
+    """
+
+    def __init__(self, max_workers=0):
+        """
+        :param max_workers: number of threads of the pool, if 0 messages are executed synchronously when received
+        """
+        self.executor = ThreadPoolExecutor(max_workers) if max_workers > 0 else None
+        """:type : ThreadPoolExecutor | None"""
+        self.__lock = threading.Lock()
+        self.__clients_queues = dict()
+        """:type : dict[wshubsapi.connected_client.ConnectedClient, deque]"""
+        self.__is_shutdown = False
+
+    @property
+    def has_workers(self):
+        return self.executor is not None
+
+    def put(self, client, function, *args):
+        """
+        Schedules function(*args) after the pending messages of the client
+        :type client: wshubsapi.connected_client.ConnectedClient
+        """
+        if self.executor is None:
+            function(*args)
+            return
+        with self.__lock:
+            if self.__is_shutdown:
+                raise RuntimeError("Can not schedule new messages after shutdown")
+            client_queue = self.__clients_queues.get(client)
+            if client_queue is not None:
+                # a worker is already executing this client's messages, it will execute this one afterwards
+                client_queue.append((function, args))
+                return
+            self.__clients_queues[client] = deque([(function, args)])
+            self.executor.submit(self.__execute_client_messages, client)
+
+    def get_pending_messages_count(self, client=None):
+        with self.__lock:
+            if client is not None:
+                return len(self.__clients_queues.get(client, ()))
+            return sum(len(q) for q in self.__clients_queues.values())
+
+    def shutdown(self, wait=True):
+        """
+        Stops accepting messages, the already received messages are executed before the threads finish
+        """
+        with self.__lock:
+            self.__is_shutdown = True
+        if self.executor is not None:
+            self.executor.shutdown(wait=wait)
+
+    def __execute_client_messages(self, client):
+        client_queue = self.__clients_queues[client]
+        while True:
+            function, args = client_queue[0]
+            try:
+                function(*args)
+            except Exception:
+                log.exception("Error executing message of client: {}".format(client))
+            with self.__lock:
+                client_queue.popleft()
+                if len(client_queue) == 0:
+                    del self.__clients_queues[client]
+                    return
+                if not self.__is_shutdown:
+                    # yielding the worker so other clients are not starved by a chatty one
+                    self.executor.submit(self.__execute_client_messages, client)
+                    return
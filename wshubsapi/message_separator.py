@@ -1,9 +1,29 @@
 class MessageSeparator:
     DEFAULT_API_SEP = "*API_SEP*"
 
-    def __init__(self, separator=DEFAULT_API_SEP):
+    def __init__(self, separator=DEFAULT_API_SEP, receive_size=10240):
         self.buffer = ""
         self.separator = separator
+        self.receive_size = receive_size
+
+    def frame(self, message):
+        """
+        :type message: str | bytes
+        :rtype: bytes
+        """
+        if not isinstance(message, str):
+            message = message.decode("utf-8")
+        return (message + self.separator).encode("utf-8")
+
+    def receive(self, socket):
+        """
+        Receives available data from the socket
+        :return: list of the completed messages or None if the connection was closed
+        """
+        data = socket.recv(self.receive_size)
+        if not data:
+            return None
+        return self.add_data(data)
 
     def add_data(self, data):
         data = data if isinstance(data, str) else data.decode('utf-8')
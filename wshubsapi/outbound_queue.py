@@ -0,0 +1,234 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+
+from concurrent.futures import Future
+
+log = logging.getLogger(__name__)
+
+
+class OutboundQueue(object):
+    """
+    Bounded queue of the messages to be written to a connection.
+    Only one message is written at a time: if the write function returns a future (ex: tornado write_message),
+    the next message is written when the future is done (the transport is drained).
+    When the queue is full the overflow policy is applied:
+        - DISCONNECT: the queued messages are discarded and on_overflow is called to close the connection
+        - DROP_OLDEST: the oldest queued message is discarded
+        - DROP_NEWEST: the new message is discarded
+    Messages put with a coalesce key replace the queued (not written yet) message with the same key,
+    so a slow connection only receives the latest value.
+    If join_function is provided, the messages queued when writing are joined and written as one message.
+    Producers of many messages (ex: streamed replies) wait for get_room_future instead of overflowing the queue
+    """
+    DISCONNECT = "disconnect"
+    DROP_OLDEST = "drop_oldest"
+    DROP_NEWEST = "drop_newest"
+    OVERFLOW_POLICIES = (DISCONNECT, DROP_OLDEST, DROP_NEWEST)
+
+    def __init__(self, write_function, max_size=1000, overflow_policy=DISCONNECT, on_overflow=None, executor=None,
+                 join_function=None, max_joined_messages=100):
+        """
+        :param write_function: writes a message in the transport, it can return a future resolved when drained
+        :param on_overflow: function called without arguments when the queue overflows with DISCONNECT policy
+        :param executor: if provided, blocking write functions are called in the executor so the thread putting
+                         messages is not blocked (ex: socket.sendall)
+        :param join_function: joins a list of messages in one message (write combining)
+        :param max_joined_messages: max messages joined in one write
+        :type executor: concurrent.futures.Executor | DelayedExecutor | None
+        """
+        if overflow_policy not in self.OVERFLOW_POLICIES:
+            raise ValueError("Unknown overflow policy: {}".format(overflow_policy))
+        self.write_function = write_function
+        self.max_size = max_size
+        self.overflow_policy = overflow_policy
+        self.on_overflow = on_overflow
+        self.executor = executor
+        self.join_function = join_function
+        self.max_joined_messages = max_joined_messages
+        self.peak_size = 0
+        self.dropped_messages_count = 0
+        self.coalesced_messages_count = 0
+        self.is_closed = False
+        self.__messages = deque()
+        """:type : deque[list]  [coalesce_key, message] entries"""
+        self.__coalesced_entries = dict()
+        self.__lock = threading.Lock()
+        self.__is_writing = False
+        self.__room_futures = []
+        """:type : list[Future]  resolved when the queue is drained below a quarter of max_size"""
+
+    @property
+    def size(self):
+        return len(self.__messages)
+
+    def put(self, message, coalesce_key=None):
+        """
+        :param coalesce_key: hashable key, if a queued message has the same key it is replaced by this message
+        :return: False if the message is discarded
+        """
+        with self.__lock:
+            if self.is_closed:
+                return False
+            if coalesce_key is not None and coalesce_key in self.__coalesced_entries:
+                self.__coalesced_entries[coalesce_key][1] = message
+                self.coalesced_messages_count += 1
+                return True
+            overflowed = len(self.__messages) >= self.max_size
+            if overflowed:
+                self.dropped_messages_count += 1
+                if self.overflow_policy == self.DROP_NEWEST:
+                    return False
+                elif self.overflow_policy == self.DROP_OLDEST:
+                    self.__pop_entry()
+                    overflowed = False
+                else:
+                    self.dropped_messages_count += len(self.__messages)
+                    self.is_closed = True
+                    self.__messages.clear()
+                    self.__coalesced_entries.clear()
+                    room_futures, self.__room_futures = self.__room_futures, []
+            if not overflowed:
+                entry = [coalesce_key, message]
+                self.__messages.append(entry)
+                if coalesce_key is not None:
+                    self.__coalesced_entries[coalesce_key] = entry
+                self.peak_size = max(self.peak_size, len(self.__messages))
+                start_writing = not self.__is_writing
+                self.__is_writing = True
+        if overflowed:
+            log.warning("Outbound queue overflow, closing slow connection")
+            self.__set_results(room_futures)
+            if self.on_overflow is not None:
+                self.on_overflow()
+            return False
+        if start_writing and self.executor is not None:
+            self.executor.submit(self.__write_messages)
+        elif start_writing:
+            self.__write_messages()
+        return True
+
+    def get_room_future(self):
+        """
+        :return: None if the queue is less than half full, otherwise a future resolved when the queue is drained
+                 below a quarter of max_size (or closed)
+        :rtype: Future | None
+        """
+        with self.__lock:
+            if self.is_closed or len(self.__messages) < max(1, self.max_size // 2):
+                return None
+            future = Future()
+            self.__room_futures.append(future)
+            return future
+
+    def close(self):
+        """
+        Discards the pending messages, new messages are not accepted
+        """
+        with self.__lock:
+            self.is_closed = True
+            self.__messages.clear()
+            self.__coalesced_entries.clear()
+            room_futures, self.__room_futures = self.__room_futures, []
+        self.__set_results(room_futures)
+
+    def __write_messages(self):
+        while True:
+            with self.__lock:
+                if len(self.__messages) == 0:
+                    self.__is_writing = False
+                    return
+                if self.join_function is None:
+                    messages = [self.__pop_entry()]
+                else:
+                    messages = [self.__pop_entry() for _ in range(min(len(self.__messages), self.max_joined_messages))]
+                room_futures = []
+                if len(self.__room_futures) > 0 and len(self.__messages) <= self.max_size // 4:
+                    room_futures, self.__room_futures = self.__room_futures, []
+            self.__set_results(room_futures)
+            try:
+                message = messages[0] if len(messages) == 1 else self.join_function(messages)
+                result = self.write_function(message)
+            except Exception:
+                log.exception("Error writing message")
+                continue
+            if hasattr(result, "add_done_callback") and not result.done():
+                # pausing until the transport is drained
+                result.add_done_callback(self.__on_written)
+                return
+
+    def __pop_entry(self):
+        """
+        needs __lock
+        """
+        coalesce_key, message = self.__messages.popleft()
+        if coalesce_key is not None:
+            del self.__coalesced_entries[coalesce_key]
+        return message
+
+    @staticmethod
+    def __set_results(futures):
+        for future in futures:
+            future.set_result(None)
+
+    def __on_written(self, future):
+        if not future.cancelled() and future.exception() is not None:
+            log.debug("Error writing message: {}".format(future.exception()))
+        self.__write_messages()
+
+
+class DelayedExecutor(object):
+    """
+    Executor wrapper calling the submitted functions after a delay,
+    so the messages put in an OutboundQueue meanwhile are joined in one write
+    """
+
+    def __init__(self, executor, delay):
+        """
+        :type executor: concurrent.futures.Executor
+        :param delay: seconds to wait before calling the submitted functions
+        """
+        self.executor = executor
+        self.delay = delay
+
+    def submit(self, function, *args):
+        return self.executor.submit(self.__call_delayed, function, *args)
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait)
+
+    def __call_delayed(self, function, *args):
+        time.sleep(self.delay)
+        return function(*args)
+
+
+class LoopExecutor(object):
+    """
+    Minimal executor calling the submitted functions in the asyncio loop thread (transports are not thread safe).
+    Used by the tornado and asyncio socket handlers (tornado runs in an asyncio loop)
+    """
+
+    def __init__(self, loop, delay=None):
+        """
+        :type loop: asyncio.AbstractEventLoop
+        :param delay: if None, functions submitted from the loop thread are called immediately.
+                      Otherwise, they are called after delay seconds (0 for the next loop iteration)
+        """
+        self.loop = loop
+        self.delay = delay
+
+    def submit(self, function, *args):
+        if self.delay:
+            self.loop.call_soon_threadsafe(self.loop.call_later, self.delay, function, *args)
+        elif self.delay is None and self.__is_in_loop_thread():
+            function(*args)
+        else:
+            self.loop.call_soon_threadsafe(function, *args)
+
+    def __is_in_loop_thread(self):
+        try:
+            return asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            return False
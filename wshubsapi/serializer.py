@@ -1,66 +1,165 @@
 import json
-from datetime import datetime
+import logging
+from collections import OrderedDict
+from datetime import datetime, timezone
 
-import collections
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+log = logging.getLogger(__name__)
+
+JSON_BACKENDS = OrderedDict()
+"""available json codecs sorted by preference, name: (dumps, loads)"""
+
+try:
+    import orjson
+
+    JSON_BACKENDS["orjson"] = (lambda obj: orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode("utf-8"),
+                               orjson.loads)
+except ImportError:
+    pass
+
+try:
+    import ujson
+
+    JSON_BACKENDS["ujson"] = (lambda obj: ujson.dumps(obj, ensure_ascii=False), ujson.loads)
+except ImportError:
+    pass
+
+JSON_BACKENDS["json"] = (json.dumps, json.loads)
 
 
 class Serializer:
     handlers = {}
     DATE_TAME_KEY = "__date_time__"
-    __epoch = datetime.utcfromtimestamp(0)
+    NATIVE_TYPES = (type(None), bool, int, float, str)
+    _epoch = datetime.utcfromtimestamp(0)
 
-    def __init__(self, max_depth=15):
+    def __init__(self, max_depth=15, json_backend=None):
+        """
+        :param json_backend: "orjson", "ujson" or "json". If None, the fastest installed backend is used.
+                             If the requested backend is not installed, the standard json module is used
+        """
         self.max_depth = max_depth
+        if json_backend is None:
+            json_backend = next(iter(JSON_BACKENDS))
+        elif json_backend not in JSON_BACKENDS:
+            log.warning("json backend {} not available, using json".format(json_backend))
+            json_backend = "json"
+        self.json_backend = json_backend
+        self.__dumps, self.__loads = JSON_BACKENDS[json_backend]
+        self.__reset_type_handlers()
 
     def serialize(self, obj):
-        return json.dumps(self.__jsonize(obj, 0))
+        jsonized_obj = self._jsonize(obj, 0)
+        try:
+            return self.__dumps(jsonized_obj)
+        except (TypeError, OverflowError):
+            # fast backends do not support everything the standard module does (ex: integers bigger than 64 bits)
+            return json.dumps(jsonized_obj)
+
+    def append_message_id(self, serialized_message, message_id):
+        """
+        Adds the ID to an already serialized message (dict) without serializing it again
+        """
+        return "{},\"ID\":{}}}".format(serialized_message[:-1], self.__dumps(message_id))
 
-    def __jsonize(self, obj, depth=0):
-        handled_types = self.handlers.keys()
+    def join_messages(self, serialized_messages):
+        """
+        Joins already serialized messages in one batched message (list) without serializing them again,
+        batched messages are flattened so the clients receive a list of messages
+        """
+        items = []
+        for serialized_message in serialized_messages:
+            if serialized_message[0] != "[":
+                items.append(serialized_message)
+            elif len(serialized_message) > 2:
+                items.append(serialized_message[1:-1])
+        return "[{}]".format(",".join(items))
+
+    def _jsonize(self, obj, depth=0):
+        if depth == 0 and self.handlers != self.__handlers_snapshot:
+            self.__reset_type_handlers()
         depth += 1
         if depth > self.max_depth:
             return "..."
-        for class_ in handled_types:
-            if isinstance(obj, class_):
-                return self.__jsonize(self.handlers[class_](obj, depth), depth)
-        if obj is None:
-            return None
-        elif isinstance(obj, (int, str, float)):
-            return obj
-        elif isinstance(obj, datetime):
-            return self.__datetime_handler(obj)
-        elif isinstance(obj, (list, tuple, set)):
-            return self.__list_handler(obj, depth)
-        elif isinstance(obj, dict):
-            return self.__dict_handler(obj, depth)
+        try:
+            handler = self.__type_handlers[type(obj)]
+        except KeyError:
+            handler = self.__type_handlers[type(obj)] = self.__resolve_type_handler(type(obj))
+        return handler(obj, depth)
+
+    def __reset_type_handlers(self):
+        self.__handlers_snapshot = dict(self.handlers)
+        self.__type_handlers = {}
+        """:type : dict[type, (object, int) -> object]"""
+        self.__native_types = frozenset(t for t in self.NATIVE_TYPES
+                                        if self.__resolve_type_handler(t) == self.__native_handler)
+
+    def __resolve_type_handler(self, class_):
+        """
+        Finds the handler of a type only once, registered handlers have priority (following the MRO of the type)
+        """
+        for handled_class in class_.__mro__:
+            if handled_class in self.handlers:
+                return self.__custom_handler(self.handlers[handled_class])
+        for handled_class, custom_handler in self.handlers.items():
+            if issubclass(class_, handled_class):  # abstract classes not found in the MRO
+                return self.__custom_handler(custom_handler)
+        if issubclass(class_, self.NATIVE_TYPES):
+            return self.__native_handler
+        elif issubclass(class_, datetime):
+            return self.__datetime_type_handler
+        elif issubclass(class_, (list, tuple, set)):
+            return self.__list_handler
+        elif issubclass(class_, dict):
+            return self.__dict_handler
         else:
-            return self.__object_handler(obj, depth)
+            return self.__object_handler
+
+    def __custom_handler(self, handler):
+        def custom_handler(obj, depth):
+            return self._jsonize(handler(obj, depth), depth)
+
+        return custom_handler
+
+    @staticmethod
+    def __native_handler(obj, depth):
+        return obj
+
+    def __datetime_type_handler(self, obj, depth):
+        return self._datetime_handler(obj)
 
     def __list_handler(self, obj: list, depth):
-        serialized_list = []
-        obj = list(obj)
-        for item in obj:
-            serialized_list.append(self.__jsonize(item, depth))
-        return serialized_list
+        if depth < self.max_depth and self.__native_types.issuperset(map(type, obj)):
+            # only json native items, nothing to jsonize
+            return list(obj)
+        return [self._jsonize(item, depth) for item in obj]
 
     def __dict_handler(self, obj: dict, depth):
-        serialized_dict = {}
-        for key, value in obj.items():
-            serialized_dict[key] = self.__jsonize(value, depth)
-        return serialized_dict
+        if depth < self.max_depth and self.__native_types.issuperset(map(type, obj.values())):
+            return dict(obj)
+        return {key: self._jsonize(value, depth) for key, value in obj.items()}
 
-    def __datetime_handler(self, obj: datetime):
-        time_stamp = (obj - self.__epoch).total_seconds() * 1000.0
+    def _datetime_handler(self, obj: datetime):
+        time_stamp = (obj - self._epoch).total_seconds() * 1000.0
         return {self.DATE_TAME_KEY: int(time_stamp)}
 
     def __object_handler(self, obj: object, depth):
         attributes = {key: value for key, value in obj.__dict__.items()
-                      if not isinstance(value, collections.Callable) and
+                      if not callable(value) and
                       not "key".startswith("_")}
         return self.__dict_handler(attributes, depth)
 
     def unserialize(self, message_str):
-        return self.__unjsonize(json.loads(message_str))
+        obj = self.__loads(message_str)
+        date_time_key = self.DATE_TAME_KEY if isinstance(message_str, str) else self.DATE_TAME_KEY.encode()
+        if date_time_key not in message_str:
+            # nothing to convert, avoiding walking the whole object
+            return obj
+        return self.__unjsonize(obj)
 
     def __unjsonize(self, obj):
         if isinstance(obj, (list, tuple, set)):
@@ -70,3 +169,67 @@ class Serializer:
                 return datetime.utcfromtimestamp(obj[self.DATE_TAME_KEY]/1000.0)
             return {key: self.__unjsonize(item) for key, item in obj.items()}
         return obj
+
+
+class MsgPackSerializer(Serializer):
+    """
+    Binary MessagePack serializer, datetimes are sent with the native msgpack timestamp extension
+    """
+    ENCODING = "msgpack"
+    __TIMESTAMP_MARKERS = (b"\xd6\xff", b"\xd7\xff", b"\xc7\x0c\xff")  # fixext4, fixext8 and ext8 of type -1
+
+    def __init__(self, max_depth=15):
+        if msgpack is None:
+            raise ImportError("msgpack package is necessary to use the msgpack encoding")
+        super(MsgPackSerializer, self).__init__(max_depth, json_backend="json")
+
+    def serialize(self, obj):
+        return msgpack.packb(self._jsonize(obj, 0), use_bin_type=True)
+
+    def append_message_id(self, serialized_message, message_id):
+        map_header = serialized_message[0]
+        if not 0x80 <= map_header < 0x8f:
+            raise ValueError("Only messages serialized as a map of less than 15 keys are supported")
+        return bytes([map_header + 1]) + serialized_message[1:] + msgpack.packb("ID") + msgpack.packb(message_id)
+
+    def join_messages(self, serialized_messages):
+        items_count = 0
+        items = []
+        for serialized_message in serialized_messages:
+            header = serialized_message[0]
+            if 0x90 <= header <= 0x9f:
+                items_count += header & 0x0f
+                items.append(serialized_message[1:])
+            elif header == 0xdc:
+                items_count += int.from_bytes(serialized_message[1:3], "big")
+                items.append(serialized_message[3:])
+            elif header == 0xdd:
+                items_count += int.from_bytes(serialized_message[1:5], "big")
+                items.append(serialized_message[5:])
+            else:
+                items_count += 1
+                items.append(serialized_message)
+        return msgpack.Packer().pack_array_header(items_count) + b"".join(items)
+
+    def _datetime_handler(self, obj: datetime):
+        if obj.tzinfo is not None:
+            obj = obj.astimezone(timezone.utc).replace(tzinfo=None)
+        delta = obj - self._epoch
+        return msgpack.Timestamp.from_unix_nano(((delta.days * 86400 + delta.seconds) * 10 ** 6 +
+                                                 delta.microseconds) * 1000)
+
+    def unserialize(self, message):
+        obj = msgpack.unpackb(message, raw=False, strict_map_key=False)
+        if not any(marker in message for marker in self.__TIMESTAMP_MARKERS):
+            # nothing to convert, avoiding walking the whole object
+            return obj
+        return self.__untimestamp(obj)
+
+    def __untimestamp(self, obj):
+        if isinstance(obj, msgpack.Timestamp):
+            return obj.to_datetime().replace(tzinfo=None)
+        elif isinstance(obj, list):
+            return [self.__untimestamp(item) for item in obj]
+        elif isinstance(obj, dict):
+            return {key: self.__untimestamp(item) for key, item in obj.items()}
+        return obj
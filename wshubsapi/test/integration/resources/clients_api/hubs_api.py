@@ -1,10 +1,52 @@
 import logging
+import queue
 import threading
-from concurrent.futures import Future
-from wshubsapi.serializer import Serializer
+from contextlib import contextmanager
+from concurrent.futures import Future, TimeoutError
+from wshubsapi.compact_serializer import CompactSerializer
+from wshubsapi.message_compressor import MessageCompressor
+from wshubsapi.serializer import Serializer, MsgPackSerializer
 
 _message_id = 0
 _message_lock = threading.RLock()
+_STREAM_END = object()
+# (hub, server functions, client functions) sorted by their index in the compact envelope
+ENVELOPE_TABLES = [
+    ('ChatHub', ['get_subscribed_clients_ids', 'raise_exception', 'send_message_to_client', 'send_to_all', 'subscribe_to_hub', 'unsubscribe_from_hub'], []),
+    ('EchoHub', ['echo', 'echo_to_sender', 'get_subscribed_clients_ids', 'notify_sender', 'stream_echo', 'subscribe_to_hub', 'unsubscribe_from_hub'], []),
+    ('UtilsAPIHub', ['get_hubs_structure', 'get_id', 'get_subscribed_clients_ids', 'is_client_connected', 'set_id', 'subscribe_to_hub', 'unsubscribe_from_hub'], []),
+]
+
+
+class ReplyFuture(Future):
+    """
+    Future of a server function call.
+    If the server function is a generator, its items (partial replies) can be consumed with iter_partial_replies,
+    the future is resolved when the stream ends
+    """
+    def __init__(self):
+        super(ReplyFuture, self).__init__()
+        self.__partial_replies = queue.Queue()
+        self.add_done_callback(lambda f: self.__partial_replies.put(_STREAM_END))
+
+    def add_partial_reply(self, reply):
+        self.__partial_replies.put(reply)
+
+    def iter_partial_replies(self, timeout=None):
+        """
+        Yields the partial replies as they are received until the stream ends
+        :param timeout: max seconds waiting for each partial reply
+        :raises Exception: if the server function fails
+        """
+        while True:
+            try:
+                reply = self.__partial_replies.get(timeout=timeout)
+            except queue.Empty:
+                raise TimeoutError()
+            if reply is _STREAM_END:
+                self.result()  # raises the server exception if any
+                return
+            yield reply
 
 
 class GenericClient(object):
@@ -31,7 +73,7 @@ class GenericServer(object):
         id_ = self._get_next_message_id()
         body = {"hub": self.hub.name, "function": function_name, "args": args, "ID": id_}
         future = self.hub.ws_client.get_future(id_)
-        send_return_obj = self.hub.ws_client.send(self._serialize_object(body))
+        send_return_obj = self.hub.ws_client.send_object(body)
         if isinstance(send_return_obj, Future):
             return send_return_obj
         else:
@@ -51,7 +93,7 @@ class GenericBridge(GenericServer):
             id_ = self._get_next_message_id()
             body = {"hub": self.hub.name, "function": "_client_to_clients_bridge", "args": args, "ID": id_}
             future = self.hub.ws_client.get_future(id_)
-            send_return_obj = self.hub.ws_client.send(self._serialize_object(body))
+            send_return_obj = self.hub.ws_client.send_object(body)
             if isinstance(send_return_obj, Future):
                 return send_return_obj
             return future
@@ -65,17 +107,20 @@ def construct_api_client_class(client_class):
         client_class = WebSocketClient
 
     class WSHubsAPIClient(client_class):
-        def __init__(self, api, url):
+        def __init__(self, api, url, serializer=None, compressor=None):
             """
             :type api: HubsAPI
+            :type compressor: MessageCompressor | None
             """
             client_class.__init__(self, url)
             self.__futures = dict()
+            self.__batch = threading.local()
             self.is_opened = False
             self.api = api
             self.log = logging.getLogger(__name__)
             self.log.addHandler(logging.NullHandler())
-            self.serializer = Serializer()
+            self.serializer = Serializer() if serializer is None else serializer
+            self.compressor = compressor
 
         def opened(self):
             self.is_opened = True
@@ -85,22 +130,39 @@ def construct_api_client_class(client_class):
             self.log.debug("Connection closed with code:\n%s\nAnd reason:\n%s" % (code, reason))
 
         def received_message(self, m):
+            data = m.data if getattr(m, "is_binary", False) else m.data.decode('utf-8')
             try:
-                msg_obj = self.serializer.unserialize(m.data.decode('utf-8'))
+                if self.compressor is not None:
+                    data = self.compressor.decompress(data)
+                msg_obj = self.serializer.unserialize(data)
             except Exception as e:
                 self.on_error(e)
                 return
+            if isinstance(msg_obj, list):
+                for batch_msg_obj in msg_obj:
+                    self.__on_message_obj(batch_msg_obj)
+            else:
+                self.__on_message_obj(msg_obj)
+            self.log.debug("Message received: %s" % data)
+
+        def __on_message_obj(self, msg_obj):
             if "reply" in msg_obj:
                 f = self.__futures.get(msg_obj["ID"], None)
                 if f is None:
                     return
-                if msg_obj["success"]:
+                if msg_obj.get("partial", False):
+                    f.add_partial_reply(msg_obj["reply"])
+                elif msg_obj["success"]:
                     f.set_result(msg_obj["reply"])
                 else:
                     f.set_exception(Exception(msg_obj["reply"]))
             else:
                 try:
                     client_function = getattr(getattr(self.api, (msg_obj["hub"])).client, msg_obj["function"])
+                    if "ID" not in msg_obj:
+                        # notification, the server does not expect any reply
+                        client_function(*msg_obj["args"])
+                        return
                     replay_message = dict(ID=msg_obj["ID"])
                     try:
                         reply = client_function(*msg_obj["args"])
@@ -110,17 +172,38 @@ def construct_api_client_class(client_class):
                         replay_message["reply"] = str(e)
                         replay_message["success"] = False
                     finally:
-                        self.api.ws_client.send(self.api.serialize_object(replay_message))
+                        self.send_object(replay_message)
                 except:
                     self.log.exception("unable to call client function")
 
-            self.log.debug("Message received: %s" % m.data.decode('utf-8'))
+        def send_object(self, obj):
+            batch_messages = getattr(self.__batch, "messages", None)
+            if batch_messages is not None:
+                batch_messages.append(obj)
+                return None
+            return self.__send_serialized(obj)
+
+        def start_batch(self):
+            self.__batch.messages = []
+
+        def send_batch(self):
+            batch_messages, self.__batch.messages = self.__batch.messages, None
+            if batch_messages:
+                return self.__send_serialized(batch_messages)
+
+        def __send_serialized(self, obj):
+            payload = self.serializer.serialize(obj)
+            if self.compressor is not None:
+                payload = self.compressor.compress(payload)
+            if isinstance(payload, bytes):
+                return self.send(payload, binary=True)
+            return self.send(payload)
 
         def get_future(self, id_):
             """
-            :rtype : Future
+            :rtype : ReplyFuture
             """
-            self.__futures[id_] = Future()
+            self.__futures[id_] = ReplyFuture()
             return self.__futures[id_]
 
         def on_error(self, exception):
@@ -133,11 +216,30 @@ def construct_api_client_class(client_class):
 
 
 class HubsAPI(object):
-    def __init__(self, url, client_class=None, serialization_max_depth=5, serialization_max_iter=100):
+    def __init__(self, url, client_class=None, serialization_max_depth=5, serialization_max_iter=100,
+                 encoding="json", compression=None, compression_min_size=1024, compression_level=6, envelope=None):
+        """
+        :param encoding: "json" or "msgpack" (binary frames, requires msgpack package)
+        :param envelope: "compact" to send positional messages with hubs and functions indexes instead of names
+        :param compression: "deflate" to compress the messages bigger than compression_min_size
+                            (the server must have the compression enabled)
+        """
+        if encoding == MsgPackSerializer.ENCODING:
+            self.serializer = MsgPackSerializer()
+            url += ("&" if "?" in url else "?") + "encoding=" + encoding
+        else:
+            self.serializer = Serializer()
+        if envelope == CompactSerializer.ENVELOPE:
+            self.serializer = CompactSerializer(self.serializer, ENVELOPE_TABLES, is_client=True)
+            url += ("&" if "?" in url else "?") + "envelope=" + envelope
+            url += "&envelope_hash=" + self.serializer.tables_hash
+        compressor = None
+        if compression == MessageCompressor.ENCODING:
+            compressor = MessageCompressor(compression_min_size, compression_level)
+            url += ("&" if "?" in url else "?") + "compression=" + compression
         api_client_class = construct_api_client_class(client_class)
-        self.ws_client = api_client_class(self, url)
+        self.ws_client = api_client_class(self, url, self.serializer, compressor)
         self.ws_client.default_on_error = lambda error: None
-        self.serializer = Serializer()
         self.ChatHub = self.ChatHubClass(self.ws_client)
         self.EchoHub = self.EchoHubClass(self.ws_client)
         self.UtilsAPIHub = self.UtilsAPIHubClass(self.ws_client)
@@ -156,6 +258,18 @@ class HubsAPI(object):
     def serialize_object(self, obj2ser):
         return self.serializer.serialize(obj2ser)
 
+    @contextmanager
+    def batch(self):
+        """
+        Server calls made inside the with block (from the same thread) are sent in one message when the block ends,
+        the server replies all of them in one message
+        """
+        self.ws_client.start_batch()
+        try:
+            yield
+        finally:
+            self.ws_client.send_batch()
+
     class ChatHubClass(object):
         def __init__(self, ws_client):
             self.name = "ChatHub"
@@ -170,7 +284,7 @@ class HubsAPI(object):
             
             def get_subscribed_clients_ids(self, ):
                 """
-                :rtype : Future
+                :rtype : ReplyFuture
                 """
                 args = list()
                 
@@ -178,7 +292,7 @@ class HubsAPI(object):
 
             def raise_exception(self, exception_message):
                 """
-                :rtype : Future
+                :rtype : ReplyFuture
                 """
                 args = list()
                 args.append(exception_message)
@@ -186,7 +300,7 @@ class HubsAPI(object):
 
             def send_message_to_client(self, message, client_id):
                 """
-                :rtype : Future
+                :rtype : ReplyFuture
                 """
                 args = list()
                 args.append(message)
@@ -195,7 +309,7 @@ class HubsAPI(object):
 
             def send_to_all(self, name, message="hello"):
                 """
-                :rtype : Future
+                :rtype : ReplyFuture
                 """
                 args = list()
                 args.append(name)
@@ -204,7 +318,7 @@ class HubsAPI(object):
 
             def subscribe_to_hub(self, ):
                 """
-                :rtype : Future
+                :rtype : ReplyFuture
                 """
                 args = list()
                 
@@ -212,7 +326,7 @@ class HubsAPI(object):
 
             def unsubscribe_from_hub(self, ):
                 """
-                :rtype : Future
+                :rtype : ReplyFuture
                 """
                 args = list()
                 
@@ -243,7 +357,7 @@ class HubsAPI(object):
             
             def echo(self, message):
                 """
-                :rtype : Future
+                :rtype : ReplyFuture
                 """
                 args = list()
                 args.append(message)
@@ -251,7 +365,7 @@ class HubsAPI(object):
 
             def echo_to_sender(self, message):
                 """
-                :rtype : Future
+                :rtype : ReplyFuture
                 """
                 args = list()
                 args.append(message)
@@ -259,15 +373,32 @@ class HubsAPI(object):
 
             def get_subscribed_clients_ids(self, ):
                 """
-                :rtype : Future
+                :rtype : ReplyFuture
                 """
                 args = list()
                 
                 return self.construct_message(args, "get_subscribed_clients_ids")
 
+            def notify_sender(self, message):
+                """
+                :rtype : ReplyFuture
+                """
+                args = list()
+                args.append(message)
+                return self.construct_message(args, "notify_sender")
+
+            def stream_echo(self, message, times):
+                """
+                :rtype : ReplyFuture
+                """
+                args = list()
+                args.append(message)
+                args.append(times)
+                return self.construct_message(args, "stream_echo")
+
             def subscribe_to_hub(self, ):
                 """
-                :rtype : Future
+                :rtype : ReplyFuture
                 """
                 args = list()
                 
@@ -275,7 +406,7 @@ class HubsAPI(object):
 
             def unsubscribe_from_hub(self, ):
                 """
-                :rtype : Future
+                :rtype : ReplyFuture
                 """
                 args = list()
                 
@@ -306,7 +437,7 @@ class HubsAPI(object):
             
             def get_hubs_structure(self, ):
                 """
-                :rtype : Future
+                :rtype : ReplyFuture
                 """
                 args = list()
                 
@@ -314,7 +445,7 @@ class HubsAPI(object):
 
             def get_id(self, ):
                 """
-                :rtype : Future
+                :rtype : ReplyFuture
                 """
                 args = list()
                 
@@ -322,7 +453,7 @@ class HubsAPI(object):
 
             def get_subscribed_clients_ids(self, ):
                 """
-                :rtype : Future
+                :rtype : ReplyFuture
                 """
                 args = list()
                 
@@ -330,7 +461,7 @@ class HubsAPI(object):
 
             def is_client_connected(self, client_id):
                 """
-                :rtype : Future
+                :rtype : ReplyFuture
                 """
                 args = list()
                 args.append(client_id)
@@ -338,7 +469,7 @@ class HubsAPI(object):
 
             def set_id(self, client_id):
                 """
-                :rtype : Future
+                :rtype : ReplyFuture
                 """
                 args = list()
                 args.append(client_id)
@@ -346,7 +477,7 @@ class HubsAPI(object):
 
             def subscribe_to_hub(self, ):
                 """
-                :rtype : Future
+                :rtype : ReplyFuture
                 """
                 args = list()
                 
@@ -354,7 +485,7 @@ class HubsAPI(object):
 
             def unsubscribe_from_hub(self, ):
                 """
-                :rtype : Future
+                :rtype : ReplyFuture
                 """
                 args = list()
                 
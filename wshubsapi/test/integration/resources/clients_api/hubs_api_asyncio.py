@@ -0,0 +1,522 @@
+import asyncio
+import contextvars
+import inspect
+import itertools
+import logging
+from contextlib import contextmanager
+from wshubsapi.compact_serializer import CompactSerializer
+from wshubsapi.message_compressor import MessageCompressor
+from wshubsapi.serializer import Serializer, MsgPackSerializer
+
+_message_ids = itertools.count(1)
+_STREAM_END = object()
+_batch = contextvars.ContextVar("batch", default=None)
+# (hub, server functions, client functions) sorted by their index in the compact envelope
+ENVELOPE_TABLES = [
+    ('ChatHub', ['get_subscribed_clients_ids', 'raise_exception', 'send_message_to_client', 'send_to_all', 'subscribe_to_hub', 'unsubscribe_from_hub'], []),
+    ('EchoHub', ['echo', 'echo_to_sender', 'get_subscribed_clients_ids', 'notify_sender', 'stream_echo', 'subscribe_to_hub', 'unsubscribe_from_hub'], []),
+    ('UtilsAPIHub', ['get_hubs_structure', 'get_id', 'get_subscribed_clients_ids', 'is_client_connected', 'set_id', 'subscribe_to_hub', 'unsubscribe_from_hub'], []),
+]
+
+
+class ReplyFuture(asyncio.Future):
+    """
+    Awaitable future of a server function call.
+    If the server function is a generator, its items (partial replies) can be consumed with
+    "async for reply in future.iter_partial_replies()", the future is resolved when the stream ends
+    """
+    def __init__(self):
+        super(ReplyFuture, self).__init__()
+        self.__partial_replies = asyncio.Queue()
+        self.add_done_callback(lambda f: self.__partial_replies.put_nowait(_STREAM_END))
+
+    def add_partial_reply(self, reply):
+        self.__partial_replies.put_nowait(reply)
+
+    async def iter_partial_replies(self, timeout=None):
+        """
+        Yields the partial replies as they are received until the stream ends
+        :param timeout: max seconds waiting for each partial reply
+        :raises Exception: if the server function fails
+        """
+        while True:
+            reply = await asyncio.wait_for(self.__partial_replies.get(), timeout)
+            if reply is _STREAM_END:
+                self.result()  # raises the server exception if any
+                return
+            yield reply
+
+
+class GenericClient(object):
+    def __setattr__(self, key, value):
+        return super(GenericClient, self).__setattr__(key, value)
+
+
+class GenericServer(object):
+    def __init__(self, hub):
+        self.hub = hub
+        self.serializer = Serializer()
+
+    @classmethod
+    def _get_next_message_id(cls):
+        return next(_message_ids)
+
+    def _serialize_object(self, obj2ser):
+        return self.serializer.serialize(obj2ser)
+
+    def construct_message(self, args, function_name):
+        id_ = self._get_next_message_id()
+        body = {"hub": self.hub.name, "function": function_name, "args": args, "ID": id_}
+        future = self.hub.ws_client.get_future(id_)
+        self.hub.ws_client.send_object(body)
+        return future
+
+
+class GenericBridge(GenericServer):
+    def __getattr__(self, function_name):
+        def function_wrapper(*args_array):
+            """
+            :rtype : ReplyFuture
+            """
+            args = list()
+            args.append(self.clients_ids)
+            args.append(function_name)
+            args.append(args_array)
+            return self.construct_message(args, "_client_to_clients_bridge")
+
+        return function_wrapper
+
+
+class WSHubsAPIClient(object):
+    def __init__(self, api, url, serializer=None, compressor=None, websocket_connect=None):
+        """
+        :type api: HubsAPI
+        :type compressor: MessageCompressor | None
+        :param websocket_connect: coroutine function opening the connection, by default tornado websocket_connect.
+                                  The connection needs read_message, write_message and close functions
+        """
+        self.url = url
+        self.__futures = dict()
+        self.is_opened = False
+        self.api = api
+        self.log = logging.getLogger(__name__)
+        self.log.addHandler(logging.NullHandler())
+        self.serializer = Serializer() if serializer is None else serializer
+        self.compressor = compressor
+        self.websocket_connect = websocket_connect
+        self.connection = None
+        self.__reading_task = None
+
+    async def connect(self):
+        websocket_connect = self.websocket_connect
+        if websocket_connect is None:
+            from tornado.websocket import websocket_connect
+        self.connection = await websocket_connect(self.url)
+        self.opened()
+        self.__reading_task = asyncio.ensure_future(self.__read_messages())
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+
+    def opened(self):
+        self.is_opened = True
+        self.log.debug("Connection opened")
+
+    def closed(self):
+        self.is_opened = False
+        self.log.debug("Connection closed")
+        futures, self.__futures = self.__futures, dict()
+        for future in futures.values():
+            if not future.done():
+                future.set_exception(ConnectionError("Connection closed"))
+
+    async def __read_messages(self):
+        while True:
+            message = await self.connection.read_message()
+            if message is None:
+                break
+            self.received_message(message)
+        self.closed()
+
+    def received_message(self, data):
+        try:
+            if self.compressor is not None:
+                data = self.compressor.decompress(data)
+            msg_obj = self.serializer.unserialize(data)
+        except Exception as e:
+            self.on_error(e)
+            return
+        if isinstance(msg_obj, list):
+            for batch_msg_obj in msg_obj:
+                self.__on_message_obj(batch_msg_obj)
+        else:
+            self.__on_message_obj(msg_obj)
+        self.log.debug("Message received: %s" % data)
+
+    def __on_message_obj(self, msg_obj):
+        if "reply" in msg_obj:
+            if msg_obj.get("partial", False):
+                f = self.__futures.get(msg_obj["ID"], None)
+                if f is not None:
+                    f.add_partial_reply(msg_obj["reply"])
+                return
+            f = self.__futures.pop(msg_obj["ID"], None)
+            if f is None or f.done():
+                return
+            if msg_obj["success"]:
+                f.set_result(msg_obj["reply"])
+            else:
+                f.set_exception(Exception(msg_obj["reply"]))
+        else:
+            try:
+                client_function = getattr(getattr(self.api, (msg_obj["hub"])).client, msg_obj["function"])
+                reply = client_function(*msg_obj["args"])
+            except Exception as e:
+                self.log.exception("unable to call client function")
+                reply = e
+            if inspect.isawaitable(reply):
+                # coroutine client functions do not block the reception of other messages
+                asyncio.ensure_future(self.__reply_when_done(msg_obj.get("ID"), reply))
+            elif "ID" in msg_obj:  # notifications are not replied
+                self.__reply(msg_obj["ID"], reply)
+
+    async def __reply_when_done(self, id_, awaitable):
+        try:
+            reply = await awaitable
+        except Exception as e:
+            self.log.exception("unable to call client function")
+            reply = e
+        if id_ is not None:
+            self.__reply(id_, reply)
+
+    def __reply(self, id_, reply):
+        if isinstance(reply, Exception):
+            self.send_object(dict(ID=id_, reply=str(reply), success=False))
+        else:
+            self.send_object(dict(ID=id_, reply=reply, success=True))
+
+    def send_object(self, obj):
+        batch = _batch.get()
+        if batch is not None and batch[0] is self:
+            batch[1].append(obj)
+            return None
+        return self.__send_serialized(obj)
+
+    @contextmanager
+    def batch(self):
+        token = _batch.set((self, []))
+        try:
+            yield
+        finally:
+            batch_messages = _batch.get()[1]
+            _batch.reset(token)
+            if batch_messages:
+                self.__send_serialized(batch_messages)
+
+    def __send_serialized(self, obj):
+        payload = self.serializer.serialize(obj)
+        if self.compressor is not None:
+            payload = self.compressor.compress(payload)
+        return self.connection.write_message(payload, binary=isinstance(payload, bytes))
+
+    def get_future(self, id_):
+        """
+        :rtype : ReplyFuture
+        """
+        self.__futures[id_] = ReplyFuture()
+        return self.__futures[id_]
+
+    def on_error(self, exception):
+        self.log.exception("Error in protocol")
+
+    def default_on_error(self, error):
+        pass
+
+
+class HubsAPI(object):
+    def __init__(self, url, serialization_max_depth=5, serialization_max_iter=100, encoding="json",
+                 compression=None, compression_min_size=1024, compression_level=6, envelope=None,
+                 websocket_connect=None):
+        """
+        Connects in the asyncio loop running connect, many connections can share the same loop
+        :param encoding: "json" or "msgpack" (binary frames, requires msgpack package)
+        :param envelope: "compact" to send positional messages with hubs and functions indexes instead of names
+        :param compression: "deflate" to compress the messages bigger than compression_min_size
+                            (the server must have the compression enabled)
+        :param websocket_connect: coroutine function opening the connection, by default tornado websocket_connect
+        """
+        if encoding == MsgPackSerializer.ENCODING:
+            self.serializer = MsgPackSerializer()
+            url += ("&" if "?" in url else "?") + "encoding=" + encoding
+        else:
+            self.serializer = Serializer()
+        if envelope == CompactSerializer.ENVELOPE:
+            self.serializer = CompactSerializer(self.serializer, ENVELOPE_TABLES, is_client=True)
+            url += ("&" if "?" in url else "?") + "envelope=" + envelope
+            url += "&envelope_hash=" + self.serializer.tables_hash
+        compressor = None
+        if compression == MessageCompressor.ENCODING:
+            compressor = MessageCompressor(compression_min_size, compression_level)
+            url += ("&" if "?" in url else "?") + "compression=" + compression
+        self.ws_client = WSHubsAPIClient(self, url, self.serializer, compressor, websocket_connect)
+        self.ws_client.default_on_error = lambda error: None
+        self.ChatHub = self.ChatHubClass(self.ws_client)
+        self.EchoHub = self.EchoHubClass(self.ws_client)
+        self.UtilsAPIHub = self.UtilsAPIHubClass(self.ws_client)
+
+    @property
+    def default_on_error(self):
+        return None
+
+    @default_on_error.setter
+    def default_on_error(self, func):
+        self.ws_client.default_on_error = func
+
+    async def connect(self):
+        await self.ws_client.connect()
+
+    def close(self):
+        self.ws_client.close()
+
+    def serialize_object(self, obj2ser):
+        return self.serializer.serialize(obj2ser)
+
+    def batch(self):
+        """
+        Server calls made inside the with block (from the same task) are sent in one message when the block ends,
+        the server replies all of them in one message
+        """
+        return self.ws_client.batch()
+
+    class ChatHubClass(object):
+        def __init__(self, ws_client):
+            self.name = "ChatHub"
+            self.ws_client = ws_client
+            self.server = self.ServerClass(self)
+            self.client = self.ClientClass()
+
+        def get_clients(self, client_ids):
+            return HubsAPI.ChatHubClass.ClientsInServer(client_ids, self)
+
+        class ServerClass(GenericServer):
+            
+            def get_subscribed_clients_ids(self, ):
+                """
+                :rtype : ReplyFuture
+                """
+                args = list()
+                
+                return self.construct_message(args, "get_subscribed_clients_ids")
+
+            def raise_exception(self, exception_message):
+                """
+                :rtype : ReplyFuture
+                """
+                args = list()
+                args.append(exception_message)
+                return self.construct_message(args, "raise_exception")
+
+            def send_message_to_client(self, message, client_id):
+                """
+                :rtype : ReplyFuture
+                """
+                args = list()
+                args.append(message)
+                args.append(client_id)
+                return self.construct_message(args, "send_message_to_client")
+
+            def send_to_all(self, name, message="hello"):
+                """
+                :rtype : ReplyFuture
+                """
+                args = list()
+                args.append(name)
+                args.append(message)
+                return self.construct_message(args, "send_to_all")
+
+            def subscribe_to_hub(self, ):
+                """
+                :rtype : ReplyFuture
+                """
+                args = list()
+                
+                return self.construct_message(args, "subscribe_to_hub")
+
+            def unsubscribe_from_hub(self, ):
+                """
+                :rtype : ReplyFuture
+                """
+                args = list()
+                
+                return self.construct_message(args, "unsubscribe_from_hub")
+
+        class ClientClass(GenericClient):
+            def __init__(self):
+                pass
+            
+
+        class ClientsInServer(GenericBridge):
+            def __init__(self, client_ids, hub):
+                super(self.__class__, self).__init__(hub)
+                self.clients_ids = client_ids
+            
+
+    class EchoHubClass(object):
+        def __init__(self, ws_client):
+            self.name = "EchoHub"
+            self.ws_client = ws_client
+            self.server = self.ServerClass(self)
+            self.client = self.ClientClass()
+
+        def get_clients(self, client_ids):
+            return HubsAPI.EchoHubClass.ClientsInServer(client_ids, self)
+
+        class ServerClass(GenericServer):
+            
+            def echo(self, message):
+                """
+                :rtype : ReplyFuture
+                """
+                args = list()
+                args.append(message)
+                return self.construct_message(args, "echo")
+
+            def echo_to_sender(self, message):
+                """
+                :rtype : ReplyFuture
+                """
+                args = list()
+                args.append(message)
+                return self.construct_message(args, "echo_to_sender")
+
+            def get_subscribed_clients_ids(self, ):
+                """
+                :rtype : ReplyFuture
+                """
+                args = list()
+                
+                return self.construct_message(args, "get_subscribed_clients_ids")
+
+            def notify_sender(self, message):
+                """
+                :rtype : ReplyFuture
+                """
+                args = list()
+                args.append(message)
+                return self.construct_message(args, "notify_sender")
+
+            def stream_echo(self, message, times):
+                """
+                :rtype : ReplyFuture
+                """
+                args = list()
+                args.append(message)
+                args.append(times)
+                return self.construct_message(args, "stream_echo")
+
+            def subscribe_to_hub(self, ):
+                """
+                :rtype : ReplyFuture
+                """
+                args = list()
+                
+                return self.construct_message(args, "subscribe_to_hub")
+
+            def unsubscribe_from_hub(self, ):
+                """
+                :rtype : ReplyFuture
+                """
+                args = list()
+                
+                return self.construct_message(args, "unsubscribe_from_hub")
+
+        class ClientClass(GenericClient):
+            def __init__(self):
+                pass
+            
+
+        class ClientsInServer(GenericBridge):
+            def __init__(self, client_ids, hub):
+                super(self.__class__, self).__init__(hub)
+                self.clients_ids = client_ids
+            
+
+    class UtilsAPIHubClass(object):
+        def __init__(self, ws_client):
+            self.name = "UtilsAPIHub"
+            self.ws_client = ws_client
+            self.server = self.ServerClass(self)
+            self.client = self.ClientClass()
+
+        def get_clients(self, client_ids):
+            return HubsAPI.UtilsAPIHubClass.ClientsInServer(client_ids, self)
+
+        class ServerClass(GenericServer):
+            
+            def get_hubs_structure(self, ):
+                """
+                :rtype : ReplyFuture
+                """
+                args = list()
+                
+                return self.construct_message(args, "get_hubs_structure")
+
+            def get_id(self, ):
+                """
+                :rtype : ReplyFuture
+                """
+                args = list()
+                
+                return self.construct_message(args, "get_id")
+
+            def get_subscribed_clients_ids(self, ):
+                """
+                :rtype : ReplyFuture
+                """
+                args = list()
+                
+                return self.construct_message(args, "get_subscribed_clients_ids")
+
+            def is_client_connected(self, client_id):
+                """
+                :rtype : ReplyFuture
+                """
+                args = list()
+                args.append(client_id)
+                return self.construct_message(args, "is_client_connected")
+
+            def set_id(self, client_id):
+                """
+                :rtype : ReplyFuture
+                """
+                args = list()
+                args.append(client_id)
+                return self.construct_message(args, "set_id")
+
+            def subscribe_to_hub(self, ):
+                """
+                :rtype : ReplyFuture
+                """
+                args = list()
+                
+                return self.construct_message(args, "subscribe_to_hub")
+
+            def unsubscribe_from_hub(self, ):
+                """
+                :rtype : ReplyFuture
+                """
+                args = list()
+                
+                return self.construct_message(args, "unsubscribe_from_hub")
+
+        class ClientClass(GenericClient):
+            def __init__(self):
+                pass
+            
+
+        class ClientsInServer(GenericBridge):
+            def __init__(self, client_ids, hub):
+                super(self.__class__, self).__init__(hub)
+                self.clients_ids = client_ids
+            
@@ -11,5 +11,11 @@ class EchoHub(Hub):
     def echo_to_sender(message, _sender):
         _sender.on_echo(message)
 
+    @staticmethod
+    def notify_sender(message, _sender):
+        _sender.on_echo(message, notification=True)
 
-
+    @staticmethod
+    def stream_echo(message, times):
+        for i in range(times):
+            yield "{} {}".format(message, i)
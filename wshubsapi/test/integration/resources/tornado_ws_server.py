@@ -6,6 +6,7 @@ import json
 import sys
 
 from tornado import web, ioloop
+from wshubsapi.comm_environment import CommEnvironment
 from wshubsapi.hubs_inspector import HubsInspector
 from wshubsapi.connection_handlers.tornado_handler import ConnectionHandler
 
@@ -31,9 +32,11 @@ if __name__ == '__main__':
     # necessary to add this import for code inspection
     importlib.import_module("wshubsapi.test.integration.resources.hubs.chat_hub")
     importlib.import_module("wshubsapi.test.integration.resources.hubs.echo_hub")
+    CommEnvironment.get_instance(compression_level=6)
     HubsInspector.inspect_implemented_hubs(force_reconstruction=True)
     HubsInspector.construct_js_file(settings["static_path"] + os.sep + "hubsApi.js")
     HubsInspector.construct_python_file(settings["static_path"] + os.sep + "hubs_api.py")
+    HubsInspector.construct_python_file(settings["static_path"] + os.sep + "hubs_api_asyncio.py", asyncio_client=True)
     log.debug("starting...")
     app.listen(11111)
 
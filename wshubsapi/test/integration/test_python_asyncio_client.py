@@ -0,0 +1,75 @@
+# coding=utf-8
+import asyncio
+import unittest
+from datetime import datetime
+
+from wshubsapi.test.integration.resources.clients_api.hubs_api_asyncio import HubsAPI
+
+URL = 'ws://127.0.0.1:11111/'
+
+
+class TestAsyncioClient(unittest.TestCase):
+    def run_with_api(self, coroutine_function, **kwargs):
+        async def run():
+            api = HubsAPI(URL, **kwargs)
+            await api.connect()
+            try:
+                return await asyncio.wait_for(coroutine_function(api), 5)
+            finally:
+                api.close()
+
+        return asyncio.run(run())
+
+    def test_echo_responds_same_message(self):
+        message = [1, 2.5, u"ñáñsd", datetime(2016, 5, 4, 3, 2, 1)]
+
+        async def echo(api):
+            return await api.EchoHub.server.echo(message)
+
+        self.assertEqual(self.run_with_api(echo), message)
+        self.assertEqual(self.run_with_api(echo, envelope="compact"), message)
+
+    def test_echo_to_sender__coroutine_client_functions_are_awaited(self):
+        received_messages = []
+
+        async def echo_to_sender(api):
+            async def on_echo(message):
+                await asyncio.sleep(0)
+                received_messages.append(message)
+
+            api.EchoHub.client.on_echo = on_echo
+            await api.EchoHub.server.echo_to_sender("testing")
+            await api.EchoHub.server.notify_sender("notified")
+
+        self.run_with_api(echo_to_sender)
+
+        self.assertEqual(received_messages, ["testing", "notified"])
+
+    def test_stream_echo__partial_replies_are_received_asynchronously(self):
+        async def stream_echo(api):
+            future = api.EchoHub.server.stream_echo("streamed", 3)
+            partial_replies = [reply async for reply in future.iter_partial_replies(timeout=1)]
+            return partial_replies, await future
+
+        self.assertEqual(self.run_with_api(stream_echo), (["streamed 0", "streamed 1", "streamed 2"], None))
+
+    def test_batch_sends_all_calls_and_resolves_all_futures(self):
+        async def batch(api):
+            with api.batch():
+                futures = [api.EchoHub.server.echo("first"), api.EchoHub.server.echo("second")]
+            return await asyncio.gather(*futures)
+
+        self.assertEqual(self.run_with_api(batch), ["first", "second"])
+
+    def test_many_connections_share_one_loop(self):
+        async def run():
+            apis = [HubsAPI(URL) for _ in range(200)]
+            await asyncio.gather(*[api.connect() for api in apis])
+            try:
+                return await asyncio.wait_for(asyncio.gather(*[api.EchoHub.server.echo(i)
+                                                               for i, api in enumerate(apis)]), 5)
+            finally:
+                for api in apis:
+                    api.close()
+
+        self.assertEqual(asyncio.run(run()), list(range(200)))
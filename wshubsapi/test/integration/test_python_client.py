@@ -1,5 +1,12 @@
 # coding=utf-8
+import time
 import unittest
+from datetime import datetime
+from unittest import mock
+
+from wshubsapi.message_compressor import MessageCompressor
+from wshubsapi.serializer import msgpack
+from wshubsapi.test.integration.resources.clients_api import hubs_api
 from wshubsapi.test.integration.resources.clients_api.hubs_api import HubsAPI
 
 
@@ -48,3 +55,140 @@ class TestCommProtocol(unittest.TestCase):
         self.api.EchoHub.server.echo_to_sender("testing").result(timeout=1)
 
         self.assertTrue(self.echo_is_called)
+
+    def test_notify_sender__calls_client_function_without_replying(self):
+        received_messages = []
+        self.api.EchoHub.client.on_echo = received_messages.append
+
+        self.api.EchoHub.server.notify_sender("testing").result(timeout=1)
+
+        self.assertEqual(received_messages, ["testing"])
+
+    def test_client_to_clients_bridge__returns_replies_of_all_clients(self):
+        other_api = HubsAPI('ws://127.0.0.1:11111/')
+        other_api.connect()
+        self.addCleanup(other_api.ws_client.close)
+        other_api.EchoHub.client.on_echo = lambda message: message + " received"
+        self.api.EchoHub.client.on_echo = lambda message: message + " also received"
+        ids = [api.UtilsAPIHub.server.get_id().result(timeout=1) for api in (self.api, other_api)]
+
+        results = self.api.EchoHub.get_clients(ids).on_echo("bridged").result(timeout=1)
+
+        self.assertEqual(results, {ids[0]: "bridged also received", ids[1]: "bridged received"})
+
+    def test_stream_echo__partial_replies_are_received_incrementally(self):
+        future = self.api.EchoHub.server.stream_echo("streamed", 3)
+
+        partial_replies = list(future.iter_partial_replies(timeout=1))
+
+        self.assertEqual(partial_replies, ["streamed 0", "streamed 1", "streamed 2"])
+        self.assertIsNone(future.result(timeout=1))
+
+    def test_stream_echo__streams_more_items_than_outbound_queue_max_size(self):
+        times = 3000  # the server uses the default outbound_queue_max_size (1000)
+
+        future = self.api.EchoHub.server.stream_echo("streamed", times)
+
+        partial_replies = list(future.iter_partial_replies(timeout=5))
+        self.assertEqual(partial_replies, ["streamed {}".format(i) for i in range(times)])
+        self.assertIsNone(future.result(timeout=1))
+
+    def test_batch_sends_all_calls_and_resolves_all_futures(self):
+        with self.api.batch():
+            first_future = self.api.EchoHub.server.echo("first")
+            second_future = self.api.EchoHub.server.echo("second")
+
+        self.assertEqual(first_future.result(timeout=1), "first")
+        self.assertEqual(second_future.result(timeout=1), "second")
+
+
+@unittest.skipIf(msgpack is None, "msgpack not installed")
+class TestMsgPackEncoding(unittest.TestCase):
+    api = None
+
+    @classmethod
+    def setUpClass(cls):
+        cls.api = HubsAPI('ws://127.0.0.1:11111/', encoding="msgpack")
+        cls.api.connect()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.api.ws_client.close()
+
+    def test_echo_responds_same_message_with_datetimes(self):
+        message = [1, 2.5, u"ñáñsd", datetime(2016, 5, 4, 3, 2, 1)]
+
+        self.assertEqual(self.api.EchoHub.server.echo(message).result(timeout=1), message)
+
+
+class TestDeflateCompression(unittest.TestCase):
+    api = None
+
+    @classmethod
+    def setUpClass(cls):
+        cls.api = HubsAPI('ws://127.0.0.1:11111/', compression="deflate", compression_min_size=100)
+        cls.api.connect()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.api.ws_client.close()
+
+    def test_echo_responds_same_message_compressing_big_messages(self):
+        received_data = []
+        received_message = self.api.ws_client.received_message
+
+        def record_received_message(m):
+            received_data.append(m.data)
+            received_message(m)
+
+        self.api.ws_client.received_message = record_received_message
+        message = [dict(id=i, name="row {}".format(i), value=i * 0.5) for i in range(100)]
+
+        self.assertEqual(self.api.EchoHub.server.echo(message).result(timeout=1), message)
+        self.assertEqual(self.api.EchoHub.server.echo("small").result(timeout=1), "small")
+        self.assertTrue(MessageCompressor.is_compressed(received_data[0]))
+        self.assertLess(len(received_data[0]), len(self.api.serialize_object(message)) / 4)
+        self.assertFalse(MessageCompressor.is_compressed(received_data[1]))
+
+
+class TestCompactEnvelope(unittest.TestCase):
+    api = None
+
+    @classmethod
+    def setUpClass(cls):
+        cls.api = HubsAPI('ws://127.0.0.1:11111/', envelope="compact")
+        cls.api.connect()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.api.ws_client.close()
+
+    def test_echo_responds_same_message(self):
+        message = [1, 2.5, u"ñáñsd", datetime(2016, 5, 4, 3, 2, 1)]
+
+        self.assertEqual(self.api.EchoHub.server.echo(message).result(timeout=1), message)
+
+    def test_echo_to_sender__client_function_is_called(self):
+        received_messages = []
+        self.api.EchoHub.client.on_echo = received_messages.append
+
+        self.api.EchoHub.server.echo_to_sender("testing").result(timeout=1)
+
+        self.assertEqual(received_messages, ["testing"])
+
+    def test_connect__clients_generated_with_other_envelope_tables_are_rejected(self):
+        with mock.patch.object(hubs_api, "ENVELOPE_TABLES", hubs_api.ENVELOPE_TABLES + [("NewHub", ["new"], [])]):
+            api = HubsAPI('ws://127.0.0.1:11111/', envelope="compact")
+        api.connect()
+
+        for _ in range(100):
+            if api.ws_client.terminated:
+                break
+            time.sleep(0.01)
+        self.assertTrue(api.ws_client.terminated)
+
+    def test_stream_echo__partial_replies_are_received(self):
+        future = self.api.EchoHub.server.stream_echo("streamed", 2)
+
+        self.assertEqual(list(future.iter_partial_replies(timeout=1)), ["streamed 0", "streamed 1"])
+        self.assertIsNone(future.result(timeout=1))
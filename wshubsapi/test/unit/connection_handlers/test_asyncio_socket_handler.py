@@ -0,0 +1,96 @@
+# coding=utf-8
+import asyncio
+import json
+import unittest
+
+from flexmock import flexmock, flexmock_teardown
+
+from wshubsapi.comm_environment import CommEnvironment
+from wshubsapi.connection_handlers.asyncio_socket_handler import AsyncioSocketHandler, \
+    LengthPrefixedAsyncioSocketHandler, create_asyncio_socket_server
+from wshubsapi.hub import Hub
+from wshubsapi.hubs_inspector import HubsInspector
+from wshubsapi.message_framer import MessageFramer
+from wshubsapi.message_separator import MessageSeparator
+from wshubsapi.test.utils.hubs_utils import remove_hubs_subclasses
+
+
+class TestAsyncioSocketHandler(unittest.TestCase):
+    def setUp(self):
+        class EchoHub(Hub):
+            def echo(self, message):
+                return message
+
+        HubsInspector.inspect_implemented_hubs(force_reconstruction=True)
+        self.comm_environment = CommEnvironment(max_workers=2)
+
+    def tearDown(self):
+        self.comm_environment.close()
+        remove_hubs_subclasses()
+        flexmock_teardown()
+
+    def run_with_server(self, socket_handler_class, coroutine_function):
+        async def run():
+            server = await create_asyncio_socket_server(
+                "127.0.0.1", 0, lambda: socket_handler_class(self.comm_environment))
+            reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname())
+            try:
+                return await asyncio.wait_for(coroutine_function(reader, writer), 5)
+            finally:
+                writer.close()
+                server.close()
+                await server.wait_closed()
+
+        return asyncio.run(run())
+
+    @staticmethod
+    async def call_echo(reader, writer, message_framer, message):
+        writer.write(message_framer.frame(json.dumps(dict(hub="EchoHub", function="echo", args=[message], ID=1))))
+        messages = []
+        while not messages:
+            messages = message_framer.add_data(await reader.read(65536))
+        reply = json.loads(messages[0])
+        return reply["success"], reply["reply"]
+
+    def test_lengthPrefixedHandler_repliesMessagesContainingSeparators(self):
+        message = ("ñ" + MessageSeparator.DEFAULT_API_SEP) * 100000
+
+        reply = self.run_with_server(LengthPrefixedAsyncioSocketHandler,
+                                     lambda reader, writer: self.call_echo(reader, writer, MessageFramer(), message))
+
+        self.assertEqual(reply, (True, message))
+
+    def test_asyncioSocketHandler_usesSeparatorByDefault(self):
+        reply = self.run_with_server(AsyncioSocketHandler,
+                                     lambda reader, writer: self.call_echo(reader, writer, MessageSeparator(), "hi"))
+
+        self.assertEqual(reply, (True, "hi"))
+
+    def test_lengthPrefixedHandler_closesConnectionIfFrameIsBiggerThanMaxFrameSize(self):
+        class SmallFramesSocketHandler(LengthPrefixedAsyncioSocketHandler):
+            max_frame_size = 10
+
+        async def send_big_frame(reader, writer):
+            writer.write(MessageFramer().frame(b"a" * 11))
+            return await reader.read(1)
+
+        self.assertEqual(self.run_with_server(SmallFramesSocketHandler, send_big_frame), b"")
+
+    def test_writeMessage_waitsForPausedTransportToDrain(self):
+        written_messages = []
+        transport = flexmock(is_closing=lambda: False, write=written_messages.append)
+        handler = LengthPrefixedAsyncioSocketHandler(self.comm_environment)
+
+        async def write_while_paused():
+            handler.connection_made(transport)
+            handler.pause_writing()
+            handler.write_message("m0")
+            handler.write_message("m1")
+            self.assertEqual(written_messages, [MessageFramer().frame("m0")])
+            handler.resume_writing()
+            await asyncio.sleep(0)
+            handler.connection_lost(None)
+
+        asyncio.run(write_while_paused())
+
+        self.assertEqual(written_messages, [MessageFramer().frame("m0"), MessageFramer().frame("m1")])
@@ -0,0 +1,69 @@
+# coding=utf-8
+import json
+import socket
+import threading
+import unittest
+
+from wshubsapi.connection_handlers.socket_handler import create_socket_server, LengthPrefixedSocketHandler, \
+    SocketHandler
+from wshubsapi.hub import Hub
+from wshubsapi.hubs_inspector import HubsInspector
+from wshubsapi.message_framer import MessageFramer
+from wshubsapi.message_separator import MessageSeparator
+from wshubsapi.test.utils.hubs_utils import remove_hubs_subclasses
+
+
+class TestSocketHandler(unittest.TestCase):
+    def setUp(self):
+        class EchoHub(Hub):
+            def echo(self, message):
+                return message
+
+        HubsInspector.inspect_implemented_hubs(force_reconstruction=True)
+        self.servers = []
+        self.client_sockets = []
+
+    def tearDown(self):
+        for client_socket in self.client_sockets:
+            client_socket.close()
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+        remove_hubs_subclasses()
+
+    def connect(self, socket_handler_class):
+        server = create_socket_server("127.0.0.1", 0, socket_handler_class)
+        self.servers.append(server)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        client_socket = socket.create_connection(server.server_address, timeout=5)
+        self.client_sockets.append(client_socket)
+        return client_socket
+
+    def call_echo(self, client_socket, message_framer, message):
+        call = dict(hub="EchoHub", function="echo", args=[message], ID=1)
+        client_socket.sendall(message_framer.frame(json.dumps(call)))
+        messages = []
+        while not messages:
+            messages = message_framer.receive(client_socket)
+        reply = json.loads(messages[0])
+        return reply["success"], reply["reply"]
+
+    def test_lengthPrefixedHandler_repliesMessagesContainingSeparators(self):
+        client_socket = self.connect(LengthPrefixedSocketHandler)
+        message = ("ñ" + MessageSeparator.DEFAULT_API_SEP) * 100000
+
+        self.assertEqual(self.call_echo(client_socket, MessageFramer(), message), (True, message))
+
+    def test_lengthPrefixedHandler_closesConnectionIfFrameIsBiggerThanMaxFrameSize(self):
+        class SmallFramesSocketHandler(LengthPrefixedSocketHandler):
+            max_frame_size = 10
+
+        client_socket = self.connect(SmallFramesSocketHandler)
+        client_socket.sendall(MessageFramer().frame(b"a" * 11))
+
+        self.assertEqual(client_socket.recv(1), b"")
+
+    def test_socketHandler_usesSeparatorByDefault(self):
+        client_socket = self.connect(SocketHandler)
+
+        self.assertEqual(self.call_echo(client_socket, MessageSeparator(), "hi"), (True, "hi"))
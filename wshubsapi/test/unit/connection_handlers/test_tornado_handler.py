@@ -1,6 +1,7 @@
 # coding=utf-8
 import unittest
 
+import tornado.httputil
 import tornado.web
 from flexmock import flexmock, flexmock_teardown
 
@@ -12,8 +13,8 @@ class TestTornadoHandler(unittest.TestCase):
     def setUp(self):
         CommEnvironment.get_instance(max_workers=0)
         app = self.get_app()
-        connection = flexmock(set_close_callback=lambda *args: None)
-        request = tornado.web._RequestDispatcher(app, connection)
+        connection = flexmock(set_close_callback=lambda *args: None, context=None)
+        request = tornado.httputil.HTTPServerRequest(method="GET", uri="/path/to/websocket", connection=connection)
         self.connection_handler = ConnectionHandler(app, request)
 
     def get_app(self):
@@ -23,6 +24,14 @@ class TestTornadoHandler(unittest.TestCase):
         return self.app
 
     def tearDown(self):
-        del self.connection_handler.comm_environment.message_received_queue
         flexmock_teardown()
 
+
+    def test_connectedClient_writesMessagesInOutboundQueue(self):
+        flexmock(self.connection_handler._outbound_queue).should_receive("put").with_args("message").and_return(True)\
+            .once()
+
+        self.assertTrue(self.connection_handler._connected_client.api_write_message("message"))
+
+    def test_writeMessage_keepsTornadoContract(self):
+        self.assertRaises(tornado.websocket.WebSocketClosedError, self.connection_handler.write_message, dict(a=1))
@@ -113,6 +113,14 @@ class TestClientFileGenerator(unittest.TestCase):
         self.assertTrue(os.path.exists(full_path))
         self.assertTrue(os.path.exists(package_file_path), "Check if python package is created")
 
+    def test_PythonCreation_asyncioClient(self):
+        HubsInspector.construct_python_file(asyncio_client=True)
+
+        with open(HubsInspector.DEFAULT_PY_API_FILE_NAME) as api_file:
+            api_code = api_file.read()
+        compile(api_code, HubsInspector.DEFAULT_PY_API_FILE_NAME, "exec")
+        self.assertIn("async def connect(self):", api_code)
+
     def test_DartCreation_default_values(self):
         HubsInspector.construct_dart_file()
 
@@ -0,0 +1,63 @@
+# coding=utf-8
+import unittest
+
+from wshubsapi.clients_attributes_index import ClientsAttributesIndex
+from wshubsapi.comm_environment import CommEnvironment
+from wshubsapi.connected_client import ConnectedClient
+
+
+class TestClientsAttributesIndex(unittest.TestCase):
+    def setUp(self):
+        ClientsAttributesIndex.add_index("user_id")
+        comm_environment = CommEnvironment()
+        self.clients = [ConnectedClient(comm_environment, None) for _ in range(3)]
+
+    def tearDown(self):
+        ClientsAttributesIndex.remove_index("user_id")
+
+    def test_setAttribute_indexesClientsWithTheSameValue(self):
+        ClientsAttributesIndex.set_attribute(self.clients[0], "user_id", 42)
+        ClientsAttributesIndex.set_attribute(self.clients[1], "user_id", 42)
+        ClientsAttributesIndex.set_attribute(self.clients[2], "user_id", 7)
+
+        self.assertEqual(ClientsAttributesIndex.get_clients("user_id", 42), tuple(self.clients[:2]))
+        self.assertEqual(ClientsAttributesIndex.get_clients("user_id", 7), (self.clients[2],))
+        self.assertEqual(self.clients[0].user_id, 42)
+
+    def test_setAttribute_movesClientIfValueChanges(self):
+        ClientsAttributesIndex.set_attribute(self.clients[0], "user_id", 42)
+
+        ClientsAttributesIndex.set_attribute(self.clients[0], "user_id", 7)
+
+        self.assertEqual(ClientsAttributesIndex.get_clients("user_id", 42), ())
+        self.assertEqual(ClientsAttributesIndex.get_clients("user_id", 7), (self.clients[0],))
+
+    def test_setAttribute_doesNotIndexClosedClients(self):
+        self.clients[0].api_is_closed = True
+
+        ClientsAttributesIndex.set_attribute(self.clients[0], "user_id", 42)
+
+        self.assertEqual(ClientsAttributesIndex.get_clients("user_id", 42), ())
+
+    def test_setAttribute_onlySetsNotIndexedAttributes(self):
+        ClientsAttributesIndex.set_attribute(self.clients[0], "name", "Jorge")
+
+        self.assertEqual(self.clients[0].name, "Jorge")
+        self.assertRaises(KeyError, ClientsAttributesIndex.get_clients, "name", "Jorge")
+
+    def test_addIndex_indexesExistingClients(self):
+        self.clients[0].room = "a"
+        self.clients[1].room = "a"
+        self.addCleanup(ClientsAttributesIndex.remove_index, "room")
+
+        ClientsAttributesIndex.add_index("room", self.clients)
+
+        self.assertEqual(ClientsAttributesIndex.get_clients("room", "a"), tuple(self.clients[:2]))
+
+    def test_removeClient_removesClientFromAllIndexes(self):
+        ClientsAttributesIndex.set_attribute(self.clients[0], "user_id", 42)
+        ClientsAttributesIndex.set_attribute(self.clients[1], "user_id", 42)
+
+        ClientsAttributesIndex.remove_client(self.clients[0])
+
+        self.assertEqual(ClientsAttributesIndex.get_clients("user_id", 42), (self.clients[1],))
@@ -0,0 +1,45 @@
+# coding=utf-8
+import unittest
+
+from wshubsapi.clients_set import ClientsSet
+
+
+class TestClientsSet(unittest.TestCase):
+    def setUp(self):
+        self.clients_set = ClientsSet()
+
+    def test_add_keepsInsertionOrderAndReturnsFalseIfAlreadyAdded(self):
+        self.assertTrue(self.clients_set.add("b"))
+        self.assertTrue(self.clients_set.add("a"))
+        self.assertFalse(self.clients_set.add("b"))
+
+        self.assertEqual(list(self.clients_set), ["b", "a"])
+        self.assertEqual(len(self.clients_set), 2)
+        self.assertIn("a", self.clients_set)
+
+    def test_discard_returnsFalseIfClientNotInSet(self):
+        self.clients_set.add("a")
+
+        self.assertTrue(self.clients_set.discard("a"))
+        self.assertFalse(self.clients_set.discard("a"))
+        self.assertNotIn("a", self.clients_set)
+
+    def test_snapshot_isNotModifiedByLaterChanges(self):
+        self.clients_set.add("a")
+        snapshot = self.clients_set.snapshot
+
+        self.clients_set.add("b")
+        self.clients_set.discard("a")
+
+        self.assertEqual(snapshot, ("a",))
+        self.assertEqual(self.clients_set.snapshot, ("b",))
+
+    def test_snapshot_isReusedUntilTheSetChanges(self):
+        self.clients_set.add("a")
+        snapshot = self.clients_set.snapshot
+
+        self.assertIs(self.clients_set.snapshot, snapshot)
+        self.clients_set.add("a")
+        self.assertIs(self.clients_set.snapshot, snapshot)
+        self.clients_set.add("b")
+        self.assertIsNot(self.clients_set.snapshot, snapshot)
@@ -1,4 +1,9 @@
 # coding=utf-8
+import asyncio
+import json
+import threading
+from concurrent.futures import Future
+
 from flexmock import flexmock, flexmock_teardown
 
 try:
@@ -8,15 +13,22 @@ except ImportError:
 import unittest
 
 from wshubsapi.connected_client import ConnectedClient
-from wshubsapi.comm_environment import CommEnvironment
+from wshubsapi.comm_environment import CommEnvironment, HubsApiException
 from wshubsapi.connected_clients_holder import ConnectedClientsHolder
+from wshubsapi.hub import Hub
+from wshubsapi.hubs_inspector import HubsInspector
+from wshubsapi.serializer import MsgPackSerializer, msgpack
+from wshubsapi.test.utils.hubs_utils import remove_hubs_subclasses
 
 
 class TestCommProtocol(unittest.TestCase):
     def setUp(self):
+        ConnectedClientsHolder.all_connected_clients.clear()
         self.comm_environment = CommEnvironment(unprovided_id_template="unprovided_{}")
 
     def tearDown(self):
+        self.comm_environment.close()
+        ConnectedClientsHolder.all_connected_clients.clear()
         flexmock_teardown()
         super(TestCommProtocol, self).tearDown()
 
@@ -47,3 +59,223 @@ class TestCommProtocol(unittest.TestCase):
         unprovidedId2 = self.comm_environment.get_unprovided_id()
 
         self.assertEqual(unprovidedId2, "unprovided_0")
+
+    def test_onClosed_releasesUnprovidedIdToBeRecycled(self):
+        first_client = ConnectedClient(self.comm_environment, lambda x: x)
+        second_client = ConnectedClient(self.comm_environment, lambda x: x)
+        self.comm_environment.on_opened(first_client)
+        self.comm_environment.on_opened(second_client)
+
+        self.comm_environment.on_closed(first_client)
+
+        self.assertEqual(self.comm_environment.get_unprovided_id(), "unprovided_0")
+        self.assertEqual(self.comm_environment.get_unprovided_id(), "unprovided_2")
+
+    def test_onClosed_twiceDoesNotEvictNewClientWithRecycledId(self):
+        first_client = ConnectedClient(self.comm_environment, lambda x: x)
+        self.comm_environment.on_opened(first_client)
+        self.comm_environment.on_closed(first_client)
+        second_client = ConnectedClient(self.comm_environment, lambda x: x)
+        self.comm_environment.on_opened(second_client)
+
+        self.comm_environment.on_closed(first_client)
+
+        self.assertEqual(second_client.ID, "unprovided_0")
+        self.assertIs(self.comm_environment.all_connected_clients["unprovided_0"], second_client)
+        self.assertEqual(self.comm_environment.get_unprovided_id(), "unprovided_1")
+
+    def test_onClosed_doesNotReleaseIdsProvidedByClients(self):
+        client = ConnectedClient(self.comm_environment, lambda x: x)
+        self.comm_environment.on_opened(client, "providedId")
+
+        self.comm_environment.on_closed(client)
+
+        self.assertEqual(len(self.comm_environment.available_unprovided_ids), 0)
+
+    def test_getUnprovidedID_skipsReleasedIdsUsedByOtherClients(self):
+        client = ConnectedClient(self.comm_environment, lambda x: x)
+        self.comm_environment.on_opened(client)
+        self.comm_environment.on_closed(client)
+        self.comm_environment.on_opened(ConnectedClient(self.comm_environment, lambda x: x), "unprovided_0")
+
+        unprovidedId = self.comm_environment.get_unprovided_id()
+
+        self.assertEqual(unprovidedId, "unprovided_1")
+
+    def test_getNewClientsFuture_returnsConcurrentFutureWithoutLoop(self):
+        future, id_ = self.comm_environment.get_new_clients_future()
+
+        self.assertIsInstance(future, Future)
+
+    def test_getNewClientsFuture_returnsAsyncioFutureResolvedInLoop(self):
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        comm_environment = CommEnvironment(loop=loop)
+        future, id_ = comm_environment.get_new_clients_future()
+        reply = json.dumps(dict(ID=id_, reply="result", success=True))
+
+        async def on_replayed():
+            comm_environment.on_message(ConnectedClient(comm_environment, None), reply)
+            return await asyncio.wait_for(future, 1)
+
+        self.assertIsInstance(future, asyncio.Future)
+        self.assertEqual(loop.run_until_complete(on_replayed()), "result")
+
+    def test_onMessage_executesHubFunctionsInWorkerPoolWhenMaxWorkers(self):
+        class WorkerHub(Hub):
+            def get_thread_name(self):
+                return threading.current_thread().name
+
+        HubsInspector.inspect_implemented_hubs(force_reconstruction=True)
+        self.addCleanup(remove_hubs_subclasses)
+        comm_environment = CommEnvironment(max_workers=2)
+        self.addCleanup(comm_environment.close)
+        written_message = Future()
+        client = ConnectedClient(comm_environment, written_message.set_result)
+        message = dict(hub="WorkerHub", function="get_thread_name", args=[], ID=3)
+
+        comm_environment.on_message(client, json.dumps(message))
+
+        reply = json.loads(written_message.result(timeout=1))
+        self.assertNotEqual(reply["reply"], threading.current_thread().name)
+        self.assertEqual(reply["ID"], 3)
+
+    def test_onMessage_executesCoroutinesInArrivalOrderWithSyncFunctionsWhenMaxWorkers(self):
+        executed_functions = []
+
+        class OrderHub(Hub):
+            async def slow_coroutine(self):
+                await asyncio.sleep(0.05)
+                executed_functions.append("slow_coroutine")
+
+            def sync_function(self):
+                executed_functions.append("sync_function")
+
+        HubsInspector.inspect_implemented_hubs(force_reconstruction=True)
+        self.addCleanup(remove_hubs_subclasses)
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        comm_environment = CommEnvironment(loop=loop, max_workers=2)
+        self.addCleanup(comm_environment.close)
+        written_messages = []
+        client = ConnectedClient(comm_environment, written_messages.append)
+
+        async def on_messages():
+            for i, function in enumerate(["slow_coroutine", "sync_function"]):
+                comm_environment.on_message(client, json.dumps(dict(hub="OrderHub", function=function, args=[], ID=i)))
+            while len(written_messages) < 2:
+                await asyncio.sleep(0.01)
+
+        loop.run_until_complete(asyncio.wait_for(on_messages(), 1))
+        self.assertEqual(executed_functions, ["slow_coroutine", "sync_function"])
+        self.assertEqual([json.loads(m)["ID"] for m in written_messages], [0, 1])
+
+    def test_onMessage_repliesWhenFutureReturnedByHubFunctionIsDone(self):
+        hub_future = Future()
+
+        class DeferredHub(Hub):
+            def get_deferred(self):
+                return hub_future
+
+        HubsInspector.inspect_implemented_hubs(force_reconstruction=True)
+        self.addCleanup(remove_hubs_subclasses)
+        written_messages = []
+        client = ConnectedClient(self.comm_environment, written_messages.append)
+        message = dict(hub="DeferredHub", function="get_deferred", args=[], ID=3)
+
+        self.comm_environment.on_message(client, json.dumps(message))
+        self.assertEqual(written_messages, [])
+        hub_future.set_result("deferred")
+
+        reply = json.loads(written_messages[0])
+        self.assertEqual((reply["reply"], reply["success"], reply["ID"]), ("deferred", True, 3))
+
+    def test_onMessage_batchedRepliesWaitForDeferredReplies(self):
+        hub_future = Future()
+
+        class DeferredHub(Hub):
+            def get_deferred(self):
+                return hub_future
+
+            def get_now(self):
+                return "now"
+
+        HubsInspector.inspect_implemented_hubs(force_reconstruction=True)
+        self.addCleanup(remove_hubs_subclasses)
+        written_messages = []
+        client = ConnectedClient(self.comm_environment, written_messages.append)
+        messages = [dict(hub="DeferredHub", function="get_deferred", args=[], ID=1),
+                    dict(hub="DeferredHub", function="get_now", args=[], ID=2)]
+
+        self.comm_environment.on_message(client, json.dumps(messages))
+        self.assertEqual(written_messages, [])
+        hub_future.set_exception(Exception("deferred error"))
+
+        replies = json.loads(written_messages[0])
+        self.assertEqual([r["success"] for r in replies], [False, True])
+        self.assertEqual(replies[0]["reply"]["error"], "deferred error")
+        self.assertEqual(replies[1]["reply"], "now")
+
+    def test_getNewClientsFuture_failsFutureIfClientDoesNotReplyInTime(self):
+        future, id_ = self.comm_environment.get_new_clients_future(timeout=0.01)
+
+        self.assertRaises(HubsApiException, future.result, 1)
+        self.assertEqual(self.comm_environment.get_pending_futures_count(), 0)
+
+    def test_getNewClientsFuture_usesDefaultTimeoutIfNoneProvided(self):
+        comm_environment = CommEnvironment(client_function_timeout=0.01)
+        self.addCleanup(comm_environment.close)
+
+        future, id_ = comm_environment.get_new_clients_future()
+
+        self.assertRaises(HubsApiException, future.result, 1)
+
+    def test_getNewClientsFuture_cancelsTimeoutIfClientReplies(self):
+        future, id_ = self.comm_environment.get_new_clients_future(timeout=10)
+        reply = json.dumps(dict(ID=id_, reply="result", success=True))
+
+        self.comm_environment.on_message(ConnectedClient(self.comm_environment, None), reply)
+
+        self.assertEqual(future.result(timeout=0), "result")
+        self.assertEqual(len(self.comm_environment.timing_wheel), 0)
+
+    def test_onClosed_failsAllPendingFuturesOfClient(self):
+        client = ConnectedClient(self.comm_environment, lambda x: x)
+        other_client = ConnectedClient(self.comm_environment, lambda x: x)
+        self.comm_environment.on_opened(client)
+        self.comm_environment.on_opened(other_client)
+        futures = [self.comm_environment.get_new_clients_future(client)[0] for _ in range(3)]
+        other_future, _ = self.comm_environment.get_new_clients_future(other_client)
+
+        self.comm_environment.on_closed(client)
+        self.comm_environment.on_closed(other_client)
+
+        for future in futures + [other_future]:
+            self.assertRaises(HubsApiException, future.result, 0)
+        self.assertEqual(self.comm_environment.get_pending_futures_count(), 0)
+
+    @unittest.skipIf(msgpack is None, "msgpack not installed")
+    def test_setClientEncoding_msgpackClientsReceiveBinaryMessages(self):
+        written_messages = []
+        client = ConnectedClient(self.comm_environment, written_messages.append)
+
+        self.comm_environment.set_client_encoding(client, "msgpack")
+        self.comm_environment.reply(client, dict(ID=1, reply="hi", success=True), None)
+
+        self.assertIsInstance(client.api_serializer, MsgPackSerializer)
+        self.assertEqual(msgpack.unpackb(written_messages[0], raw=False), dict(ID=1, reply="hi", success=True))
+
+    @unittest.skipIf(msgpack is None, "msgpack not installed")
+    def test_onMessage_unserializesWithClientEncoding(self):
+        client = ConnectedClient(self.comm_environment, None)
+        self.comm_environment.set_client_encoding(client, "msgpack")
+        future, id_ = self.comm_environment.get_new_clients_future()
+
+        self.comm_environment.on_message(client, msgpack.packb(dict(ID=id_, reply="result", success=True)))
+
+        self.assertEqual(future.result(timeout=0), "result")
+
+    def test_setClientEncoding_raisesExceptionIfUnknownEncoding(self):
+        client = ConnectedClient(self.comm_environment, None)
+
+        self.assertRaises(HubsApiException, self.comm_environment.set_client_encoding, client, "xml")
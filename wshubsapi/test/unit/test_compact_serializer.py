@@ -0,0 +1,164 @@
+# coding=utf-8
+import json
+import unittest
+from datetime import datetime
+
+from flexmock import flexmock_teardown
+
+from wshubsapi.comm_environment import CommEnvironment, HubsApiException
+from wshubsapi.compact_serializer import CompactSerializer
+from wshubsapi.connected_client import ConnectedClient
+from wshubsapi.connected_clients_group import ConnectedClientsGroup
+from wshubsapi.hub import Hub
+from wshubsapi.hubs_inspector import HubsInspector
+from wshubsapi.serializer import Serializer, MsgPackSerializer, JSON_BACKENDS, msgpack
+from wshubsapi.test.utils.hubs_utils import remove_hubs_subclasses
+
+ENVELOPE_TABLES = [("ChatHub", ["join", "send_message"], ["on_joined", "print_message"]),
+                   ("EchoHub", ["echo"], [])]
+
+
+class TestCompactSerializer(unittest.TestCase):
+    def setUp(self):
+        self.serializer = CompactSerializer(Serializer(), ENVELOPE_TABLES)
+        self.client_serializer = CompactSerializer(Serializer(), ENVELOPE_TABLES, is_client=True)
+
+    def test_serialize_callsUseHubAndClientFunctionIndexes(self):
+        message = dict(hub="ChatHub", function="print_message", args=["hi"], ID=3)
+
+        self.assertEqual(json.loads(self.serializer.serialize(message)), [0, 3, 0, 1, ["hi"]])
+
+    def test_serialize_repliesDoNotIncludeHubAndFunction(self):
+        reply = dict(success=True, reply=[1, 2], hub="EchoHub", function="echo", ID=3)
+        partial_reply = dict(reply, partial=True)
+
+        self.assertEqual(json.loads(self.serializer.serialize(reply)), [1, 3, True, [1, 2]])
+        self.assertEqual(json.loads(self.serializer.serialize(partial_reply)), [2, 3, [1, 2]])
+        self.assertEqual(json.loads(self.serializer.serialize([reply, reply])), [[1, 3, True, [1, 2]]] * 2)
+
+    def test_serialize_namesNotFoundInTablesAreSentAsStrings(self):
+        bridge_message = dict(hub="ChatHub", function="_client_to_clients_bridge", args=[], ID=1)
+        unknown_hub_message = dict(hub="NewHub", function="f", args=[], ID=1)
+
+        self.assertEqual(json.loads(self.serializer.serialize(bridge_message)),
+                         [0, 1, 0, "_client_to_clients_bridge", []])
+        self.assertEqual(json.loads(self.serializer.serialize(unknown_hub_message)), [0, 1, "NewHub", "f", []])
+
+    def test_unserialize_expandsMessagesSentByClientSerializer(self):
+        date = datetime(2016, 5, 4, 3, 2, 1)
+        messages = [dict(hub="ChatHub", function="send_message", args=[date], ID=1),
+                    dict(hub="EchoHub", function="echo", args=[], ID=2),
+                    dict(hub="ChatHub", function="_client_to_clients_bridge", args=[], ID=3),
+                    dict(success=False, reply="error", ID=4)]
+
+        for message in messages:
+            self.assertEqual(self.serializer.unserialize(self.client_serializer.serialize(message)), message)
+        self.assertEqual(self.serializer.unserialize(self.client_serializer.serialize(messages)), messages)
+        self.assertEqual(self.serializer.unserialize(self.client_serializer.serialize([])), [])
+
+    def test_unserialize_callsWithoutIdAreNotifications(self):
+        notification = dict(hub="ChatHub", function="print_message", args=["hi"])
+
+        self.assertEqual(self.client_serializer.unserialize(self.serializer.serialize(notification)), notification)
+
+    def test_serialize_isSmallerThanDefaultEnvelope(self):
+        message = dict(hub="ChatHub", function="send_message", args=["hi"], ID=123)
+
+        self.assertLess(len(self.client_serializer.serialize(message)) * 2, len(Serializer().serialize(message)))
+
+    def test_appendMessageId_replacesNullIdForAllJsonBackends(self):
+        for json_backend in JSON_BACKENDS:
+            serializer = CompactSerializer(Serializer(json_backend=json_backend), ENVELOPE_TABLES)
+            serialization = serializer.serialize(dict(hub="ChatHub", function="on_joined", args=[None]))
+
+            message = json.loads(serializer.append_message_id(serialization, 42))
+
+            self.assertEqual(message, [0, 42, 0, 0, [None]], json_backend)
+
+    def test_joinMessages_joinsEnvelopesAndBatchesInOneBatch(self):
+        reply = dict(success=True, reply=1, ID=1)
+        serialized_messages = [self.serializer.serialize(reply), self.serializer.serialize([reply, reply]),
+                               self.serializer.serialize([])]
+
+        self.assertEqual(self.client_serializer.unserialize(self.serializer.join_messages(serialized_messages)),
+                         [reply] * 3)
+
+
+@unittest.skipIf(msgpack is None, "msgpack not installed")
+class TestCompactMsgPackSerializer(unittest.TestCase):
+    def setUp(self):
+        self.serializer = CompactSerializer(MsgPackSerializer(), ENVELOPE_TABLES)
+        self.client_serializer = CompactSerializer(MsgPackSerializer(), ENVELOPE_TABLES, is_client=True)
+
+    def test_appendMessageId_replacesNilId(self):
+        serialization = self.serializer.serialize(dict(hub="ChatHub", function="on_joined", args=[1]))
+
+        for id_ in [1, 300, 2 ** 40]:
+            message = self.client_serializer.unserialize(self.serializer.append_message_id(serialization, id_))
+
+            self.assertEqual(message, dict(hub="ChatHub", function="on_joined", args=[1], ID=id_))
+
+    def test_joinMessages_joinsEnvelopesAndBatchesInOneBatch(self):
+        reply = dict(success=True, reply="a", ID=1)
+        serialized_messages = [self.serializer.serialize(reply), self.serializer.serialize([reply] * 20),
+                               self.serializer.serialize([])]
+
+        self.assertEqual(self.client_serializer.unserialize(self.serializer.join_messages(serialized_messages)),
+                         [reply] * 21)
+
+
+class TestCommEnvironmentCompactEnvelope(unittest.TestCase):
+    def setUp(self):
+        class ChatHub(Hub):
+            def send_message(self, message):
+                return message
+
+            def _define_client_functions(self):
+                return dict(print_message=lambda message: None)
+
+        HubsInspector.inspect_implemented_hubs(force_reconstruction=True)
+        self.comm_environment = CommEnvironment(max_workers=0)
+        self.hub_index = [table[0] for table in HubsInspector.get_envelope_tables()].index("ChatHub")
+
+    def tearDown(self):
+        self.comm_environment.close()
+        remove_hubs_subclasses()
+        flexmock_teardown()
+
+    def construct_client(self, envelope):
+        written_messages = []
+        client = ConnectedClient(self.comm_environment, written_messages.append)
+        envelope_hash = CompactSerializer.get_tables_hash(HubsInspector.get_envelope_tables())
+        self.comm_environment.set_client_encoding(client, None, envelope, envelope_hash)
+        return client, written_messages
+
+    def test_setClientEncoding_unknownEnvelopeRaisesException(self):
+        client = ConnectedClient(self.comm_environment, None)
+
+        self.assertRaises(HubsApiException, self.comm_environment.set_client_encoding, client, None, "tiny")
+
+    def test_setClientEncoding_compactEnvelopeWithOtherTablesHashRaisesException(self):
+        client = ConnectedClient(self.comm_environment, None)
+        tables = HubsInspector.get_envelope_tables() + [("NewHub", ["new_function"], [])]
+
+        self.assertRaises(HubsApiException, self.comm_environment.set_client_encoding, client, None, "compact",
+                          CompactSerializer.get_tables_hash(tables))
+        self.assertRaises(HubsApiException, self.comm_environment.set_client_encoding, client, None, "compact")
+        self.assertIsNone(client.api_serializer)
+
+    def test_onMessage_compactCallsAreRepliedWithCompactReplies(self):
+        client, written_messages = self.construct_client("compact")
+        function_index = HubsInspector.get_envelope_tables()[self.hub_index][1].index("send_message")
+
+        self.comm_environment.on_message(client, json.dumps([0, 5, self.hub_index, function_index, ["hi"]]))
+
+        self.assertEqual(json.loads(written_messages[0]), [1, 5, True, "hi"])
+
+    def test_broadcast_eachClientReceivesItsEnvelope(self):
+        compact_client, compact_messages = self.construct_client("compact")
+        default_client, default_messages = self.construct_client(None)
+
+        ConnectedClientsGroup([compact_client, default_client], "ChatHub").print_message("hi", notification=True)
+
+        self.assertEqual(json.loads(compact_messages[0]), [0, None, self.hub_index, 0, ["hi"]])
+        self.assertEqual(json.loads(default_messages[0]), dict(hub="ChatHub", function="print_message", args=["hi"]))
@@ -1,5 +1,8 @@
 # coding=utf-8
+import asyncio
+from concurrent.futures import Future
 import json
+import threading
 import unittest
 
 from jsonpickle.pickler import Pickler
@@ -26,6 +29,55 @@ class TestConnectedClient(unittest.TestCase):
             def test_function_error(self):
                 raise Exception("Error")
 
+            async def test_coroutine(self, x):
+                await asyncio.sleep(0)
+                return x
+
+            async def test_coroutine_error(self):
+                await asyncio.sleep(0)
+                raise Exception("Error")
+
+            @staticmethod
+            def test_thread_name():
+                return threading.current_thread().name
+
+            @staticmethod
+            def test_awaitable(x):
+                return asyncio.sleep(0, x)
+
+            @staticmethod
+            def test_asyncio_future(x):
+                future = asyncio.get_event_loop().create_future()
+                future.set_result(x)
+                return future
+
+            def test_unsuccessful_future(self):
+                future = Future()
+                future.set_result(self._construct_unsuccessful_replay("unsuccessful"))
+                return future
+
+            @staticmethod
+            def test_generator(count):
+                for i in range(count):
+                    yield i
+
+            @staticmethod
+            def test_generator_error():
+                yield 0
+                raise Exception("Error")
+
+            @staticmethod
+            async def test_async_generator(count):
+                for i in range(count):
+                    await asyncio.sleep(0)
+                    yield i
+
+            @staticmethod
+            def test_cancelled_future():
+                future = Future()
+                future.cancel()
+                return future
+
         class ClientMock:
             def __init__(self):
                 self.writeMessage = flexmock()
@@ -109,6 +161,236 @@ class TestConnectedClient(unittest.TestCase):
 
         self.commEnvironment.on_message(self.connectedClient, message_str + "breaking message")
 
+    def test_onMessage_repliesBatchedMessagesInOneBatchedReply(self):
+        messages = [MessageCreator.create_on_message_message(hub=self.testHubClass.__HubName__,
+                                                             function="testFunctionReplayArg", args=[i], ID=i)
+                    for i in range(3)]
+        written_messages = []
+        connected_client = ConnectedClient(self.commEnvironment, written_messages.append)
+
+        self.commEnvironment.on_message(connected_client, json.dumps(messages))
+
+        self.assertEqual(len(written_messages), 1)
+        replies = json.loads(written_messages[0])
+        self.assertEqual([reply["reply"] for reply in replies], [0, 1, 2])
+        self.assertEqual([reply["ID"] for reply in replies], [0, 1, 2])
+
+    def test_onMessage_batchedRepliesIncludeUnsuccessfulCalls(self):
+        messages = [MessageCreator.create_on_message_message(hub=self.testHubClass.__HubName__,
+                                                             function="test_function_error", args=[]),
+                    MessageCreator.create_on_message_message(hub=self.testHubClass.__HubName__,
+                                                             function="testFunctionReplayArg", args=[1])]
+        written_messages = []
+        connected_client = ConnectedClient(self.commEnvironment, written_messages.append)
+
+        self.commEnvironment.on_message(connected_client, json.dumps(messages))
+
+        replies = json.loads(written_messages[0])
+        self.assertEqual([reply["success"] for reply in replies], [False, True])
+
+    def __run_on_message_in_loop(self, function_str, args):
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        comm_environment = CommEnvironment(loop=loop)
+        written_message = loop.create_future()
+        connected_client = ConnectedClient(comm_environment, written_message.set_result)
+        message_str = json.dumps(MessageCreator.create_on_message_message(hub=self.testHubClass.__HubName__,
+                                                                          function=function_str, args=args))
+
+        async def on_message():
+            comm_environment.on_message(connected_client, message_str)
+            return await asyncio.wait_for(written_message, 1)
+
+        return json.loads(loop.run_until_complete(on_message()))
+
+    def test_onMessage_awaitsCoroutineFunctionsInLoopAndReplies(self):
+        reply = self.__run_on_message_in_loop("test_coroutine", [5])
+
+        self.assertTrue(reply["success"])
+        self.assertEqual(reply["reply"], 5)
+
+    def test_onMessage_repliesUnsuccessfulIfCoroutineRaisesException(self):
+        reply = self.__run_on_message_in_loop("test_coroutine_error", [])
+
+        self.assertFalse(reply["success"])
+        self.assertEqual(reply["reply"]["error"], "Error")
+
+    def test_onMessage_repliesWhenAwaitableReturnedByHubFunctionIsDone(self):
+        reply = self.__run_on_message_in_loop("test_awaitable", [5])
+
+        self.assertTrue(reply["success"])
+        self.assertEqual(reply["reply"], 5)
+
+    def test_onMessage_repliesWhenAsyncioFutureReturnedByHubFunctionIsDone(self):
+        reply = self.__run_on_message_in_loop("test_asyncio_future", [5])
+
+        self.assertTrue(reply["success"])
+        self.assertEqual(reply["reply"], 5)
+
+    def test_onMessage_batchWithCoroutinesCallsSyncFunctionsInWorkers(self):
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        comm_environment = CommEnvironment(loop=loop, max_workers=2)
+        written_message = loop.create_future()
+        connected_client = ConnectedClient(comm_environment, written_message.set_result)
+        messages = [MessageCreator.create_on_message_message(hub=self.testHubClass.__HubName__, function=function,
+                                                             args=args, ID=i)
+                    for i, (function, args) in enumerate([("test_coroutine", [5]), ("test_thread_name", [])])]
+
+        async def on_message():
+            comm_environment.on_message(connected_client, json.dumps(messages))
+            return await asyncio.wait_for(written_message, 1)
+
+        replies = json.loads(loop.run_until_complete(on_message()))
+        comm_environment.close()  # workers must not reference the test hub when it is removed in tearDown
+        self.assertEqual(replies[0]["reply"], 5)
+        self.assertTrue(replies[1]["success"])
+        self.assertNotEqual(replies[1]["reply"], threading.current_thread().name)
+
+    def test_onMessage_repliesUnsuccessfulIfAwaitableReturnedWithoutLoop(self):
+        written_messages = []
+        connected_client = ConnectedClient(self.commEnvironment, written_messages.append)
+        message_str = json.dumps(MessageCreator.create_on_message_message(hub=self.testHubClass.__HubName__,
+                                                                          function="test_awaitable", args=[5]))
+
+        self.commEnvironment.on_message(connected_client, message_str)
+
+        reply = json.loads(written_messages[0])
+        self.assertFalse(reply["success"])
+        self.assertEqual(reply["reply"]["type"], "HubsApiException")
+
+    def test_onMessage_repliesUnsuccessfulReplayReturnedInFuture(self):
+        written_messages = []
+        connected_client = ConnectedClient(self.commEnvironment, written_messages.append)
+        message_str = json.dumps(MessageCreator.create_on_message_message(hub=self.testHubClass.__HubName__,
+                                                                          function="test_unsuccessful_future", args=[]))
+
+        self.commEnvironment.on_message(connected_client, message_str)
+
+        reply = json.loads(written_messages[0])
+        self.assertFalse(reply["success"])
+        self.assertEqual(reply["reply"], "unsuccessful")
+
+    def test_onMessage_repliesUnsuccessfulIfFutureIsCancelled(self):
+        written_messages = []
+        connected_client = ConnectedClient(self.commEnvironment, written_messages.append)
+        message_str = json.dumps(MessageCreator.create_on_message_message(hub=self.testHubClass.__HubName__,
+                                                                          function="test_cancelled_future", args=[]))
+
+        self.commEnvironment.on_message(connected_client, message_str)
+
+        reply = json.loads(written_messages[0])
+        self.assertFalse(reply["success"])
+        self.assertEqual(reply["reply"]["type"], "CancelledError")
+
+    def test_onMessage_sendsGeneratorItemsAsPartialRepliesAndEndsStream(self):
+        written_messages = []
+        connected_client = ConnectedClient(self.commEnvironment, written_messages.append)
+        message_str = json.dumps(MessageCreator.create_on_message_message(hub=self.testHubClass.__HubName__,
+                                                                          function="test_generator", args=[3], ID=7))
+
+        self.commEnvironment.on_message(connected_client, message_str)
+
+        replies = [json.loads(m) for m in written_messages]
+        self.assertEqual([r["reply"] for r in replies], [0, 1, 2, None])
+        self.assertEqual([r.get("partial", False) for r in replies], [True, True, True, False])
+        self.assertTrue(all(r["ID"] == 7 and r["success"] for r in replies))
+
+    def test_onMessage_endsStreamUnsuccessfullyIfGeneratorRaisesException(self):
+        written_messages = []
+        connected_client = ConnectedClient(self.commEnvironment, written_messages.append)
+        message_str = json.dumps(MessageCreator.create_on_message_message(hub=self.testHubClass.__HubName__,
+                                                                          function="test_generator_error", args=[]))
+
+        self.commEnvironment.on_message(connected_client, message_str)
+
+        replies = [json.loads(m) for m in written_messages]
+        self.assertEqual(replies[0]["reply"], 0)
+        self.assertFalse(replies[1]["success"])
+        self.assertEqual(replies[1]["reply"]["error"], "Error")
+
+    def test_onMessage_sendsAsyncGeneratorItemsAsPartialRepliesInLoop(self):
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        comm_environment = CommEnvironment(loop=loop)
+        written_messages = []
+        stream_ended = loop.create_future()
+
+        def write_message(message):
+            written_messages.append(json.loads(message))
+            if "partial" not in written_messages[-1]:
+                stream_ended.set_result(True)
+
+        connected_client = ConnectedClient(comm_environment, write_message)
+        message_str = json.dumps(MessageCreator.create_on_message_message(hub=self.testHubClass.__HubName__,
+                                                                          function="test_async_generator", args=[2]))
+
+        async def on_message():
+            comm_environment.on_message(connected_client, message_str)
+            return await asyncio.wait_for(stream_ended, 1)
+
+        loop.run_until_complete(on_message())
+        self.assertEqual([r["reply"] for r in written_messages], [0, 1, None])
+        self.assertTrue(written_messages[-1]["success"])
+
+    def test_onMessage_streamsGeneratorInLoopWithoutOverflowingOutboundQueue(self):
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        comm_environment = CommEnvironment(outbound_queue_max_size=10)
+        written_messages = []
+        stream_ended = loop.create_future()
+
+        def write_to_transport(message):
+            written_messages.append(json.loads(message))
+            if "partial" not in written_messages[-1]:
+                stream_ended.set_result(True)
+            written = loop.create_future()  # as in tornado, the write is done in the next loop iteration
+            loop.call_soon(written.set_result, None)
+            return written
+
+        connected_client = ConnectedClient(comm_environment, None)
+        outbound_queue = comm_environment.construct_outbound_queue(connected_client, write_to_transport)
+        connected_client.api_write_message = outbound_queue.put
+        message_str = json.dumps(MessageCreator.create_on_message_message(hub=self.testHubClass.__HubName__,
+                                                                          function="test_generator", args=[50]))
+
+        async def on_message():
+            comm_environment.on_message(connected_client, message_str)
+            return await asyncio.wait_for(stream_ended, 1)
+
+        loop.run_until_complete(on_message())
+        self.assertEqual([r["reply"] for r in written_messages], list(range(50)) + [None])
+        self.assertEqual(outbound_queue.dropped_messages_count, 0)
+        self.assertLessEqual(outbound_queue.peak_size, 10)
+
+    def test_onMessage_repliesUnsuccessfulIfCoroutineFunctionWithoutLoop(self):
+        written_messages = []
+        connected_client = ConnectedClient(self.commEnvironment, written_messages.append)
+        message_str = json.dumps(MessageCreator.create_on_message_message(hub=self.testHubClass.__HubName__,
+                                                                          function="test_coroutine", args=[1], ID=4))
+
+        self.commEnvironment.on_message(connected_client, message_str)
+
+        reply = json.loads(written_messages[0])
+        self.assertEqual(reply["ID"], 4)
+        self.assertFalse(reply["success"])
+        self.assertEqual(reply["reply"]["type"], "HubsApiException")
+
+    def test_onMessage_repliesUnsuccessfulBatchEntryIfCoroutineFunctionWithoutLoop(self):
+        written_messages = []
+        connected_client = ConnectedClient(self.commEnvironment, written_messages.append)
+        messages = [MessageCreator.create_on_message_message(hub=self.testHubClass.__HubName__,
+                                                             function="test_coroutine", args=[1], ID=1),
+                    MessageCreator.create_on_message_message(hub=self.testHubClass.__HubName__,
+                                                             function="testFunctionReplayArg", args=[2], ID=2)]
+
+        self.commEnvironment.on_message(connected_client, json.dumps(messages))
+
+        replies = json.loads(written_messages[0])
+        self.assertEqual([r["success"] for r in replies], [False, True])
+        self.assertEqual(replies[0]["reply"]["type"], "HubsApiException")
+        self.assertEqual(replies[1]["reply"], 2)
+
     def test_onClose_removeExistingConnectedClient(self):
         id_ = 3
         self.commEnvironment.on_opened(self.connectedClient, id_)
@@ -3,6 +3,7 @@ import unittest
 from flexmock import flexmock, flexmock_teardown
 
 from wshubsapi.client_in_hub import ClientInHub
+from wshubsapi.clients_attributes_index import ClientsAttributesIndex
 from wshubsapi.comm_environment import CommEnvironment
 from wshubsapi.connected_client import ConnectedClient
 from wshubsapi.connected_clients_holder import ConnectedClientsHolder
@@ -39,6 +40,9 @@ class TestConnectedClientsHolder(unittest.TestCase):
         for c in clients_group:
             self.assertIsInstance(c, ClientInHub)
 
+    def __get_connected_clients(self):
+        return [c.api_get_real_connected_client() for c in self.clients_holder.get_all_clients()]
+
     def test_get_all_clients__returns_10_connected_clients_with_different_ids(self):
         checked_ids = []
 
@@ -91,6 +95,41 @@ class TestConnectedClientsHolder(unittest.TestCase):
         client.test_call_function()
         self.assertTrue(self.message_checked)
 
+    def test_get_all_clients__calls_client_function_serializing_message_once(self):
+        comm_environment = CommEnvironment()
+        written_messages = []
+        for client in self.clients_holder.get_all_clients():
+            connected_client = client.api_get_real_connected_client()
+            connected_client.api_get_comm_environment = lambda: comm_environment
+            connected_client.api_write_message = written_messages.append
+        flexmock(comm_environment.serializer).should_call("serialize").once()
+
+        futures = self.clients_holder.get_all_clients().test_call_function(1, [2])
+
+        self.assertEqual(len(futures), 10)
+        messages = [comm_environment.serializer.unserialize(m) for m in written_messages]
+        self.assertEqual(len(set(m.pop("ID") for m in messages)), 10)
+        for message in messages:
+            self.assertEqual(message, dict(function="test_call_function", args=[1, [2]], hub=self.test_hub_name))
+        comm_environment.close()
+
+    def test_get_all_clients__sends_notifications_without_ids_or_futures(self):
+        comm_environment = CommEnvironment()
+        written_messages = []
+        for client in self.clients_holder.get_all_clients():
+            connected_client = client.api_get_real_connected_client()
+            connected_client.api_get_comm_environment = lambda: comm_environment
+            connected_client.api_write_message = written_messages.append
+
+        result = self.clients_holder.get_all_clients().test_call_function(1, notification=True)
+
+        self.assertIsNone(result)
+        self.assertEqual(comm_environment.get_pending_futures_count(), 0)
+        self.assertEqual(len(written_messages), 10)
+        self.assertEqual(len(set(written_messages)), 1)
+        self.assertNotIn("ID", comm_environment.serializer.unserialize(written_messages[0]))
+        comm_environment.close()
+
     def test_get_subscribed_clients__returns_only_subscribed_clients(self):
         self.clients_holder.hub_instance.subscribe_to_hub(self.clients_holder.get_client(3))
         self.clients_holder.hub_instance.subscribe_to_hub(self.clients_holder.get_client(1))
@@ -101,6 +140,149 @@ class TestConnectedClientsHolder(unittest.TestCase):
         self.assertTrue(subscribed_clients[1].ID == 1)
         self.__check_clients_are_well_constructed(subscribed_clients)
 
+    def test_get_subscribed_clients__is_not_affected_by_later_subscriptions(self):
+        self.clients_holder.subscribe(self.__get_connected_clients()[0])
+        subscribed_clients = self.clients_holder.get_subscribed_clients()
+
+        self.clients_holder.subscribe(self.__get_connected_clients()[1])
+
+        self.assertEqual(len(subscribed_clients), 1)
+        self.assertEqual(len(self.clients_holder.get_subscribed_clients()), 2)
+
+    def test_subscribe__returns_false_if_client_already_subscribed(self):
+        client = self.__get_connected_clients()[0]
+
+        self.assertTrue(self.clients_holder.subscribe(client))
+        self.assertFalse(self.clients_holder.subscribe(client))
+        self.assertTrue(self.clients_holder.is_subscribed(client))
+
+    def test_unsubscribe__returns_false_if_client_not_subscribed(self):
+        client = self.__get_connected_clients()[0]
+        self.clients_holder.subscribe(client)
+
+        self.assertTrue(self.clients_holder.unsubscribe(client))
+        self.assertFalse(self.clients_holder.unsubscribe(client))
+        self.assertFalse(self.clients_holder.is_subscribed(client))
+
+    def test_remove_closed_client__unsubscribes_client_from_all_hubs(self):
+        class OtherHub(Hub):
+            pass
+
+        other_clients_holder = OtherHub().clients
+        client = self.__get_connected_clients()[0]
+        self.clients_holder.subscribe(client)
+        other_clients_holder.subscribe(client)
+        self.clients_holder.subscribe(self.__get_connected_clients()[1])
+
+        ConnectedClientsHolder.remove_closed_client(client)
+
+        self.assertFalse(self.clients_holder.is_subscribed(client))
+        self.assertFalse(other_clients_holder.is_subscribed(client))
+        self.assertEqual(len(self.clients_holder.get_subscribed_clients()), 1)
+
+    def test_on_closed__removes_client_subscriptions(self):
+        comm_environment = CommEnvironment()
+        client = ConnectedClient(comm_environment, lambda m: None)
+        comm_environment.on_opened(client)
+        self.clients_holder.subscribe(client)
+
+        comm_environment.on_closed(client)
+
+        self.assertFalse(self.clients_holder.is_subscribed(client))
+        comm_environment.close()
+
+    def test_subscribe__closed_clients_are_not_subscribed(self):
+        comm_environment = CommEnvironment()
+        client = ConnectedClient(comm_environment, lambda m: None)
+        comm_environment.on_opened(client)
+        comm_environment.on_closed(client)
+
+        self.assertFalse(self.clients_holder.subscribe(client))
+
+        self.assertFalse(self.clients_holder.is_subscribed(client))
+        self.assertEqual(len(self.clients_holder.get_subscribed_clients()), 0)
+        comm_environment.close()
+
+    def test_join_group__adds_clients_to_the_named_group(self):
+        clients = self.__get_connected_clients()
+
+        self.assertTrue(self.clients_holder.join_group("room", clients[2]))
+        self.assertTrue(self.clients_holder.join_group("room", self.clients_holder.get_client(4)))
+        self.assertFalse(self.clients_holder.join_group("room", clients[2]))
+        self.clients_holder.join_group("other room", clients[2])
+
+        room_clients = self.clients_holder.get_group("room")
+        self.assertEqual([c.ID for c in room_clients], [2, 4])
+        self.__check_clients_are_well_constructed(room_clients)
+        self.assertEqual(sorted(self.clients_holder.get_groups_names()), ["other room", "room"])
+        self.assertEqual(sorted(self.clients_holder.get_client_groups_names(clients[2])), ["other room", "room"])
+
+    def test_leave_group__removes_client_and_empty_groups(self):
+        client = self.__get_connected_clients()[2]
+        self.clients_holder.join_group("room", client)
+
+        self.assertTrue(self.clients_holder.leave_group("room", client))
+        self.assertFalse(self.clients_holder.leave_group("room", client))
+
+        self.assertEqual(len(self.clients_holder.get_group("room")), 0)
+        self.assertEqual(self.clients_holder.get_groups_names(), [])
+        self.assertEqual(self.clients_holder.get_client_groups_names(client), [])
+
+    def test_get_group__calls_client_function_only_in_group_clients(self):
+        written_messages = []
+        client = self.__get_connected_clients()[2]
+        client.api_write_message = written_messages.append
+        self.clients_holder.join_group("room", client)
+
+        self.clients_holder.get_group("room").test_call_function(notification=True)
+
+        self.assertEqual(len(written_messages), 1)
+
+    def test_on_closed__removes_client_from_groups(self):
+        comm_environment = CommEnvironment()
+        client = ConnectedClient(comm_environment, lambda m: None)
+        comm_environment.on_opened(client)
+        self.clients_holder.join_group("room", client)
+
+        comm_environment.on_closed(client)
+
+        self.assertEqual(self.clients_holder.get_groups_names(), [])
+        self.assertFalse(self.clients_holder.join_group("room", client))
+        comm_environment.close()
+
+    def test_get_clients_by_attribute__returns_clients_with_indexed_attribute_set_in_client_in_hub(self):
+        ConnectedClientsHolder.index_clients_attribute("user_id")
+        self.addCleanup(ClientsAttributesIndex.remove_index, "user_id")
+        for client in self.clients_holder.get_all_clients():
+            client.user_id = client.ID % 3
+        flexmock(self.clients_holder).should_receive("get_clients").never()
+
+        user_clients = self.clients_holder.get_clients_by_attribute("user_id", 1)
+
+        self.assertEqual([c.ID for c in user_clients], [1, 4, 7])
+        self.__check_clients_are_well_constructed(user_clients)
+
+    def test_get_clients_by_attribute__filters_clients_if_attribute_not_indexed(self):
+        for client in self.clients_holder.get_all_clients():
+            client.user_id = client.ID % 3
+
+        user_clients = self.clients_holder.get_clients_by_attribute("user_id", 1)
+
+        self.assertEqual([c.ID for c in user_clients], [1, 4, 7])
+
+    def test_on_closed__removes_client_from_attributes_indexes(self):
+        ConnectedClientsHolder.index_clients_attribute("user_id")
+        self.addCleanup(ClientsAttributesIndex.remove_index, "user_id")
+        comm_environment = CommEnvironment()
+        client = ConnectedClient(comm_environment, lambda m: None)
+        comm_environment.on_opened(client)
+        self.clients_holder.get_client(client.ID).user_id = 42
+
+        comm_environment.on_closed(client)
+
+        self.assertEqual(len(self.clients_holder.get_clients_by_attribute("user_id", 42)), 0)
+        comm_environment.close()
+
     def test_get__returns_only_clients_with_odd_ids_passing_filter_function(self):
         def only_odds(x):
             return x.ID % 2 != 0
@@ -119,6 +301,11 @@ class TestConnectedClientsHolder(unittest.TestCase):
         self.assertEqual(clients[1].ID, 5)
         self.assertEqual(clients[2].ID, 6)
 
+    def test_get__ignores_not_connected_ids_in_list(self):
+        clients = self.clients_holder.get([6, "not connected", 3, 6])
+
+        self.assertEqual([c.ID for c in clients], [6, 3])
+
     def test_get__returns_client_with_id_as_param(self):
         client3 = self.clients_holder.get(3)
         client5 = self.clients_holder.get(5)
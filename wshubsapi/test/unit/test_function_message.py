@@ -1,4 +1,5 @@
 # coding=utf-8
+import inspect
 import unittest
 
 from flexmock import flexmock, flexmock_teardown
@@ -93,6 +94,14 @@ class TestFunctionMessage(unittest.TestCase):
         self.assertEqual(function_result["reply"][2], 1)
         self.assertEqual(function_result["success"], True)
 
+    def test_CallFunction_DoesNotInspectTheMethodSignature(self):
+        fn = FunctionMessage(self.__constructMessageStr(args=["x"]), ConnectedClient(None, None), self.env_mock)
+        flexmock(inspect).should_receive("signature").never()
+
+        function_result = fn.call_function()
+
+        self.assertEqual(function_result["success"], True)
+
     def test_CallFunction_DoesNotIncludesSenderIfNotRequested(self):
         fn = FunctionMessage(self.__constructMessageStr(args=["x"], function="test_no_sender"), "_sender", self.env_mock)
 
@@ -1,4 +1,5 @@
 # coding=utf-8
+import time
 import unittest
 
 from flexmock import flexmock
@@ -7,7 +8,7 @@ from wshubsapi.connected_clients_holder import ConnectedClientsHolder
 from wshubsapi.comm_environment import CommEnvironment
 from wshubsapi.client_in_hub import ClientInHub
 from wshubsapi.connected_client import ConnectedClient
-from wshubsapi.hub import Hub, UnsuccessfulReplay
+from wshubsapi.hub import Hub, UnsuccessfulReplay, client_notification
 from wshubsapi.test.utils.hubs_utils import remove_hubs_subclasses
 
 
@@ -85,3 +86,96 @@ class TestHub(unittest.TestCase):
             self.hub.clients = 10
 
         self.assertRaises(AttributeError, set_clients)
+
+    def test_client_notifications_returns_client_functions_declared_as_notifications(self):
+        class NotificationsHub(Hub):
+            def _define_client_functions(self):
+                return dict(print_message=client_notification(lambda sender_name, msg: None),
+                            ask_name=lambda: None)
+
+        self.assertEqual(NotificationsHub().client_notifications, frozenset(["print_message"]))
+
+    def test_declared_client_notification__is_sent_without_id_and_returns_none(self):
+        class NotificationsHub(Hub):
+            def _define_client_functions(self):
+                return dict(print_message=client_notification(lambda msg: None))
+
+        hub = NotificationsHub()
+        comm_environment = CommEnvironment()
+        written_messages = []
+        connected_client = ConnectedClient(comm_environment, written_messages.append)
+        hub.clients.append_client(connected_client)
+
+        result = hub.clients.get_client(connected_client.ID).print_message("hello")
+
+        self.assertIsNone(result)
+        self.assertEqual(comm_environment.get_pending_futures_count(), 0)
+        self.assertEqual(comm_environment.serializer.unserialize(written_messages[0]),
+                         dict(function="print_message", args=["hello"], hub="NotificationsHub"))
+        hub.clients.pop_client(connected_client.ID)
+        comm_environment.close()
+
+    def test_client_function_is_sent_as_notification_if_requested_in_the_call(self):
+        comm_environment = CommEnvironment()
+        written_messages = []
+        sender = ClientInHub(ConnectedClient(comm_environment, written_messages.append), self.hub.__HubName__)
+
+        self.assertIsNone(sender.print_message("hello", notification=True))
+        future = sender.print_message("hello")
+
+        self.assertEqual(comm_environment.get_pending_futures_count(), 1)
+        self.assertNotIn("ID", comm_environment.serializer.unserialize(written_messages[0]))
+        self.assertIn("ID", comm_environment.serializer.unserialize(written_messages[1]))
+        future.cancel()
+        comm_environment.close()
+
+    def __connect_bridge_clients(self, comm_environment, written_messages):
+        clients = []
+        for id_ in ("a", "b", "c"):
+            connected_client = ConnectedClient(comm_environment, written_messages.append)
+            comm_environment.on_opened(connected_client, id_)
+            clients.append(connected_client)
+        self.addCleanup(lambda: [comm_environment.on_closed(c) for c in clients])
+        return clients
+
+    def test_client_to_clients_bridge__gathers_replies_without_blocking(self):
+        comm_environment = CommEnvironment()
+        written_messages = []
+        self.__connect_bridge_clients(comm_environment, written_messages)
+
+        future = self.hub._client_to_clients_bridge(["a", "b", "c"], "get_name", [])
+
+        self.assertFalse(future.done())
+        messages = [comm_environment.serializer.unserialize(m) for m in written_messages]
+        comm_environment.on_message(None, '{"ID": %d, "reply": "B", "success": true}' % messages[1]["ID"])
+        comm_environment.on_message(None, '{"ID": %d, "reply": "fail", "success": false}' % messages[2]["ID"])
+        self.assertFalse(future.done())
+        comm_environment.on_message(None, '{"ID": %d, "reply": "A", "success": true}' % messages[0]["ID"])
+        self.assertEqual(future.result(timeout=0), dict(a="A", b="B", c=dict(error_type="Exception", error="fail")))
+        self.assertEqual(list(future.result()), ["a", "b", "c"])
+        comm_environment.close()
+
+    def test_client_to_clients_bridge__uses_one_deadline_for_all_clients(self):
+        comm_environment = CommEnvironment()
+        self.__connect_bridge_clients(comm_environment, [])
+        self.hub._clients_bridge_timeout = 0.2
+        start = time.time()
+
+        results = self.hub._client_to_clients_bridge(["a", "b", "c"], "get_name", []).result(timeout=2)
+
+        self.assertLess(time.time() - start, 0.5)
+        self.assertEqual(results["a"], dict(error_type="HubsApiException", error="Timeout exception"))
+        self.assertEqual(len(results), 3)
+        comm_environment.close()
+
+    def test_client_to_clients_bridge__with_one_client_returns_its_result(self):
+        comm_environment = CommEnvironment()
+        written_messages = []
+        self.__connect_bridge_clients(comm_environment, written_messages)
+
+        future = self.hub._client_to_clients_bridge("b", "get_name", [])
+        message = comm_environment.serializer.unserialize(written_messages[0])
+        comm_environment.on_message(None, '{"ID": %d, "reply": "B", "success": true}' % message["ID"])
+
+        self.assertEqual(future.result(timeout=0), "B")
+        comm_environment.close()
@@ -107,6 +107,45 @@ class TestHubInspector(unittest.TestCase):
     def test_getHubInstance_RaisesErrorIfNotAHub(self):
         self.assertRaises(AttributeError, HubsInspector.get_hub_instance, (str,))
 
+    def test_inspection_constructsDispatchTableForPublicFunctions(self):
+        hub_function = HubsInspector.HUBS_FUNCTIONS_DICT["TestHub"]["get_data"]
+
+        self.assertEqual(hub_function.method, HubsInspector.get_hub_instance(self.testHubClass).get_data)
+        self.assertIsNone(hub_function.sender_index)
+        self.assertNotIn("_define_client_functions", HubsInspector.HUBS_FUNCTIONS_DICT["TestHub"])
+
+    def test_getHubFunction_returnsFunctionDescriptorWithSenderPosition(self):
+        class TestHubWithSender(Hub):
+            def send(self, x, _sender, y=1, z="z"):
+                pass
+
+        HubsInspector.inspect_implemented_hubs(force_reconstruction=True)
+
+        hub_function = HubsInspector.get_hub_function("TestHubWithSender", "send")
+
+        self.assertEqual(hub_function.sender_index, 1)
+        self.assertTrue(hub_function.includes_sender)
+
+    def test_getHubFunction_cachesPublicFunctionsAddedAfterInspection(self):
+        HubsInspector.get_hub_instance(self.testHubClass).added_function = lambda: None
+
+        hub_function = HubsInspector.get_hub_function("TestHub", "added_function")
+
+        self.assertIs(HubsInspector.HUBS_FUNCTIONS_DICT["TestHub"]["added_function"], hub_function)
+
+    def test_getHubFunction_doesNotCachePrivateFunctions(self):
+        hub = HubsInspector.get_hub_instance(self.testHubClass)
+
+        hub_function = HubsInspector.get_hub_function("TestHub", "_client_to_clients_bridge")
+
+        self.assertEqual(hub_function.method, hub._client_to_clients_bridge)
+        self.assertNotIn("_client_to_clients_bridge", HubsInspector.HUBS_FUNCTIONS_DICT["TestHub"])
+
+    def test_getHubFunction_raisesAttributeErrorIfFunctionDoesNotExist(self):
+        self.assertRaises(AttributeError, HubsInspector.get_hub_function, "TestHub", "not_exists")
+
+        self.assertNotIn("not_exists", HubsInspector.HUBS_FUNCTIONS_DICT["TestHub"])
+
     def test_getHubsInformation_ReturnsDictionaryWithNoClientFunctions(self):
         hubs_info = HubsInspector.get_hubs_information()
 
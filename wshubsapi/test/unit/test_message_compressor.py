@@ -0,0 +1,113 @@
+# coding=utf-8
+import unittest
+import zlib
+
+from flexmock import flexmock, flexmock_teardown
+
+from wshubsapi.comm_environment import CommEnvironment, HubsApiException
+from wshubsapi.connected_client import ConnectedClient
+from wshubsapi.message_compressor import MessageCompressor
+from wshubsapi.serializer import Serializer, MsgPackSerializer, msgpack
+
+
+class TestMessageCompressor(unittest.TestCase):
+    def setUp(self):
+        self.compressor = MessageCompressor(min_size=100, level=1)
+        self.message = Serializer().serialize([dict(id=i, name="row {}".format(i)) for i in range(50)])
+
+    def test_compress_compressesMessagesBiggerThanMinSize(self):
+        compressed_message = self.compressor.compress(self.message)
+
+        self.assertIsInstance(compressed_message, bytes)
+        self.assertLess(len(compressed_message), len(self.message) / 4)
+        self.assertEqual(zlib.decompress(compressed_message), self.message.encode("utf-8"))
+
+    def test_compress_returnsSameMessageIfSmallerThanMinSize(self):
+        message = self.message[:99]
+
+        self.assertIs(self.compressor.compress(message), message)
+
+    def test_decompress_returnsOriginalMessageOfCompressedMessages(self):
+        compressed_message = self.compressor.compress(self.message)
+
+        self.assertTrue(MessageCompressor.is_compressed(compressed_message))
+        self.assertEqual(self.compressor.decompress(compressed_message), self.message.encode("utf-8"))
+
+    def test_decompress_returnsSameMessageIfNotCompressed(self):
+        json_bytes = self.message.encode("utf-8")
+
+        self.assertIs(self.compressor.decompress(self.message), self.message)
+        self.assertIs(self.compressor.decompress(json_bytes), json_bytes)
+
+    def test_decompress_messagesBiggerThanMaxDecompressedSizeRaiseValueError(self):
+        compressor = MessageCompressor(min_size=0, max_decompressed_size=1000)
+        compressed_message = compressor.compress(b"\0" * 1001)
+
+        self.assertEqual(compressor.decompress(compressor.compress(b"\0" * 1000)), b"\0" * 1000)
+        self.assertRaises(ValueError, compressor.decompress, compressed_message)
+
+    def test_decompress_truncatedMessagesRaiseValueError(self):
+        compressed_message = self.compressor.compress(self.message)
+
+        self.assertRaises(ValueError, self.compressor.decompress, compressed_message[:-10])
+
+    @unittest.skipIf(msgpack is None, "msgpack not installed")
+    def test_decompress_msgpackMessagesAreNotConfusedWithCompressedMessages(self):
+        serializer = MsgPackSerializer()
+        for obj in [{"a": 1}, [{"a": 1}] * 20, [{"a": 1}] * 70000]:
+            message = serializer.serialize(obj)
+
+            self.assertFalse(MessageCompressor.is_compressed(message))
+            self.assertEqual(serializer.unserialize(self.compressor.decompress(self.compressor.compress(message))),
+                             obj)
+
+
+class TestCommEnvironmentCompression(unittest.TestCase):
+    def setUp(self):
+        self.comm_environment = CommEnvironment(max_workers=0, compression_level=6, compression_min_size=100)
+        self.client = ConnectedClient(self.comm_environment, lambda message: None)
+
+    def tearDown(self):
+        self.comm_environment.close()
+        flexmock_teardown()
+
+    def test_setClientCompression_compressesClientBigMessages(self):
+        self.comm_environment.set_client_compression(self.client, "deflate")
+        message = "a" * 100
+
+        self.assertEqual(zlib.decompress(self.comm_environment.compress_client_message(self.client, message)),
+                         message.encode("utf-8"))
+        self.assertEqual(self.comm_environment.compress_client_message(self.client, "small"), "small")
+
+    def test_setClientCompression_withoutCompressionMessagesAreNotCompressed(self):
+        self.comm_environment.set_client_compression(self.client, None)
+
+        self.assertEqual(self.comm_environment.compress_client_message(self.client, "a" * 100), "a" * 100)
+
+    def test_setClientCompression_isIgnoredIfEnvironmentCompressionIsDisabled(self):
+        comm_environment = CommEnvironment(max_workers=0)
+
+        comm_environment.set_client_compression(self.client, "deflate")
+
+        self.assertIsNone(self.client.api_compressor)
+        comm_environment.close()
+
+    def test_setClientCompression_unknownCompressionRaisesException(self):
+        self.assertRaises(HubsApiException, self.comm_environment.set_client_compression, self.client, "br")
+
+    def test_onMessage_decompressesCompressedMessages(self):
+        self.comm_environment.set_client_compression(self.client, "deflate")
+        serialized_message = Serializer().serialize([{"ID": 1, "reply": "a" * 100, "success": True}])
+        compressed_message = MessageCompressor(min_size=0).compress(serialized_message)
+        flexmock(self.comm_environment.serializer).should_receive("unserialize") \
+            .with_args(serialized_message.encode("utf-8")).and_return([]).once()
+
+        self.comm_environment.on_message(self.client, compressed_message)
+
+    def test_onMessage_doesNotDecompressIfClientDidNotNegotiateCompression(self):
+        compressed_message = MessageCompressor(min_size=0).compress(b"\0" * 1000)
+        flexmock(MessageCompressor).should_receive("decompress").never()
+        flexmock(self.comm_environment.serializer).should_receive("unserialize") \
+            .with_args(compressed_message).and_raise(ValueError).once()
+
+        self.comm_environment.on_message(self.client, compressed_message)
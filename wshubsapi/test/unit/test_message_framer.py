@@ -0,0 +1,94 @@
+# coding=utf-8
+import socket
+import unittest
+
+from wshubsapi.comm_environment import HubsApiException
+from wshubsapi.message_framer import MessageFramer
+from wshubsapi.message_separator import MessageSeparator
+
+
+class TestMessageFramer(unittest.TestCase):
+    def setUp(self):
+        self.message_framer = MessageFramer(max_frame_size=1024 * 1024, buffer_size=16)
+        self.sender, self.receiver = socket.socketpair()
+
+    def tearDown(self):
+        self.sender.close()
+        self.receiver.close()
+
+    def receive_messages(self, count):
+        messages = []
+        while len(messages) < count:
+            messages.extend(self.message_framer.receive(self.receiver))
+        return messages
+
+    def test_frame_prefixesPayloadWithItsLength(self):
+        self.assertEqual(self.message_framer.frame("ñ"), b"\x00\x00\x00\x02" + "ñ".encode("utf-8"))
+        self.assertEqual(self.message_framer.frame(b"\x00\x01"), b"\x00\x00\x00\x02\x00\x01")
+
+    def test_addData_returnsOnlyCompletedFrames(self):
+        data = self.message_framer.frame("m0") + self.message_framer.frame("m1") + self.message_framer.frame("m2")
+
+        self.assertEqual(self.message_framer.add_data(data[:9]), [b"m0"])
+        self.assertEqual(self.message_framer.add_data(data[9:12]), [b"m1"])
+        self.assertEqual(self.message_framer.add_data(data[12:]), [b"m2"])
+
+    def test_addData_payloadsCanContainSeparatorsAndSplitMultibyteCharacters(self):
+        message = ("ñ" + MessageSeparator.DEFAULT_API_SEP) * 10
+        data = self.message_framer.frame(message)
+
+        received_messages = [m for i in range(len(data)) for m in self.message_framer.add_data(data[i:i + 1])]
+
+        self.assertEqual(received_messages, [message.encode("utf-8")])
+
+    def test_receive_receivesFramesBiggerThanBuffer(self):
+        messages = [b"a" * 100, b"b", b"c" * 1000, b""]
+        self.sender.sendall(b"".join(self.message_framer.frame(m) for m in messages))
+
+        self.assertEqual(self.receive_messages(len(messages)), messages)
+
+    def test_receive_receivesMultiMegabyteMessages(self):
+        message = bytes(range(256)) * 4 * 1024
+        message_framer = MessageFramer()
+        data = message_framer.frame(message) * 3
+        self.sender.setblocking(False)
+        received_messages = []
+
+        while data or len(received_messages) < 3:
+            try:
+                data = data[self.sender.send(data):]
+            except BlockingIOError:
+                pass
+            received_messages.extend(message_framer.receive(self.receiver))
+
+        self.assertEqual(received_messages, [message] * 3)
+
+    def test_receive_returnsNoneIfConnectionWasClosed(self):
+        self.sender.close()
+
+        self.assertIsNone(self.message_framer.receive(self.receiver))
+
+    def test_receive_framesBiggerThanMaxFrameSizeRaiseException(self):
+        self.sender.sendall(MessageFramer.HEADER.pack(1024 * 1024 + 1) + b"a")
+
+        self.assertRaises(HubsApiException, self.message_framer.receive, self.receiver)
+
+
+class TestMessageSeparatorSocket(unittest.TestCase):
+    def setUp(self):
+        self.message_separator = MessageSeparator()
+        self.sender, self.receiver = socket.socketpair()
+
+    def tearDown(self):
+        self.sender.close()
+        self.receiver.close()
+
+    def test_receive_returnsMessagesSeparatedBySeparator(self):
+        self.sender.sendall(self.message_separator.frame("m0") + self.message_separator.frame(b"m1"))
+
+        self.assertEqual(self.message_separator.receive(self.receiver), ["m0", "m1"])
+
+    def test_receive_returnsNoneIfConnectionWasClosed(self):
+        self.sender.close()
+
+        self.assertIsNone(self.message_separator.receive(self.receiver))
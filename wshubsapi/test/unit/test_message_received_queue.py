@@ -0,0 +1,73 @@
+# coding=utf-8
+import threading
+import time
+import unittest
+
+from wshubsapi.message_received_queue import MessageReceivedQueue
+
+
+class TestMessageReceivedQueue(unittest.TestCase):
+    def setUp(self):
+        self.message_received_queue = MessageReceivedQueue(max_workers=4)
+
+    def tearDown(self):
+        self.message_received_queue.shutdown()
+
+    def test_put_executesFunctionSynchronouslyIfNoWorkers(self):
+        message_received_queue = MessageReceivedQueue(max_workers=0)
+        executed = []
+
+        message_received_queue.put("client", executed.append, 1)
+
+        self.assertIsNone(message_received_queue.executor)
+        self.assertEqual(executed, [1])
+
+    def test_put_executesMessagesOfTheSameClientInArrivalOrder(self):
+        executed = []
+
+        def slow_append(i):
+            time.sleep(0.001 if i % 2 else 0)
+            executed.append(i)
+
+        for i in range(50):
+            self.message_received_queue.put("client", slow_append, i)
+        self.message_received_queue.shutdown()
+
+        self.assertEqual(executed, list(range(50)))
+
+    def test_put_executesMessagesOfDifferentClientsInParallel(self):
+        blocked_client_event = threading.Event()
+        other_client_event = threading.Event()
+
+        self.message_received_queue.put("client1", blocked_client_event.wait, 1)
+        self.message_received_queue.put("client2", other_client_event.set)
+
+        self.assertTrue(other_client_event.wait(1))
+        self.assertFalse(blocked_client_event.is_set())
+        blocked_client_event.set()
+
+    def test_put_continuesExecutingClientMessagesIfFunctionRaisesException(self):
+        executed = []
+
+        def raise_exception():
+            raise Exception("error")
+
+        self.message_received_queue.put("client", raise_exception)
+        self.message_received_queue.put("client", executed.append, 1)
+        self.message_received_queue.shutdown()
+
+        self.assertEqual(executed, [1])
+
+    def test_shutdown_executesPendingMessagesAndRejectsNewOnes(self):
+        release_event = threading.Event()
+        executed = []
+        self.message_received_queue.put("client", release_event.wait, 1)
+        self.message_received_queue.put("client", executed.append, 1)
+        self.assertEqual(self.message_received_queue.get_pending_messages_count("client"), 2)
+
+        threading.Timer(0.01, release_event.set).start()
+        self.message_received_queue.shutdown()
+
+        self.assertEqual(executed, [1])
+        self.assertEqual(self.message_received_queue.get_pending_messages_count(), 0)
+        self.assertRaises(RuntimeError, self.message_received_queue.put, "client", executed.append, 2)
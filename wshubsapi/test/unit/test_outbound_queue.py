@@ -0,0 +1,362 @@
+# coding=utf-8
+import asyncio
+import threading
+import unittest
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from flexmock import flexmock
+
+from wshubsapi.comm_environment import CommEnvironment
+from wshubsapi.client_in_hub import ClientInHub
+from wshubsapi.connected_client import ConnectedClient
+from wshubsapi.connected_clients_group import ConnectedClientsGroup
+from wshubsapi.outbound_queue import OutboundQueue, DelayedExecutor, LoopExecutor
+
+
+class TestOutboundQueue(unittest.TestCase):
+    def setUp(self):
+        self.written_messages = []
+        self.pending_writes = []
+
+    def write_paused(self, message):
+        self.written_messages.append(message)
+        future = Future()
+        self.pending_writes.append(future)
+        return future
+
+    def drain(self):
+        while len(self.pending_writes) > 0:
+            self.pending_writes.pop(0).set_result(None)
+
+    def test_put_writesMessagesDirectlyIfWriteFunctionDoesNotReturnFuture(self):
+        queue = OutboundQueue(self.written_messages.append, max_size=2)
+
+        for i in range(5):
+            self.assertTrue(queue.put(i))
+
+        self.assertEqual(self.written_messages, list(range(5)))
+        self.assertEqual(queue.size, 0)
+        self.assertEqual(queue.dropped_messages_count, 0)
+
+    def test_put_pausesWritesUntilTransportIsDrained(self):
+        queue = OutboundQueue(self.write_paused, max_size=10)
+
+        for i in range(3):
+            queue.put(i)
+
+        self.assertEqual(self.written_messages, [0])
+        self.assertEqual(queue.size, 2)
+        self.pending_writes.pop(0).set_result(None)
+        self.assertEqual(self.written_messages, [0, 1])
+        self.drain()
+        self.assertEqual(self.written_messages, [0, 1, 2])
+        self.assertEqual(queue.size, 0)
+        self.assertEqual(queue.peak_size, 2)
+
+    def test_put_withDisconnectPolicyClosesQueueAndCallsOnOverflow(self):
+        on_overflow = flexmock(close=lambda: None)
+        on_overflow.should_receive("close").once()
+        queue = OutboundQueue(self.write_paused, max_size=2, on_overflow=on_overflow.close)
+
+        results = [queue.put(i) for i in range(4)]
+
+        self.assertEqual(results, [True, True, True, False])
+        self.assertTrue(queue.is_closed)
+        self.assertEqual(queue.size, 0)
+        self.assertEqual(queue.dropped_messages_count, 3)
+        self.assertFalse(queue.put(5))
+        self.drain()
+        self.assertEqual(self.written_messages, [0])
+
+    def test_put_withDropOldestPolicyDiscardsOldestQueuedMessage(self):
+        queue = OutboundQueue(self.write_paused, max_size=2, overflow_policy=OutboundQueue.DROP_OLDEST)
+
+        results = [queue.put(i) for i in range(5)]
+        self.drain()
+
+        self.assertEqual(results, [True] * 5)
+        self.assertEqual(self.written_messages, [0, 3, 4])
+        self.assertEqual(queue.dropped_messages_count, 2)
+        self.assertFalse(queue.is_closed)
+
+    def test_put_withDropNewestPolicyDiscardsNewMessage(self):
+        queue = OutboundQueue(self.write_paused, max_size=2, overflow_policy=OutboundQueue.DROP_NEWEST)
+
+        results = [queue.put(i) for i in range(5)]
+        self.drain()
+
+        self.assertEqual(results, [True, True, True, False, False])
+        self.assertEqual(self.written_messages, [0, 1, 2])
+        self.assertEqual(queue.dropped_messages_count, 2)
+
+    def test_put_errorWritingMessageDoesNotStopNextMessages(self):
+        def write(message):
+            if message == 0:
+                raise IOError("broken pipe")
+            self.written_messages.append(message)
+
+        queue = OutboundQueue(write)
+
+        queue.put(0)
+        queue.put(1)
+
+        self.assertEqual(self.written_messages, [1])
+
+    def test_put_withExecutorWritesInExecutorThreadInOrder(self):
+        writing_threads = set()
+        written_event = threading.Event()
+
+        def write(message):
+            writing_threads.add(threading.current_thread())
+            self.written_messages.append(message)
+            if message == 99:
+                written_event.set()
+
+        executor = ThreadPoolExecutor(max_workers=1)
+        queue = OutboundQueue(write, max_size=100, executor=executor)
+
+        for i in range(100):
+            queue.put(i)
+
+        self.assertTrue(written_event.wait(1))
+        executor.shutdown()
+        self.assertEqual(self.written_messages, list(range(100)))
+        self.assertNotIn(threading.current_thread(), writing_threads)
+
+    def test_put_withCoalesceKeyReplacesQueuedMessageWithSameKey(self):
+        queue = OutboundQueue(self.write_paused)
+
+        queue.put("first")
+        for message, key in [("a1", "a"), ("b1", "b"), ("a2", "a"), ("other", None), ("a3", "a")]:
+            self.assertTrue(queue.put(message, key))
+        self.drain()
+
+        self.assertEqual(self.written_messages, ["first", "a3", "b1", "other"])
+        self.assertEqual(queue.coalesced_messages_count, 2)
+
+    def test_put_withCoalesceKeyQueuesNewMessageIfPreviousWasAlreadyWritten(self):
+        queue = OutboundQueue(self.write_paused)
+
+        queue.put("a1", "a")
+        queue.put("a2", "a")
+        self.drain()
+        queue.put("a3", "a")
+        self.drain()
+
+        self.assertEqual(self.written_messages, ["a1", "a2", "a3"])
+        self.assertEqual(queue.coalesced_messages_count, 0)
+
+    def test_put_coalescedMessagesDoNotCountForOverflow(self):
+        queue = OutboundQueue(self.write_paused, max_size=2, overflow_policy=OutboundQueue.DROP_NEWEST)
+
+        queue.put("first")
+        queue.put(0, "key")
+        queue.put("last")
+        for i in range(1, 5):
+            self.assertTrue(queue.put(i, "key"))
+        self.drain()
+
+        self.assertEqual(self.written_messages, ["first", 4, "last"])
+        self.assertEqual(queue.dropped_messages_count, 0)
+
+    def test_put_withJoinFunctionJoinsMessagesQueuedWhileWriting(self):
+        queue = OutboundQueue(self.write_paused, join_function=tuple, max_joined_messages=3)
+
+        for i in range(6):
+            queue.put(i)
+        self.drain()
+
+        self.assertEqual(self.written_messages, [0, (1, 2, 3), (4, 5)])
+
+    def test_put_withDelayedExecutorJoinsMessagesPutDuringDelay(self):
+        written_event = threading.Event()
+
+        def write(message):
+            self.written_messages.append(message)
+            written_event.set()
+
+        executor = DelayedExecutor(ThreadPoolExecutor(max_workers=1), 0.05)
+        queue = OutboundQueue(write, executor=executor, join_function=list)
+
+        for i in range(3):
+            queue.put(i)
+
+        self.assertTrue(written_event.wait(1))
+        executor.shutdown()
+        self.assertEqual(self.written_messages, [[0, 1, 2]])
+
+    def test_getRoomFuture_returnsNoneIfQueueIsLessThanHalfFull(self):
+        queue = OutboundQueue(self.write_paused, max_size=8)
+
+        for i in range(4):
+            queue.put(i)
+
+        self.assertIsNone(queue.get_room_future())
+
+    def test_getRoomFuture_isResolvedWhenQueueIsDrainedBelowAQuarter(self):
+        queue = OutboundQueue(self.write_paused, max_size=8)
+        for i in range(6):
+            queue.put(i)
+
+        room_future = queue.get_room_future()
+        self.pending_writes.pop(0).set_result(None)
+        self.pending_writes.pop(0).set_result(None)
+        self.assertFalse(room_future.done())
+        self.pending_writes.pop(0).set_result(None)
+
+        self.assertTrue(room_future.done())
+        self.assertEqual(queue.size, 2)
+
+    def test_getRoomFuture_isResolvedWhenQueueIsClosed(self):
+        queue = OutboundQueue(self.write_paused, max_size=2)
+        queue.put(0)
+        queue.put(1)
+        room_future = queue.get_room_future()
+
+        queue.close()
+
+        self.assertTrue(room_future.done())
+        self.assertIsNone(queue.get_room_future())
+
+    def test_init_unknownOverflowPolicyRaisesValueError(self):
+        self.assertRaises(ValueError, OutboundQueue, self.write_paused, overflow_policy="block")
+
+    def test_close_discardsPendingMessages(self):
+        queue = OutboundQueue(self.write_paused)
+        queue.put(0)
+        queue.put(1)
+
+        queue.close()
+        self.drain()
+
+        self.assertEqual(self.written_messages, [0])
+        self.assertFalse(queue.put(2))
+
+
+class TestLoopExecutor(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+
+    def test_submit_callsImmediatelyInLoopThreadWithoutDelay(self):
+        calls = []
+
+        async def submit():
+            LoopExecutor(self.loop).submit(calls.append, 1)
+            return list(calls)
+
+        self.assertEqual(self.loop.run_until_complete(submit()), [1])
+
+    def test_submit_callsInLoopThreadFromOtherThreads(self):
+        threads = []
+        executor = LoopExecutor(self.loop, delay=0)
+
+        async def submit_from_thread():
+            done = self.loop.create_future()
+            thread = threading.Thread(target=executor.submit,
+                                      args=(lambda: [threads.append(threading.current_thread()),
+                                                     done.set_result(None)],))
+            thread.start()
+            await asyncio.wait_for(done, 1)
+            thread.join()
+
+        self.loop.run_until_complete(submit_from_thread())
+
+        self.assertEqual(threads, [threading.current_thread()])
+
+
+class TestCommEnvironmentOutboundQueues(unittest.TestCase):
+    def setUp(self):
+        self.comm_environment = CommEnvironment(max_workers=0, outbound_queue_max_size=2,
+                                                outbound_overflow_policy=OutboundQueue.DROP_NEWEST)
+        self.pending_writes = []
+        self.written_messages = []
+        self.clients = []
+
+    def tearDown(self):
+        for client in self.clients:
+            self.comm_environment.on_closed(client)
+        self.comm_environment.close()
+
+    def write_paused(self, message):
+        self.written_messages.append(message)
+        future = Future()
+        self.pending_writes.append(future)
+        return future
+
+    def drain(self):
+        while len(self.pending_writes) > 0:
+            self.pending_writes.pop(0).set_result(None)
+
+    def construct_client(self):
+        client = ConnectedClient(self.comm_environment, None)
+        client.api_write_message = self.comm_environment.construct_outbound_queue(client, self.write_paused).put
+        self.comm_environment.on_opened(client)
+        self.clients.append(client)
+        return client
+
+    def test_constructOutboundQueue_usesEnvironmentLimits(self):
+        client = self.construct_client()
+
+        self.assertEqual(client.api_outbound_queue.max_size, 2)
+        self.assertEqual(client.api_outbound_queue.overflow_policy, OutboundQueue.DROP_NEWEST)
+
+    def test_getOutboundQueuesMetrics_aggregatesQueuesOfConnectedClients(self):
+        slow_client, fast_client = self.construct_client(), self.construct_client()
+        for i in range(5):
+            slow_client.api_write_message(i)
+        fast_client.api_write_message(0)
+
+        metrics = self.comm_environment.get_outbound_queues_metrics()
+
+        self.assertEqual(metrics["queues_count"], 2)
+        self.assertEqual(metrics["queued_messages"], 2)
+        self.assertEqual(metrics["max_queued_messages"], 2)
+        self.assertEqual(metrics["peak_size"], 2)
+        self.assertEqual(metrics["dropped_messages"], 2)
+
+    def test_onClosed_closesClientOutboundQueue(self):
+        client = self.construct_client()
+
+        self.comm_environment.on_closed(client)
+
+        self.assertTrue(client.api_outbound_queue.is_closed)
+
+    def test_coalesceKey_clientsOnlyReceiveLatestQueuedValuePerKey(self):
+        self.comm_environment.outbound_queue_max_size = 10
+        clients = [self.construct_client(), self.construct_client()]
+        group = ConnectedClientsGroup(clients, "hub")
+
+        group.update_position("start", 0)  # not coalesced message written directly, the rest are queued
+        for i in range(1, 4):
+            self.assertIsNone(group.update_position("entity1", i, coalesce_key="entity1"))
+            group.update_position("entity2", i, coalesce_key="entity2")
+        group.update_price(4, coalesce_key="entity1")
+        self.drain()
+
+        unserialize = self.comm_environment.serializer.unserialize
+        messages = [unserialize(m) for m in self.written_messages]
+        received = [(m["function"], m["args"]) for m in messages if m["args"][0] != "start"]
+        self.assertEqual(sorted(received), sorted([("update_position", ["entity1", 3]),
+                                                   ("update_position", ["entity2", 3]),
+                                                   ("update_price", [4])] * 2))
+        self.assertTrue(all("ID" not in m for m in messages[2:]))
+        self.assertEqual(self.comm_environment.get_outbound_queues_metrics()["coalesced_messages"], 8)
+        self.assertEqual(self.comm_environment.get_pending_futures_count(), 2)
+
+    def test_writeCombiningWindow_joinsQueuedMessagesInBatchedFrame(self):
+        self.comm_environment.write_combining_window = 0
+        self.comm_environment.outbound_queue_max_size = 10
+        client = self.construct_client()
+        client_in_hub = ClientInHub(client, "hub")
+
+        client_in_hub.notify(1, notification=True)
+        client_in_hub.ask(2)
+        self.comm_environment.reply(client, [{"ID": 1, "reply": 1}, {"ID": 2, "reply": 2}], None)
+        self.drain()
+
+        messages = [self.comm_environment.serializer.unserialize(m) for m in self.written_messages]
+        self.assertEqual(messages[0], dict(function="notify", args=[1], hub="hub"))
+        self.assertIsInstance(messages[1][0].pop("ID"), int)
+        self.assertEqual(messages[1], [dict(function="ask", args=[2], hub="hub"),
+                                       {"ID": 1, "reply": 1}, {"ID": 2, "reply": 2}])
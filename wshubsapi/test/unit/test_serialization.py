@@ -4,7 +4,7 @@ import json
 import unittest
 
 from wshubsapi.comm_environment import CommEnvironment
-from wshubsapi.serializer import Serializer
+from wshubsapi.serializer import Serializer, JSON_BACKENDS, MsgPackSerializer, msgpack
 
 
 class ComplexObject(object):
@@ -64,3 +64,141 @@ class TestSerialization(unittest.TestCase):
         print(datetime.datetime.now() - datetime_obj['datetime'])
         self.assertTrue(datetime.datetime.now() - datetime_obj['datetime'] < timedelta(milliseconds=25))
 
+
+    def test_handlers_areResolvedFollowingMro(self):
+        class Base(object):
+            pass
+
+        class Child(Base):
+            pass
+
+        self.addCleanup(Serializer.handlers.clear)
+        Serializer.handlers[Base] = lambda obj, depth: "base"
+        Serializer.handlers[int] = lambda obj, depth: str(obj)
+
+        serialization = json.loads(self.serializer.serialize([Child(), Base(), 1, True]))
+
+        self.assertEqual(serialization, ["base", "base", "1", "True"])
+
+    def test_handlers_registeredAfterSerializingAreUsed(self):
+        class MyClass(object):
+            def __init__(self):
+                self.a = 1
+
+        self.addCleanup(Serializer.handlers.clear)
+        self.assertEqual(json.loads(self.serializer.serialize(MyClass())), {"a": 1})
+
+        Serializer.handlers[MyClass] = lambda obj, depth: "handled"
+
+        self.assertEqual(json.loads(self.serializer.serialize([MyClass()])), ["handled"])
+
+    def test_serialize_nativeListsAndDictsRespectMaxDepth(self):
+        serializer = Serializer(max_depth=3)
+
+        serialization = json.loads(serializer.serialize([[[1, 2]], {"a": {"b": 1}}]))
+
+        self.assertEqual(serialization, [[["...", "..."]], {"a": {"b": "..."}}])
+
+    def test_serialize_nativeListsAndDictsAreCopied(self):
+        native_list = [1, "a", None, 2.5, True]
+        native_dict = {"a": 1}
+
+        jsonized_obj = self.serializer._jsonize({"list": native_list, "dict": native_dict})
+
+        self.assertEqual(jsonized_obj["list"], native_list)
+        self.assertIsNot(jsonized_obj["list"], native_list)
+        self.assertIsNot(jsonized_obj["dict"], native_dict)
+
+    def test_appendMessageId_addsIdToSerializedMessage(self):
+        serialization = self.serializer.serialize({"function": "f", "args": [1, {"a": "}"}]})
+
+        message = json.loads(self.serializer.append_message_id(serialization, 3))
+
+        self.assertEqual(message, {"function": "f", "args": [1, {"a": "}"}], "ID": 3})
+
+    def test_joinMessages_returnsBatchedMessageFlatteningBatches(self):
+        messages = [{"ID": 1, "reply": "]"}, [{"ID": 2, "reply": 2}, {"ID": 3, "reply": 3}], [], {"function": "f"}]
+
+        serialization = self.serializer.join_messages([self.serializer.serialize(m) for m in messages])
+
+        self.assertEqual(json.loads(serialization), [{"ID": 1, "reply": "]"}, {"ID": 2, "reply": 2},
+                                                     {"ID": 3, "reply": 3}, {"function": "f"}])
+
+    def test_jsonBackend_defaultIsTheFirstAvailable(self):
+        self.assertEqual(self.serializer.json_backend, list(JSON_BACKENDS)[0])
+
+    def test_jsonBackend_notAvailableFallsBackToJson(self):
+        serializer = Serializer(json_backend="notInstalledBackend")
+
+        self.assertEqual(serializer.json_backend, "json")
+        self.assertEqual(serializer.serialize([1, "hi"]), json.dumps([1, "hi"]))
+
+    def test_jsonBackends_keepSerializationSemantics(self):
+        date = datetime.datetime(2016, 5, 4, 3, 2, 1, 123000)
+        obj = {"date": date, 1: [1, 2.5, "ñ", None, True], "nested": {"a": (1, 2)}, "big": 2 ** 70}
+        for json_backend in JSON_BACKENDS:
+            serializer = Serializer(json_backend=json_backend)
+
+            serialization = serializer.serialize(obj)
+            unserialized_obj = serializer.unserialize(serialization)
+
+            self.assertEqual(json.loads(serialization)["date"], {Serializer.DATE_TAME_KEY: 1462330921123})
+            self.assertEqual(unserialized_obj["date"], date, json_backend)
+            self.assertEqual(unserialized_obj["1"], [1, 2.5, "ñ", None, True], json_backend)
+            self.assertEqual(unserialized_obj["nested"], {"a": [1, 2]}, json_backend)
+            self.assertEqual(unserialized_obj["big"], 2 ** 70, json_backend)
+
+    def test_unserialize_acceptsBytes(self):
+        date = datetime.datetime(2016, 5, 4, 3, 2, 1)
+        serialization = self.serializer.serialize({"date": date, "a": 1}).encode("utf-8")
+
+        self.assertEqual(self.serializer.unserialize(serialization), {"date": date, "a": 1})
+
+
+@unittest.skipIf(msgpack is None, "msgpack not installed")
+class TestMsgPackSerialization(unittest.TestCase):
+    def setUp(self):
+        self.serializer = MsgPackSerializer()
+
+    def test_serialize_returnsMsgpackBytes(self):
+        serialization = self.serializer.serialize({"a": [1, "hi", 2.5]})
+
+        self.assertIsInstance(serialization, bytes)
+        self.assertEqual(msgpack.unpackb(serialization, raw=False), {"a": [1, "hi", 2.5]})
+
+    def test_serialize_datetimesUseNativeTimestampExtension(self):
+        date = datetime.datetime(2016, 5, 4, 3, 2, 1, 123456)
+
+        serialization = self.serializer.serialize({"date": date, "dates": [date]})
+
+        self.assertNotIn(Serializer.DATE_TAME_KEY.encode(), serialization)
+        self.assertIsInstance(msgpack.unpackb(serialization, raw=False)["date"], msgpack.Timestamp)
+        self.assertEqual(self.serializer.unserialize(serialization), {"date": date, "dates": [date]})
+
+    def test_maxDepth_isHandledAsInJsonSerializer(self):
+        nested_obj = {}
+        nested_obj["a"] = nested_obj
+        serialization = self.serializer.serialize(nested_obj)
+
+        checking_obj = self.serializer.unserialize(serialization)
+        for i in range(self.serializer.max_depth):
+            checking_obj = checking_obj['a']
+        self.assertEqual(checking_obj, "...")
+
+    def test_appendMessageId_addsIdToSerializedMessage(self):
+        date = datetime.datetime(2016, 5, 4, 3, 2, 1)
+        serialization = self.serializer.serialize({"function": "f", "args": [date]})
+
+        message = self.serializer.unserialize(self.serializer.append_message_id(serialization, 3))
+
+        self.assertEqual(message, {"function": "f", "args": [date], "ID": 3})
+
+    def test_joinMessages_returnsBatchedMessageFlatteningBatches(self):
+        date = datetime.datetime(2016, 5, 4, 3, 2, 1)
+        big_batch = [{"ID": i} for i in range(20)]  # array header of 3 bytes
+        messages = [{"args": [date]}, [{"ID": 1}, {"ID": 2}], big_batch, [], "not a dict"]
+
+        serialization = self.serializer.join_messages([self.serializer.serialize(m) for m in messages])
+
+        self.assertEqual(self.serializer.unserialize(serialization),
+                         [{"args": [date]}, {"ID": 1}, {"ID": 2}] + big_batch + ["not a dict"])
@@ -0,0 +1,59 @@
+# coding=utf-8
+import threading
+import unittest
+
+from wshubsapi.timing_wheel import TimingWheel
+
+
+class TestTimingWheel(unittest.TestCase):
+    def setUp(self):
+        self.timing_wheel = TimingWheel(tick=0.005, slots_count=8)
+
+    def tearDown(self):
+        self.timing_wheel.stop()
+
+    def test_schedule_callsCallbackWithArgsWhenExpired(self):
+        expired_event = threading.Event()
+        received_args = []
+
+        def callback(*args):
+            received_args.extend(args)
+            expired_event.set()
+
+        self.timing_wheel.schedule(0.01, callback, 1, "2")
+
+        self.assertTrue(expired_event.wait(1))
+        self.assertEqual(received_args, [1, "2"])
+        self.assertEqual(len(self.timing_wheel), 0)
+
+    def test_schedule_timeoutsLongerThanAWheelRoundWaitAllRounds(self):
+        expired_event = threading.Event()
+        short_expired_event = threading.Event()
+
+        self.timing_wheel.schedule(0.2, expired_event.set)  # 40 ticks in a wheel of 8 slots
+        self.timing_wheel.schedule(0.01, short_expired_event.set)
+
+        self.assertTrue(short_expired_event.wait(1))
+        self.assertFalse(expired_event.is_set())
+        self.assertTrue(expired_event.wait(1))
+
+    def test_cancel_preventsCallbackToBeCalled(self):
+        expired_event = threading.Event()
+        control_event = threading.Event()
+        handle = self.timing_wheel.schedule(0.01, expired_event.set)
+        self.timing_wheel.schedule(0.02, control_event.set)
+
+        self.assertTrue(self.timing_wheel.cancel(handle))
+
+        self.assertTrue(control_event.wait(1))
+        self.assertFalse(expired_event.is_set())
+        self.assertFalse(self.timing_wheel.cancel(handle))
+
+    def test_schedule_restartsTheWheelAfterStop(self):
+        expired_event = threading.Event()
+        self.timing_wheel.schedule(0.01, lambda: None)
+        self.timing_wheel.stop()
+
+        self.timing_wheel.schedule(0.01, expired_event.set)
+
+        self.assertTrue(expired_event.wait(1))
@@ -37,6 +37,13 @@ class TestUtilsApiHub(unittest.TestCase):
         self.assertNotIn(-1, ConnectedClientsHolder.all_connected_clients)
         self.assertIn(10, ConnectedClientsHolder.all_connected_clients)
 
+    def test_set_id__releases_unprovided_id_holding_environment_lock(self):
+        comm_environment = self.sender.api_get_real_connected_client().api_get_comm_environment()
+        flexmock(comm_environment).should_receive("release_unprovided_id").with_args(-1)\
+            .replace_with(lambda id_: self.assertTrue(comm_environment.lock.locked())).once()
+
+        self.utils_hub.set_id(10, self.sender)
+
     def test_set_id__raises_exception_if_id_already_exist(self):
         self.assertRaises(Exception, self.utils_hub.set_id, 1, self.sender)
 
@@ -0,0 +1,97 @@
+import itertools
+import logging
+import math
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+
+class TimingWheel(object):
+    """
+    Hashed timing wheel driven by a single daemon thread.
+    Scheduling and cancelling timers is O(1), expired callbacks are called from the wheel thread
+    """
+
+    def __init__(self, tick=0.1, slots_count=512):
+        """
+        :param tick: seconds between two consecutive slots (timers resolution)
+        """
+        self.tick = tick
+        self.__slots = [dict() for _ in range(slots_count)]
+        """:type : list[dict[tuple, list]]"""
+        self.__current_slot = 0
+        self.__handles_counter = itertools.count()
+        self.__lock = threading.Lock()
+        self.__thread = None
+        self.__stopped = None
+        """:type : threading.Event | None  stop event of the running thread"""
+
+    def schedule(self, timeout, callback, *args):
+        """
+        Calls callback(*args) after timeout seconds (rounded up to the next tick)
+        :return: handle to cancel the timer
+        """
+        ticks = max(1, int(math.ceil(timeout / self.tick)))
+        slots_count = len(self.__slots)
+        with self.__lock:
+            self.__start_thread_if_necessary()
+            slot_index = (self.__current_slot + ticks) % slots_count
+            handle = (slot_index, next(self.__handles_counter))
+            rounds = (ticks - 1) // slots_count
+            self.__slots[slot_index][handle] = [rounds, callback, args]
+        return handle
+
+    def cancel(self, handle):
+        """
+        :return: True if the timer was pending and it is cancelled
+        """
+        with self.__lock:
+            return self.__slots[handle[0]].pop(handle, None) is not None
+
+    def stop(self):
+        """
+        Stops the wheel thread, it is started again if a timer is scheduled afterwards
+        """
+        with self.__lock:
+            if self.__thread is not None:
+                self.__stopped.set()
+                self.__thread = None
+
+    def __len__(self):
+        with self.__lock:
+            return sum(len(slot) for slot in self.__slots)
+
+    def __start_thread_if_necessary(self):
+        """
+        needs __lock
+        """
+        if self.__thread is None:
+            self.__stopped = threading.Event()
+            self.__thread = threading.Thread(target=self.__run, args=(self.__stopped,), name="TimingWheel")
+            self.__thread.daemon = True
+            self.__thread.start()
+
+    def __run(self, stopped):
+        next_tick = time.monotonic()
+        while True:
+            next_tick += self.tick
+            if stopped.wait(max(0.0, next_tick - time.monotonic())):
+                return
+            for rounds, callback, args in self.__advance():
+                try:
+                    callback(*args)
+                except Exception:
+                    log.exception("Error calling expired timer callback")
+
+    def __advance(self):
+        expired = []
+        with self.__lock:
+            self.__current_slot = (self.__current_slot + 1) % len(self.__slots)
+            slot = self.__slots[self.__current_slot]
+            for handle, timer in list(slot.items()):
+                if timer[0] == 0:
+                    expired.append(slot.pop(handle))
+                else:
+                    timer[0] -= 1
+        return expired
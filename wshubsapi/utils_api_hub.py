@@ -6,11 +6,15 @@ from wshubsapi.hubs_inspector import HubsInspector
 class UtilsAPIHub(Hub):
     def set_id(self, client_id, _sender):
         connections = self.clients.all_connected_clients
-        if client_id in connections:
-            raise Exception("new ID already in use")
-        connections.pop(_sender.ID)
-        _sender.ID = client_id
-        connections[client_id] = _sender.api_get_real_connected_client()
+        connected_client = _sender.api_get_real_connected_client()
+        comm_environment = connected_client.api_get_comm_environment()
+        with comm_environment.lock:
+            if client_id in connections:
+                raise Exception("new ID already in use")
+            connections.pop(_sender.ID)
+            comm_environment.release_unprovided_id(_sender.ID)
+            _sender.ID = client_id
+            connections[client_id] = connected_client
 
     @staticmethod
     def get_id(_sender):